@@ -1,21 +1,28 @@
 from django.contrib import admin
-from django.utils.html import format_html
+from django.utils.html import format_html, format_html_join
+from django.urls import reverse
 from django.utils import timezone
 from django.contrib import messages
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path
 from datetime import timedelta
 from .models import (
     Department, Officer, Worker,
     Complaint, ComplaintLog, Assignment, ComplaintCategory,
     ComplaintEscalation, WorkerAttendance, Facility, FacilityInspection,
-    SLAConfig, Streetlight, FacilityRating
-)
-# Email notification service
-from .email_service import (
-    send_complaint_registered_email,
-    send_worker_assignment_email,
-    send_status_update_email,
-    send_escalation_email
+    SLAConfig, Streetlight, FacilityRating, ImageHash, ProfileReport
 )
+# Email notification service: imported where an email is sent (templates and
+# SMTP machinery aren't needed to serve the admin)
+
+# Streaming CSV / NDJSON exports
+from .exports import EXPORT_FORMATS
+from .paginators import EstimatedCountPaginator
+from .search import search_complaints
+from .photo_hashes import MAX_DISTANCE, find_similar
 
 # Use custom admin site for dashboard stats
 from .admin_site import municipal_admin
@@ -29,6 +36,15 @@ admin.site.site_title = "Municipal Admin"
 admin.site.index_title = "Dashboard"
 
 
+# -----------------------------
+# Per-row counts for changelist columns
+# -----------------------------
+def _count_subquery(queryset, fk="department"):
+    """COUNT(*) of `queryset` rows pointing at each changelist row, computed in the changelist query"""
+    counts = queryset.filter(**{fk: OuterRef("pk")}).order_by().values(fk).annotate(n=Count("pk")).values("n")
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
 # -----------------------------
 # Base class for department filtering
 # -----------------------------
@@ -39,12 +55,9 @@ class DepartmentFilteredAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        # Check if user is an officer
-        if hasattr(request.user, 'officer'):
-            return qs.filter(department=request.user.officer.department)
-        # Check if user is a worker
-        if hasattr(request.user, 'worker'):
-            return qs.filter(department=request.user.worker.department)
+        # Officers and workers see their own department
+        if request.civic_role.department_id is not None:
+            return qs.filter(department_id=request.civic_role.department_id)
         return qs.none()
 
 
@@ -85,7 +98,7 @@ class EscalationInline(admin.TabularInline):
     readonly_fields = ("escalated_from", "escalated_to", "reason", "escalated_at")
 
     def has_add_permission(self, request, obj=None):
-        return request.user.is_superuser or hasattr(request.user, 'officer')
+        return request.user.is_superuser or request.civic_role.is_officer
 
 
 # -----------------------------
@@ -96,20 +109,30 @@ class DepartmentAdmin(admin.ModelAdmin):
     list_display = ("name", "description", "officer_count", "worker_count", "open_complaints")
     search_fields = ("name",)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            officer_total=_count_subquery(Officer.objects.all()),
+            worker_total=_count_subquery(Worker.objects.all()),
+            open_total=_count_subquery(Complaint.objects.filter(status__in=["pending", "in_progress"])),
+        )
+
     def officer_count(self, obj):
-        return obj.officer_set.count()
+        return obj.officer_total
     officer_count.short_description = "Officers"
+    officer_count.admin_order_field = "officer_total"
 
     def worker_count(self, obj):
-        return obj.worker_set.count()
+        return obj.worker_total
     worker_count.short_description = "Workers"
+    worker_count.admin_order_field = "worker_total"
 
     def open_complaints(self, obj):
-        count = Complaint.objects.filter(department=obj, status__in=["pending", "in_progress"]).count()
+        count = obj.open_total
         if count > 10:
             return format_html('<span style="color: red; font-weight: bold;">{}</span>', count)
         return count
     open_complaints.short_description = "Open Issues"
+    open_complaints.admin_order_field = "open_total"
 
 
 # -----------------------------
@@ -118,6 +141,7 @@ class DepartmentAdmin(admin.ModelAdmin):
 @admin.register(ComplaintCategory)
 class ComplaintCategoryAdmin(admin.ModelAdmin):
     list_display = ("name", "department", "has_sla")
+    list_select_related = ("department", "sla")
     list_filter = ("department",)
     search_fields = ("name",)
 
@@ -133,23 +157,31 @@ class ComplaintCategoryAdmin(admin.ModelAdmin):
 @admin.register(Officer)
 class OfficerAdmin(admin.ModelAdmin):
     list_display = ("user", "department", "role", "assigned_complaints", "pending_escalations")
+    list_select_related = ("user", "department")
     list_filter = ("department", "role")
     search_fields = ("user__username", "user__email")
 
     def assigned_complaints(self, obj):
-        return obj.complaints.filter(status__in=["pending", "in_progress"]).count()
+        return obj.active_cases
     assigned_complaints.short_description = "Active Cases"
+    assigned_complaints.admin_order_field = "active_cases"
 
     def pending_escalations(self, obj):
-        return ComplaintEscalation.objects.filter(escalated_to=obj).count()
+        return obj.escalation_total
     pending_escalations.short_description = "Escalations"
+    pending_escalations.admin_order_field = "escalation_total"
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
+        qs = super().get_queryset(request).annotate(
+            active_cases=_count_subquery(
+                Complaint.objects.filter(status__in=["pending", "in_progress"]), "current_officer"
+            ),
+            escalation_total=_count_subquery(ComplaintEscalation.objects.all(), "escalated_to"),
+        )
         if request.user.is_superuser:
             return qs
-        if hasattr(request.user, 'officer'):
-            return qs.filter(department=request.user.officer.department)
+        if request.civic_role.is_officer:
+            return qs.filter(department_id=request.civic_role.department_id)
         return qs.none()
 
 
@@ -177,6 +209,7 @@ class WorkerAttendanceInline(admin.TabularInline):
 @admin.register(Worker)
 class WorkerAdmin(admin.ModelAdmin):
     list_display = ("user", "department", "role", "is_active", "today_attendance", "active_tasks", "attendance_summary")
+    list_select_related = ("user", "department")
     list_filter = ("department", "role", "is_active")
     search_fields = ("user__username",)
     list_editable = ("is_active",)
@@ -193,43 +226,49 @@ class WorkerAdmin(admin.ModelAdmin):
     )
 
     def today_attendance(self, obj):
-        today = timezone.now().date()
-        att = obj.attendance_records.filter(date=today).first()
-        if att:
-            color = {"present": "green", "absent": "red", "half_day": "orange", "on_leave": "blue"}.get(att.status, "gray")
-            return format_html('<span style="color: {};">{}</span>', color, att.get_status_display())
+        if obj.today_status:
+            color = {"present": "green", "absent": "red", "half_day": "orange", "on_leave": "blue"}.get(obj.today_status, "gray")
+            label = dict(WorkerAttendance.ATTENDANCE_STATUS).get(obj.today_status, obj.today_status)
+            return format_html('<span style="color: {};">{}</span>', color, label)
         return format_html('<span style="color: gray;">Not Marked</span>')
     today_attendance.short_description = "Today"
 
     def active_tasks(self, obj):
-        return obj.assigned_work.filter(status__in=["pending", "in_progress"]).count()
+        return obj.active_task_total
     active_tasks.short_description = "Tasks"
+    active_tasks.admin_order_field = "active_task_total"
     
     def attendance_summary(self, obj):
         """Show attendance stats for current month"""
-        from datetime import date
-        today = date.today()
-        first_day = today.replace(day=1)
-        records = obj.attendance_records.filter(date__gte=first_day, date__lte=today)
-        present = records.filter(status="present").count()
-        absent = records.filter(status="absent").count()
-        total = records.count()
-        if total == 0:
+        if obj.month_total == 0:
             return "-"
         return format_html(
             '<span style="color: green;">✓{}</span> / <span style="color: red;">✗{}</span>',
-            present, absent
+            obj.month_present, obj.month_absent
         )
     attendance_summary.short_description = "This Month"
 
     def get_queryset(self, request):
-        qs = super().get_queryset(request)
+        # Everything the changelist columns show, as subqueries of the changelist query
+        today = timezone.now().date()
+        month = WorkerAttendance.objects.filter(date__gte=today.replace(day=1), date__lte=today)
+        qs = super().get_queryset(request).annotate(
+            today_status=Subquery(
+                WorkerAttendance.objects.filter(worker=OuterRef("pk"), date=today).values("status")[:1]
+            ),
+            active_task_total=_count_subquery(
+                Complaint.objects.filter(status__in=["pending", "in_progress"]), "current_worker"
+            ),
+            month_present=_count_subquery(month.filter(status="present"), "worker"),
+            month_absent=_count_subquery(month.filter(status="absent"), "worker"),
+            month_total=_count_subquery(month, "worker"),
+        )
         if request.user.is_superuser:
             return qs
-        if hasattr(request.user, 'officer'):
-            return qs.filter(department=request.user.officer.department)
-        if hasattr(request.user, 'worker'):
-            return qs.filter(id=request.user.worker.id)
+        if request.civic_role.is_officer:
+            return qs.filter(department_id=request.civic_role.department_id)
+        if request.civic_role.is_worker:
+            return qs.filter(id=request.civic_role.worker_id)
         return qs.none()
 
 
@@ -239,6 +278,7 @@ class WorkerAdmin(admin.ModelAdmin):
 @admin.register(WorkerAttendance)
 class WorkerAttendanceAdmin(admin.ModelAdmin):
     list_display = ("worker", "date", "status_colored", "check_in", "check_out", "marked_by")
+    list_select_related = ("worker__user", "marked_by")
     list_filter = ("status", "date", "worker__department")
     search_fields = ("worker__user__username",)
     date_hierarchy = "date"
@@ -278,19 +318,80 @@ class WorkerAttendanceAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        if hasattr(request.user, 'officer'):
-            return qs.filter(worker__department=request.user.officer.department)
-        if hasattr(request.user, 'worker'):
-            return qs.filter(worker=request.user.worker)
+        if request.civic_role.is_officer:
+            return qs.filter(worker__department_id=request.civic_role.department_id)
+        if request.civic_role.is_worker:
+            return qs.filter(worker_id=request.civic_role.worker_id)
         return qs.none()
 
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
         if db_field.name == "worker" and not request.user.is_superuser:
-            if hasattr(request.user, 'officer'):
-                kwargs["queryset"] = Worker.objects.filter(department=request.user.officer.department)
+            if request.civic_role.is_officer:
+                kwargs["queryset"] = Worker.objects.filter(department_id=request.civic_role.department_id)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
+# -----------------------------
+# Complaint changelist filters
+# (fixed choices instead of SELECT DISTINCT over the whole table)
+# -----------------------------
+class CategoryListFilter(admin.RelatedFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        categories = ComplaintCategory.objects.select_related("department").order_by("name")
+        return [(category.pk, str(category)) for category in categories]
+
+
+class ComplaintStatusFilter(admin.SimpleListFilter):
+    title = "status"
+    parameter_name = "status"
+
+    def lookups(self, request, model_admin):
+        return [
+            ("pending", "Pending"),
+            ("assigned", "Assigned"),
+            ("in_progress", "In Progress"),
+            ("escalated", "Escalated"),
+            ("resolved", "Resolved"),
+            ("closed", "Closed"),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(status=self.value())
+        return queryset
+
+
+class DuplicateFilter(admin.SimpleListFilter):
+    title = "duplicates"
+    parameter_name = "duplicate"
+
+    def lookups(self, request, model_admin):
+        return [
+            ("yes", "Linked duplicates"),
+            ("no", "Original reports"),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(duplicate_of__isnull=False)
+        if self.value() == "no":
+            return queryset.filter(duplicate_of__isnull=True)
+        return queryset
+
+
+class ComplaintPriorityFilter(admin.SimpleListFilter):
+    title = "priority"
+    parameter_name = "priority"
+
+    def lookups(self, request, model_admin):
+        return [("1", "Normal"), ("2", "High"), ("3", "Critical")]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(priority=self.value())
+        return queryset
+
+
 # -----------------------------
 # Complaint (CORE VIEW)
 # -----------------------------
@@ -302,21 +403,38 @@ class ComplaintAdmin(admin.ModelAdmin):
         "current_worker", "sla_status", "created_at"
     )
 
+    # Everything list_display and the card template touch, in one joined query
+    list_select_related = (
+        "department",
+        "category__sla",
+        "current_officer__user",
+        "current_worker__user",
+    )
+
     list_filter = (
-        "department", "status",
-        "priority", "category", "is_deleted", "is_spam"
+        "department", ComplaintStatusFilter,
+        ComplaintPriorityFilter, ("category", CategoryListFilter), DuplicateFilter,
+        "is_deleted", "is_spam"
     )
 
     search_fields = ("title", "description", "user__username", "location")
 
     ordering = ("-priority", "-created_at")
 
+    date_hierarchy = "created_at"
+
     inlines = [AssignmentInline, EscalationInline, ComplaintLogInline]
 
     list_per_page = 25
 
+    # Planner estimates instead of COUNT(*) on big tables
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     readonly_fields = ("created_at", "updated_at")
 
+    raw_id_fields = ("duplicate_of",)
+
     fieldsets = (
         ("Complaint Info", {
             "fields": ("user", "title", "description", "location", "image", "category")
@@ -328,7 +446,7 @@ class ComplaintAdmin(admin.ModelAdmin):
             "fields": ("current_officer", "current_worker")
         }),
         ("Flags", {
-            "fields": ("is_deleted", "is_spam"),
+            "fields": ("is_deleted", "is_spam", "duplicate_of"),
             "classes": ("collapse",)
         }),
         ("Timestamps", {
@@ -337,7 +455,10 @@ class ComplaintAdmin(admin.ModelAdmin):
         }),
     )
 
-    actions = ["mark_resolved", "mark_in_progress", "escalate_to_senior"]
+    actions = [
+        "mark_resolved", "mark_in_progress", "escalate_to_senior",
+        "export_csv", "export_csv_with_history", "export_ndjson",
+    ]
 
     def priority_badge(self, obj):
         colors = {1: "#28a745", 2: "#ffc107", 3: "#dc3545"}
@@ -384,21 +505,29 @@ class ComplaintAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        if hasattr(request.user, 'officer'):
-            return qs.filter(department=request.user.officer.department)
-        if hasattr(request.user, 'worker'):
-            return qs.filter(current_worker=request.user.worker)
+        if request.civic_role.is_officer:
+            return qs.filter(department_id=request.civic_role.department_id)
+        if request.civic_role.is_worker:
+            return qs.filter(current_worker_id=request.civic_role.worker_id)
         return qs.none()
 
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text index instead of ILIKE scans over search_fields"""
+        if not search_term.strip():
+            return queryset, False
+        matches = search_complaints(queryset, search_term, rank=False)
+        # Keep the old ability to look up a citizen's complaints by username
+        return matches | queryset.filter(user__username__iexact=search_term.strip()), False
+
     def formfield_for_foreignkey(self, db_field, request, **kwargs):
-        if not request.user.is_superuser and hasattr(request.user, 'officer'):
-            dept = request.user.officer.department
+        if not request.user.is_superuser and request.civic_role.is_officer:
+            dept_id = request.civic_role.department_id
             if db_field.name == "current_worker":
-                kwargs["queryset"] = Worker.objects.filter(department=dept)
+                kwargs["queryset"] = Worker.objects.filter(department_id=dept_id)
             if db_field.name == "current_officer":
-                kwargs["queryset"] = Officer.objects.filter(department=dept)
+                kwargs["queryset"] = Officer.objects.filter(department_id=dept_id)
             if db_field.name == "category":
-                kwargs["queryset"] = ComplaintCategory.objects.filter(department=dept)
+                kwargs["queryset"] = ComplaintCategory.objects.filter(department_id=dept_id)
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def save_model(self, request, obj, form, change):
@@ -426,6 +555,9 @@ class ComplaintAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
         
         # Send email notifications
+        from .email_service import (
+            send_complaint_registered_email, send_status_update_email, send_worker_assignment_email
+        )
         try:
             if is_new:
                 # New complaint registered
@@ -447,6 +579,7 @@ class ComplaintAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark selected as Resolved")
     def mark_resolved(self, request, queryset):
+        from .email_service import send_status_update_email
         count = 0
         for complaint in queryset:
             old_status = complaint.status
@@ -461,6 +594,7 @@ class ComplaintAdmin(admin.ModelAdmin):
 
     @admin.action(description="Mark selected as In Progress")
     def mark_in_progress(self, request, queryset):
+        from .email_service import send_status_update_email
         count = 0
         for complaint in queryset:
             old_status = complaint.status
@@ -475,16 +609,17 @@ class ComplaintAdmin(admin.ModelAdmin):
 
     @admin.action(description="Escalate to Senior Officer")
     def escalate_to_senior(self, request, queryset):
+        from .email_service import send_escalation_email
         count = 0
         for complaint in queryset:
             complaint.status = "escalated"
             complaint.priority = 3
             complaint.save()
             count += 1
-            if hasattr(request.user, 'officer'):
+            if request.civic_role.is_officer:
                 escalation = ComplaintEscalation.objects.create(
                     complaint=complaint,
-                    escalated_from=request.user.officer,
+                    escalated_from_id=request.civic_role.officer_id,
                     reason="Bulk escalation by officer"
                 )
                 try:
@@ -494,12 +629,34 @@ class ComplaintAdmin(admin.ModelAdmin):
         messages.success(request, f"⚠️ {count} complaint(s) escalated. Notifications sent to senior officers.")
 
 
+    def _export(self, queryset, fmt, include_logs=False):
+        """Stream the selected complaints (already department-scoped) as a download"""
+        stream, content_type = EXPORT_FORMATS[fmt]
+        response = StreamingHttpResponse(stream(queryset, include_logs=include_logs), content_type=content_type)
+        filename = f"complaints-{timezone.now():%Y%m%d-%H%M}.{fmt}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    @admin.action(description="Export selected to CSV")
+    def export_csv(self, request, queryset):
+        return self._export(queryset, "csv")
+
+    @admin.action(description="Export selected to CSV (with history)")
+    def export_csv_with_history(self, request, queryset):
+        return self._export(queryset, "csv", include_logs=True)
+
+    @admin.action(description="Export selected to NDJSON (with history)")
+    def export_ndjson(self, request, queryset):
+        return self._export(queryset, "ndjson", include_logs=True)
+
+
 # -----------------------------
 # Escalation Admin
 # -----------------------------
 @admin.register(ComplaintEscalation)
 class ComplaintEscalationAdmin(admin.ModelAdmin):
     list_display = ("complaint", "escalated_from", "escalated_to", "reason", "escalated_at")
+    list_select_related = ("complaint", "escalated_from__user", "escalated_to__user")
     list_filter = ("escalated_at",)
     search_fields = ("complaint__title", "reason")
     readonly_fields = ("escalated_at",)
@@ -508,8 +665,8 @@ class ComplaintEscalationAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        if hasattr(request.user, 'officer'):
-            return qs.filter(complaint__department=request.user.officer.department)
+        if request.civic_role.is_officer:
+            return qs.filter(complaint__department_id=request.civic_role.department_id)
         return qs.none()
 
 
@@ -534,10 +691,19 @@ class FacilityRatingInline(admin.TabularInline):
 @admin.register(Facility)
 class FacilityAdmin(DepartmentFilteredAdmin):
     list_display = ("name", "facility_type", "department", "assigned_worker", "is_active", "public_rating", "last_inspection")
+    list_select_related = ("department", "assigned_worker__user")
     list_filter = ("facility_type", "department", "is_active")
     search_fields = ("name", "address")
     inlines = [FacilityRatingInline]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_rating_stats().annotate(
+            last_inspected=Subquery(
+                FacilityInspection.objects.filter(facility=OuterRef("pk"))
+                .order_by("-inspection_date").values("inspection_date")[:1]
+            )
+        )
+
     def public_rating(self, obj):
         avg = obj.average_rating
         total = obj.total_ratings
@@ -550,9 +716,8 @@ class FacilityAdmin(DepartmentFilteredAdmin):
     public_rating.short_description = "Public Rating"
 
     def last_inspection(self, obj):
-        insp = obj.inspections.first()
-        if insp:
-            return insp.inspection_date.date()
+        if obj.last_inspected:
+            return timezone.localtime(obj.last_inspected).date()
         return "-"
     last_inspection.short_description = "Last Checked"
 
@@ -563,6 +728,7 @@ class FacilityAdmin(DepartmentFilteredAdmin):
 @admin.register(FacilityRating)
 class FacilityRatingAdmin(admin.ModelAdmin):
     list_display = ("facility", "rating_stars", "user_display", "comment_short", "created_at", "is_verified")
+    list_select_related = ("facility", "user")
     list_filter = ("cleanliness_rating", "is_verified", "is_anonymous", "facility__facility_type")
     search_fields = ("facility__name", "comment")
     date_hierarchy = "created_at"
@@ -591,8 +757,8 @@ class FacilityRatingAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        if hasattr(request.user, 'officer'):
-            return qs.filter(facility__department=request.user.officer.department)
+        if request.civic_role.is_officer:
+            return qs.filter(facility__department_id=request.civic_role.department_id)
         return qs
 
 
@@ -602,6 +768,7 @@ class FacilityRatingAdmin(admin.ModelAdmin):
 @admin.register(FacilityInspection)
 class FacilityInspectionAdmin(admin.ModelAdmin):
     list_display = ("facility", "inspected_by", "inspection_date", "rating_stars", "functional_status")
+    list_select_related = ("facility", "inspected_by__user")
     list_filter = ("cleanliness_rating", "functional_status", "facility__facility_type")
     search_fields = ("facility__name",)
     date_hierarchy = "inspection_date"
@@ -616,10 +783,10 @@ class FacilityInspectionAdmin(admin.ModelAdmin):
         qs = super().get_queryset(request)
         if request.user.is_superuser:
             return qs
-        if hasattr(request.user, 'officer'):
-            return qs.filter(facility__department=request.user.officer.department)
-        if hasattr(request.user, 'worker'):
-            return qs.filter(inspected_by=request.user.worker)
+        if request.civic_role.is_officer:
+            return qs.filter(facility__department_id=request.civic_role.department_id)
+        if request.civic_role.is_worker:
+            return qs.filter(inspected_by_id=request.civic_role.worker_id)
         return qs.none()
 
 
@@ -629,6 +796,7 @@ class FacilityInspectionAdmin(admin.ModelAdmin):
 @admin.register(SLAConfig)
 class SLAConfigAdmin(admin.ModelAdmin):
     list_display = ("category", "resolution_hours", "escalation_hours")
+    list_select_related = ("category__department",)
     list_filter = ("category__department",)
 
 
@@ -638,10 +806,20 @@ class SLAConfigAdmin(admin.ModelAdmin):
 @admin.register(Streetlight)
 class StreetlightAdmin(DepartmentFilteredAdmin):
     list_display = ("pole_id", "location", "ward", "status_badge", "assigned_worker", "last_maintenance")
+    list_select_related = ("assigned_worker__user",)
     list_filter = ("status", "department", "ward")
     search_fields = ("pole_id", "location")
     list_editable = ("assigned_worker",)
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == "assigned_worker":
+            kwargs["queryset"] = Worker.objects.select_related("user")
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == "assigned_worker":
+            # list_editable renders this select on every row; load the options once, not per row
+            formfield.choices = list(formfield.choices)
+        return formfield
+
     def status_badge(self, obj):
         colors = {"functional": "green", "non_functional": "red", "under_repair": "orange"}
         return format_html(
@@ -658,6 +836,7 @@ class StreetlightAdmin(DepartmentFilteredAdmin):
 @admin.register(ComplaintLog)
 class ComplaintLogAdmin(admin.ModelAdmin):
     list_display = ("complaint", "action_by", "old_status", "new_status", "timestamp")
+    list_select_related = ("complaint", "action_by")
     list_filter = ("timestamp",)
     readonly_fields = ("complaint", "action_by", "old_status", "new_status", "old_dept", "new_dept", "timestamp")
 
@@ -669,3 +848,131 @@ class ComplaintLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+# -----------------------------
+# Photo hashes (repost / duplicate photo review)
+# -----------------------------
+@admin.register(ImageHash)
+class ImageHashAdmin(admin.ModelAdmin):
+    list_display = ("source", "object_link", "uploaded_by", "hash_hex", "created_at")
+    list_filter = ("source",)
+    list_select_related = ("uploaded_by",)
+    search_fields = ("sha256", "uploaded_by__username")
+    date_hierarchy = "created_at"
+    readonly_fields = (
+        "source", "object_link", "uploaded_by", "file", "sha256", "hash_hex",
+        "created_at", "similar_images"
+    )
+    fields = readonly_fields
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def hash_hex(self, obj):
+        return f"{obj.dhash & 0xFFFFFFFFFFFFFFFF:016x}"
+    hash_hex.short_description = "dHash"
+
+    def _object_url(self, obj):
+        model = "complaint" if obj.source == "complaint" else "facilityrating"
+        return reverse(f"admin:civic_saathi_{model}_change", args=[obj.object_id])
+
+    def object_link(self, obj):
+        return format_html('<a href="{}">{} #{}</a>', self._object_url(obj), obj.get_source_display(), obj.object_id)
+    object_link.short_description = "Uploaded with"
+
+    def similar_images(self, obj):
+        matches = find_similar(obj.dhash, MAX_DISTANCE, ImageHash.objects.exclude(pk=obj.pk))
+        if not matches:
+            return "No visually similar photos"
+        return format_html(
+            "<ul>{}</ul>",
+            format_html_join(
+                "", '<li><a href="{}">{} #{}</a> by {} &mdash; {} bit(s) apart{}</li>',
+                (
+                    (self._object_url(match), match.get_source_display(), match.object_id,
+                     match.uploaded_by or "anonymous", distance,
+                     " (identical file)" if match.sha256 == obj.sha256 else "")
+                    for match, distance in matches
+                )
+            )
+        )
+    similar_images.short_description = "Similar photos"
+
+
+# -----------------------------
+# Request profiles (see civic_saathi/profiling.py)
+# -----------------------------
+@admin.register(ProfileReport)
+class ProfileReportAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "method", "path", "view_name", "status_code", "duration", "trigger", "user")
+    list_filter = ("trigger", "method", "view_name")
+    list_select_related = ("user",)
+    search_fields = ("path", "view_name")
+    date_hierarchy = "created_at"
+    readonly_fields = (
+        "created_at", "user", "trigger", "method", "path", "view_name", "status_code",
+        "duration", "download", "cpu_stats", "alloc_stats"
+    )
+    fields = readonly_fields
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        # The raw profile can be large; only the download view needs it
+        return super().get_queryset(request).defer("raw_profile")
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/download/",
+                self.admin_site.admin_view(self.download_view),
+                name="civic_saathi_profilereport_download",
+            ),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        report = get_object_or_404(ProfileReport, pk=pk)
+        response = HttpResponse(bytes(report.raw_profile), content_type="application/octet-stream")
+        response["Content-Disposition"] = f'attachment; filename="profile-{report.pk}.prof"'
+        return response
+
+    def duration(self, obj):
+        return f"{obj.duration_ms:.0f} ms"
+    duration.short_description = "Duration"
+    duration.admin_order_field = "duration_ms"
+
+    def download(self, obj):
+        return format_html(
+            '<a href="{}">profile-{}.prof</a> (open with snakeviz or python -m pstats)',
+            reverse("admin:civic_saathi_profilereport_download", args=[obj.pk]), obj.pk
+        )
+    download.short_description = "Raw profile"
+
+    def cpu_stats(self, obj):
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.cpu_report)
+    cpu_stats.short_description = "CPU (cumulative)"
+
+    def alloc_stats(self, obj):
+        if not obj.alloc_report:
+            return "Not traced (sampled request, X-Profile: cpu, or another request was being traced)"
+        return format_html('<pre style="white-space: pre; overflow-x: auto;">{}</pre>', obj.alloc_report)
+    alloc_stats.short_description = "Allocations"
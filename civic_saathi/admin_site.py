@@ -1,6 +1,7 @@
 from django.contrib.admin import AdminSite
+from django.db.models import Count
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
 
 class MunicipalAdminSite(AdminSite):
@@ -13,38 +14,37 @@ class MunicipalAdminSite(AdminSite):
             Department, Complaint, Worker, Officer,
             WorkerAttendance, ComplaintEscalation
         )
+        from civic_saathi.metrics import sla_breach_counts
 
         extra_context = extra_context or {}
 
         # Get user's department if they're an officer
-        user_department = None
-        if hasattr(request.user, 'officer'):
-            user_department = request.user.officer.department
+        role = request.civic_role
+        user_department_id = role.department_id if role.is_officer else None
 
         # Stats - filtered by department if user is officer
         complaints_qs = Complaint.objects.all()
-        if user_department:
-            complaints_qs = complaints_qs.filter(department=user_department)
+        if user_department_id:
+            complaints_qs = complaints_qs.filter(department_id=user_department_id)
 
         today = timezone.now().date()
+        # "Updated today" as a range (not __date) so the (status, updated_at) index is usable
+        today_start = timezone.make_aware(datetime.combine(today, time.min))
+        today_range = (today_start, today_start + timedelta(days=1))
         
         extra_context['total_complaints'] = complaints_qs.count()
         extra_context['pending_complaints'] = complaints_qs.filter(status='pending').count()
         extra_context['resolved_complaints'] = complaints_qs.filter(
             status='resolved',
-            updated_at__date=today
+            updated_at__gte=today_range[0],
+            updated_at__lt=today_range[1]
         ).count()
 
         # Calculate overdue (SLA breached)
-        overdue_count = 0
-        for complaint in complaints_qs.filter(status__in=['pending', 'in_progress']):
-            if complaint.category and hasattr(complaint.category, 'sla'):
-                elapsed = (timezone.now() - complaint.created_at).total_seconds() / 3600
-                if elapsed > complaint.category.sla.resolution_hours:
-                    overdue_count += 1
-        extra_context['overdue_complaints'] = overdue_count
+        sla_breached = sla_breach_counts(complaints_qs, by='department_id')
+        extra_context['overdue_complaints'] = sum(sla_breached.values())
 
-        extra_context['user_department'] = user_department
+        extra_context['user_department'] = role.department_name if user_department_id else None
 
         # Department icons
         dept_icons = {
@@ -59,8 +59,13 @@ class MunicipalAdminSite(AdminSite):
         # Build complaint flow trees for each department
         dept_flows = []
         dept_qs = Department.objects.all()
-        if user_department:
-            dept_qs = dept_qs.filter(id=user_department.id)
+        if user_department_id:
+            dept_qs = dept_qs.filter(id=user_department_id)
+
+        open_counts = dict(
+            Complaint.objects.filter(status__in=['pending', 'in_progress', 'escalated'])
+            .order_by().values_list('department_id').annotate(n=Count('id'))
+        )
 
         for dept in dept_qs:
             dept_complaints = Complaint.objects.filter(department=dept)
@@ -76,18 +81,19 @@ class MunicipalAdminSite(AdminSite):
                 status='pending',
                 current_officer__isnull=False,
                 current_worker__isnull=True
-            ).order_by('-priority', '-created_at')[:5]
+            ).select_related('current_officer__user').order_by('-priority', '-created_at')[:5]
             
             # At Worker - in progress with worker
             at_worker = dept_complaints.filter(
                 status='in_progress',
                 current_worker__isnull=False
-            ).order_by('-priority', '-created_at')[:5]
+            ).select_related('current_worker__user').order_by('-priority', '-created_at')[:5]
             
             # Resolved today
             resolved = dept_complaints.filter(
                 status='resolved',
-                updated_at__date=today
+                updated_at__gte=today_range[0],
+                updated_at__lt=today_range[1]
             ).order_by('-updated_at')[:5]
             
             # Escalated
@@ -95,14 +101,6 @@ class MunicipalAdminSite(AdminSite):
                 status='escalated'
             ).order_by('-priority', '-created_at')[:5]
             
-            # Calculate SLA breached count
-            sla_breached = 0
-            for c in dept_complaints.filter(status__in=['pending', 'in_progress']):
-                if c.category and hasattr(c.category, 'sla'):
-                    elapsed = (timezone.now() - c.created_at).total_seconds() / 3600
-                    if elapsed > c.category.sla.resolution_hours:
-                        sla_breached += 1
-
             dept_flows.append({
                 'name': dept.name,
                 'icon': dept_icons.get(dept.name, '🏢'),
@@ -139,8 +137,8 @@ class MunicipalAdminSite(AdminSite):
                 ],
                 'escalated_count': escalated.count(),
                 # Summary
-                'total_open': dept_complaints.filter(status__in=['pending', 'in_progress', 'escalated']).count(),
-                'sla_breached': sla_breached,
+                'total_open': open_counts.get(dept.id, 0),
+                'sla_breached': sla_breached.get(dept.id, 0),
             })
 
         extra_context['dept_flows'] = dept_flows
@@ -0,0 +1,118 @@
+"""
+Async versions of the read-heavy public endpoints: home page, categories,
+departments, facility list / detail / nearby.
+
+Only the ASGI server (municipal/asgi.py) routes to them, via
+municipal/asgi_urls.py; there they run on the event loop, next to the
+rest of the app's sync views. WSGI keeps the DRF views in views.py.
+
+Responses are byte-for-byte what the DRF views return: the facility
+querysets come from facility_queries.py, and the serializers and JSON
+renderer are the same. Everything a serializer reads is fetched by the
+async query, so serializing never touches the database on the event loop.
+"""
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from . import facility_queries, reference
+from .models import Complaint, Facility
+from .serializers import FacilitySerializer, FacilityRatingSerializer
+
+
+def json_response(payload, status=status.HTTP_200_OK):
+    return HttpResponse(JSONRenderer().render(payload), status=status, content_type="application/json")
+
+
+# ========================
+# Home Page View
+# ========================
+
+async def home_view(request):
+    """Render the beautiful home page with stats"""
+    context = {
+        'total_complaints': await Complaint.objects.acount(),
+        'total_users': await User.objects.filter(is_active=True).acount(),
+        'total_facilities': await Facility.objects.acount(),
+        'resolved_complaints': await Complaint.objects.filter(status='resolved').acount(),
+    }
+    return render(request, 'home.html', context)
+
+
+# ========================
+# Category & Department Views
+# ========================
+
+@require_GET
+async def category_list_view(request):
+    """List all complaint categories."""
+    return json_response({
+        "success": True,
+        "data": await reference.acategories()
+    })
+
+
+@require_GET
+async def department_list_view(request):
+    """List all departments."""
+    return json_response({
+        "success": True,
+        "data": await reference.adepartments()
+    })
+
+
+# ========================
+# Facility Views
+# ========================
+
+@require_GET
+async def facility_list_view(request):
+    """List all public facilities."""
+    facilities = facility_queries.facility_list(request.GET)
+
+    return json_response({
+        "success": True,
+        "data": FacilitySerializer([f async for f in facilities], many=True).data
+    })
+
+
+@require_GET
+async def facility_detail_view(request, pk):
+    """Get facility details with ratings."""
+    try:
+        facility = await facility_queries.active_facilities().aget(pk=pk)
+    except Facility.DoesNotExist:
+        return json_response({
+            "success": False,
+            "message": "Facility not found"
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    ratings = facility_queries.recent_ratings(facility)
+
+    return json_response({
+        "success": True,
+        "data": {
+            "facility": FacilitySerializer(facility).data,
+            "recent_ratings": FacilityRatingSerializer([r async for r in ratings], many=True).data
+        }
+    })
+
+
+@require_GET
+async def nearby_facilities_view(request):
+    """Get facilities near a location."""
+    try:
+        facilities = facility_queries.nearby_facilities(request.GET)
+    except facility_queries.LocationError as e:
+        return json_response({
+            "success": False,
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    return json_response({
+        "success": True,
+        "data": FacilitySerializer([f async for f in facilities], many=True).data
+    })
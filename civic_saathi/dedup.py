@@ -0,0 +1,178 @@
+"""
+Near-duplicate complaint detection.
+
+Each new complaint's text (title, description, location) is broken into
+per-word character shingles (so word order and small typos matter little)
+and summarised as a MinHash signature. The signature is split into LSH
+bands; each band is hashed together with the department into a bucket key
+and stored in ComplaintLSHBucket. Two complaints that share any bucket key
+are candidates, and only those candidates (found with one indexed lookup,
+limited to the recent window) are compared, instead of comparing the new
+complaint's text against every complaint in the table.
+
+With 16 bands of 4 rows, pairs with a Jaccard similarity around 0.5 collide
+in at least one band about 65% of the time, and at 0.7 about 99%.
+"""
+import hashlib
+import random
+import re
+import struct
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Complaint, ComplaintFingerprint, ComplaintLog, ComplaintLSHBucket
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+STOP_WORDS = frozenset(
+    "a an and are at be by for from has have in is it its near not of on or "
+    "the there this to was with".split()
+)
+
+# Complaints in these states are finished; a new report is a new issue
+CLOSED_STATUSES = ("resolved", "closed")
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Fixed seed: signatures must stay comparable across processes and deploys
+_rng = random.Random(20250131)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+# ========================
+# Signatures
+# ========================
+
+def shingles(complaint):
+    """Character shingles of each (non stop-)word in the complaint's text"""
+    text = f"{complaint.title} {complaint.description} {complaint.location}".lower()
+    words = [w for w in re.findall(r"\w+", text) if w not in STOP_WORDS] or [""]
+    return {
+        word[i:i + SHINGLE_SIZE]
+        for word in words
+        for i in range(max(1, len(word) - SHINGLE_SIZE + 1))
+    }
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=4).digest(), "big")
+
+
+def minhash(shingle_set):
+    hashes = [_hash(s) for s in shingle_set]
+    return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def pack(signature):
+    return struct.pack(f">{NUM_PERM}I", *signature)
+
+
+def unpack(data):
+    return struct.unpack(f">{NUM_PERM}I", bytes(data))
+
+
+def bucket_keys(signature, department_id):
+    """One signed 64-bit key per band, scoped to the department"""
+    packed = pack(signature)
+    width = ROWS * 4
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(
+            f"{department_id}:{band}:".encode() + packed[band * width:(band + 1) * width],
+            digest_size=8
+        ).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+# ========================
+# Index lookups
+# ========================
+
+def find_canonical(complaint, signature, keys):
+    """
+    Id of the open complaint `complaint` duplicates, or None.
+    Duplicates of duplicates resolve to the original complaint.
+    """
+    cutoff = complaint.created_at - timedelta(hours=settings.DEDUP_WINDOW_HOURS)
+    candidates = ComplaintFingerprint.objects.filter(
+        pk__in=ComplaintLSHBucket.objects.filter(
+            key__in=keys, created_at__gte=cutoff
+        ).values("fingerprint_id"),
+        complaint__is_deleted=False,
+        complaint__is_spam=False,
+    ).exclude(
+        complaint__status__in=CLOSED_STATUSES
+    ).exclude(
+        pk=complaint.pk
+    ).values_list("complaint_id", "complaint__duplicate_of_id", "signature")
+
+    best = None
+    for complaint_id, duplicate_of_id, data in candidates:
+        score = similarity(signature, unpack(data))
+        if score < settings.DEDUP_SIMILARITY_THRESHOLD:
+            continue
+        # Highest score wins; ties go to the oldest complaint
+        if best is None or (score, -complaint_id) > (best[0], -best[1]):
+            best = (score, complaint_id, duplicate_of_id)
+
+    if best is None:
+        return None
+    return best[2] or best[1]
+
+
+def register(complaint, link=True):
+    """
+    Fingerprint `complaint`, link it to the complaint it duplicates (if any)
+    and add it to the index. Returns the canonical complaint id or None.
+    """
+    signature = minhash(shingles(complaint))
+    keys = bucket_keys(signature, complaint.department_id)
+    canonical_id = find_canonical(complaint, signature, keys) if link else None
+
+    with transaction.atomic():
+        fingerprint = ComplaintFingerprint.objects.create(
+            complaint=complaint,
+            signature=pack(signature),
+            created_at=complaint.created_at
+        )
+        ComplaintLSHBucket.objects.bulk_create([
+            ComplaintLSHBucket(key=key, fingerprint=fingerprint, created_at=complaint.created_at)
+            for key in keys
+        ])
+        if canonical_id:
+            # update() rather than save(): no post_save emails for a bookkeeping change
+            Complaint.objects.filter(pk=complaint.pk).update(duplicate_of_id=canonical_id)
+            complaint.duplicate_of_id = canonical_id
+            ComplaintLog.objects.create(
+                complaint=complaint,
+                action_by=None,
+                note=f"Linked as duplicate of complaint #{canonical_id}",
+                old_status=complaint.status,
+                new_status=complaint.status
+            )
+
+    if canonical_id:
+        logger.info(f"Dedup: complaint #{complaint.id} linked to #{canonical_id}")
+    return canonical_id
+
+
+def prune(before):
+    """Drop index entries for complaints created before `before`"""
+    buckets, _ = ComplaintLSHBucket.objects.filter(created_at__lt=before).delete()
+    _, deleted = ComplaintFingerprint.objects.filter(created_at__lt=before).delete()
+    return buckets, deleted.get(ComplaintFingerprint._meta.label, 0)
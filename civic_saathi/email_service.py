@@ -6,6 +6,7 @@ from django.core.mail import send_mail, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
+from .metrics import email_send_timer, track_email
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,7 @@ def get_department_head_email(department):
     return None
 
 
+@track_email("complaint_registered")
 def send_complaint_registered_email(complaint):
     """
     Send email notification when a new complaint is registered.
@@ -132,7 +134,8 @@ def send_complaint_registered_email(complaint):
             to=recipients
         )
         email.attach_alternative(html_content, "text/html")
-        email.send(fail_silently=False)
+        with email_send_timer():
+            email.send(fail_silently=False)
         logger.info(f"Complaint registration email sent for #{complaint.id} to {recipients}")
         return True
     except Exception as e:
@@ -140,6 +143,7 @@ def send_complaint_registered_email(complaint):
         return False
 
 
+@track_email("worker_assignment")
 def send_worker_assignment_email(complaint, worker, assigned_by=None):
     """
     Send email notification when a worker is assigned to a complaint.
@@ -286,7 +290,8 @@ def send_worker_assignment_email(complaint, worker, assigned_by=None):
                 to=[complaint.user.email]
             )
             email.attach_alternative(citizen_html, "text/html")
-            email.send(fail_silently=False)
+            with email_send_timer():
+                email.send(fail_silently=False)
             results.append(('citizen', True))
             logger.info(f"Worker assignment email sent to citizen {complaint.user.email}")
         except Exception as e:
@@ -303,7 +308,8 @@ def send_worker_assignment_email(complaint, worker, assigned_by=None):
                 to=[worker.user.email]
             )
             email.attach_alternative(worker_html, "text/html")
-            email.send(fail_silently=False)
+            with email_send_timer():
+                email.send(fail_silently=False)
             results.append(('worker', True))
             logger.info(f"Task assignment email sent to worker {worker.user.email}")
         except Exception as e:
@@ -315,13 +321,14 @@ def send_worker_assignment_email(complaint, worker, assigned_by=None):
         dept_head_email = get_department_head_email(complaint.department)
         if dept_head_email:
             try:
-                send_mail(
-                    subject=f"📊 Assignment Update - #{complaint.id} assigned to {context['worker_name']}",
-                    message=f"Complaint #{complaint.id} ({complaint.title}) has been assigned to {context['worker_name']} ({worker.role}).",
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[dept_head_email],
-                    fail_silently=False
-                )
+                with email_send_timer():
+                    send_mail(
+                        subject=f"📊 Assignment Update - #{complaint.id} assigned to {context['worker_name']}",
+                        message=f"Complaint #{complaint.id} ({complaint.title}) has been assigned to {context['worker_name']} ({worker.role}).",
+                        from_email=settings.DEFAULT_FROM_EMAIL,
+                        recipient_list=[dept_head_email],
+                        fail_silently=False
+                    )
                 results.append(('dept_head', True))
             except Exception as e:
                 results.append(('dept_head', False))
@@ -330,6 +337,7 @@ def send_worker_assignment_email(complaint, worker, assigned_by=None):
     return results
 
 
+@track_email("status_update")
 def send_status_update_email(complaint, old_status, new_status, updated_by=None):
     """
     Send email notification when complaint status changes.
@@ -394,7 +402,8 @@ def send_status_update_email(complaint, old_status, new_status, updated_by=None)
                 to=[complaint.user.email]
             )
             email.attach_alternative(html_content, "text/html")
-            email.send(fail_silently=False)
+            with email_send_timer():
+                email.send(fail_silently=False)
             logger.info(f"Status update email sent for complaint #{complaint.id}")
             return True
         except Exception as e:
@@ -403,6 +412,7 @@ def send_status_update_email(complaint, old_status, new_status, updated_by=None)
     return False
 
 
+@track_email("escalation")
 def send_escalation_email(complaint, escalation):
     """
     Send email notification when a complaint is escalated.
@@ -463,7 +473,8 @@ def send_escalation_email(complaint, escalation):
                 to=recipients
             )
             email.attach_alternative(html_content, "text/html")
-            email.send(fail_silently=False)
+            with email_send_timer():
+                email.send(fail_silently=False)
             logger.info(f"Escalation email sent for complaint #{complaint.id}")
             return True
         except Exception as e:
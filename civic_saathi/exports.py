@@ -0,0 +1,133 @@
+"""
+Streaming CSV / NDJSON export of complaints (and optionally their logs).
+
+Rows are read with `.values_list().iterator(chunk_size=...)` (a server-side
+cursor on PostgreSQL) and written out one line at a time, so memory stays
+flat no matter how many complaints are exported. Log history is fetched
+per chunk with a single query, never per complaint.
+
+Text cells that a spreadsheet would read as a formula (starting with =,
++, -, @, tab or carriage return) are prefixed with ' in the CSV, since
+titles, locations and notes come from citizens.
+"""
+import csv
+import json
+from itertools import islice
+
+from .models import ComplaintLog
+
+DEFAULT_CHUNK_SIZE = 2000
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# (column name, queryset lookup)
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("title", "title"),
+    ("status", "status"),
+    ("priority", "priority"),
+    ("category", "category__name"),
+    ("department", "department__name"),
+    ("officer", "current_officer__user__username"),
+    ("worker", "current_worker__user__username"),
+    ("citizen", "user__username"),
+    ("location", "location"),
+    ("is_spam", "is_spam"),
+    ("is_deleted", "is_deleted"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+]
+
+LOG_COLUMNS = [
+    ("timestamp", "timestamp"),
+    ("action_by", "action_by__username"),
+    ("old_status", "old_status"),
+    ("new_status", "new_status"),
+    ("old_assignee", "old_assignee"),
+    ("new_assignee", "new_assignee"),
+    ("note", "note"),
+]
+
+
+class Echo:
+    """File-like object whose write() just returns the line, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _logs_for(complaint_ids):
+    """Fetch the log history of a chunk of complaints in one query"""
+    history = {cid: [] for cid in complaint_ids}
+    logs = ComplaintLog.objects.filter(complaint_id__in=complaint_ids).order_by(
+        "complaint_id", "timestamp"
+    ).values_list("complaint_id", *[lookup for _, lookup in LOG_COLUMNS])
+    for complaint_id, *values in logs:
+        history[complaint_id].append(dict(zip([name for name, _ in LOG_COLUMNS], values)))
+    return history
+
+
+def iter_complaint_records(queryset, include_logs=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one dict per complaint, streaming from the database in chunks"""
+    names = [name for name, _ in EXPORT_COLUMNS]
+    rows = queryset.order_by("id").values_list(
+        *[lookup for _, lookup in EXPORT_COLUMNS]
+    ).iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        history = _logs_for([row[0] for row in chunk]) if include_logs else {}
+        for row in chunk:
+            record = dict(zip(names, row))
+            record["tracking_id"] = f"CMP-{record['created_at'].year}-{str(record['id']).zfill(5)}"
+            if include_logs:
+                record["history"] = history[record["id"]]
+            yield record
+
+
+def _format_history(entries):
+    return " | ".join(
+        f"{e['timestamp']:%Y-%m-%d %H:%M} {e['old_status'] or '-'}->{e['new_status'] or '-'}"
+        f" by {e['action_by'] or 'System'}{': ' + e['note'] if e['note'] else ''}"
+        for e in entries
+    )
+
+
+def _cell(value):
+    """Neutralise text a spreadsheet would evaluate as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(queryset, include_logs=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the export as CSV lines"""
+    writer = csv.writer(Echo())
+    header = ["tracking_id"] + [name for name, _ in EXPORT_COLUMNS]
+    if include_logs:
+        header.append("history")
+    yield writer.writerow(header)
+
+    for record in iter_complaint_records(queryset, include_logs, chunk_size):
+        row = [record[name] for name in header if name != "history"]
+        if include_logs:
+            row.append(_format_history(record["history"]))
+        yield writer.writerow([_cell(value) for value in row])
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def iter_ndjson(queryset, include_logs=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the export as newline-delimited JSON"""
+    for record in iter_complaint_records(queryset, include_logs, chunk_size):
+        yield json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
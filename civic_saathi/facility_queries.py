@@ -0,0 +1,71 @@
+"""
+The queries behind the public facility endpoints (list, detail, nearby).
+
+Both the DRF views in views.py (WSGI) and their async versions in
+async_views.py (ASGI) build their querysets here, so the two stay in
+step; each side only runs the query (sync or async) and renders.
+Everything FacilitySerializer reads is fetched by these querysets.
+"""
+import math
+
+DEFAULT_RADIUS_KM = 5
+KM_PER_DEGREE = 111  # of latitude, and of longitude at the equator
+
+
+class LocationError(Exception):
+    """Missing or malformed lat/lng/radius; the message is returned to the client"""
+
+
+def active_facilities():
+    """Active facilities with their rating stats and department"""
+    from .models import Facility
+
+    return Facility.objects.filter(is_active=True).with_rating_stats().select_related("department")
+
+
+def facility_list(params):
+    """Active facilities, of `params["type"]` when given"""
+    facilities = active_facilities()
+    facility_type = params.get("type")
+    if facility_type:
+        facilities = facilities.filter(facility_type=facility_type)
+    return facilities
+
+
+def recent_ratings(facility, limit=10):
+    """The facility's latest ratings with their users"""
+    from .models import FacilityRating
+
+    return FacilityRating.objects.filter(facility=facility).select_related("user").order_by("-created_at")[:limit]
+
+
+def nearby_facilities(params):
+    """
+    Active facilities within `params["radius"]` km (default 5) of
+    `params["lat"]`, `params["lng"]`. Raises LocationError on bad input.
+
+    A bounding box, not a circle (for production, use PostGIS). Degrees of
+    longitude shrink with latitude, so the east-west half-width is
+    radius / (111 * cos(lat)).
+    """
+    lat = params.get("lat")
+    lng = params.get("lng")
+    if not lat or not lng:
+        raise LocationError("Latitude and longitude are required")
+    try:
+        lat = float(lat)
+        lng = float(lng)
+        radius = float(params.get("radius", DEFAULT_RADIUS_KM))
+    except ValueError:
+        raise LocationError("Invalid coordinates")
+
+    lat_range = radius / KM_PER_DEGREE
+    lng_range = radius / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return active_facilities().filter(
+        location_lat__isnull=False,
+        location_lng__isnull=False,
+        location_lat__gte=lat - lat_range,
+        location_lat__lte=lat + lat_range,
+        location_lng__gte=lng - lng_range,
+        location_lng__lte=lng + lng_range,
+    )
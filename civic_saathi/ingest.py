@@ -0,0 +1,115 @@
+"""
+Batch complaint ingestion for call-centre and partner imports.
+
+A batch is validated in one pass (categories and citizens are looked up
+once for the whole batch), valid complaints and their initial logs are
+inserted with bulk_create in a single transaction, and registration
+emails are sent in the background after commit instead of one by one
+in post_save.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import Complaint, ComplaintCategory, ComplaintLog
+from .serializers import ComplaintBatchItemSerializer
+from . import tasks
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _int_values(items, key):
+    """Collect the integer values of `key` across a batch, ignoring junk"""
+    values = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            values.add(int(item.get(key)))
+        except (TypeError, ValueError):
+            pass
+    return values
+
+
+def notify_complaints_registered(complaint_ids):
+    """Send registration emails for freshly imported complaints"""
+    from .email_service import send_complaint_registered_email
+
+    complaints = Complaint.objects.filter(id__in=complaint_ids).select_related(
+        'user', 'category', 'department'
+    )
+    for complaint in complaints:
+        try:
+            send_complaint_registered_email(complaint)
+        except Exception as e:
+            logger.error(f"Batch: Failed to send email for complaint #{complaint.id}: {e}")
+
+
+def ingest_complaints(items, submitted_by, source="batch import", notify=True):
+    """
+    Validate and insert a batch of complaints.
+
+    `items` is a list of dicts shaped like the ComplaintCreateView payload;
+    staff submitters may also pass `user_id` to file on behalf of a citizen.
+    Returns one result dict per item, in input order.
+    """
+    categories = ComplaintCategory.objects.select_related('department').in_bulk(
+        _int_values(items, 'category')
+    )
+    users = set()
+    if submitted_by.is_staff:
+        users = set(User.objects.filter(
+            id__in=_int_values(items, 'user_id'), is_active=True
+        ).values_list('id', flat=True))
+
+    validator = ComplaintBatchItemSerializer(context={
+        'categories': categories,
+        'users': users,
+        'can_file_for_others': submitted_by.is_staff,
+    })
+
+    results = []
+    pending = []
+    for index, item in enumerate(items):
+        try:
+            data = validator.run_validation(item)
+        except serializers.ValidationError as e:
+            results.append({"index": index, "success": False, "errors": e.detail})
+            continue
+
+        category = data.get('category')
+        complaint = Complaint(
+            user_id=data.pop('user_id', None) or submitted_by.id,
+            department=category.department if category else None,
+            **data
+        )
+        result = {"index": index, "success": True}
+        results.append(result)
+        pending.append((result, complaint))
+
+    if not pending:
+        return results
+
+    with transaction.atomic():
+        created = Complaint.objects.bulk_create([complaint for _, complaint in pending])
+        ComplaintLog.objects.bulk_create([
+            ComplaintLog(
+                complaint=complaint,
+                action_by=submitted_by,
+                note=f"Complaint registered via {source}",
+                old_status="",
+                new_status="pending"
+            )
+            for complaint in created
+        ])
+        if notify:
+            tasks.defer(notify_complaints_registered, [c.id for c in created])
+
+    for (result, _), complaint in zip(pending, created):
+        result["id"] = complaint.id
+        result["tracking_id"] = f"CMP-{complaint.created_at.year}-{str(complaint.id).zfill(5)}"
+
+    logger.info(f"Batch: {len(created)}/{len(items)} complaints ingested from {source}")
+    return results
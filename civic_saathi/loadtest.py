@@ -0,0 +1,516 @@
+"""
+Load generator for capacity planning (see the loadtest management command).
+
+Virtual users run in threads and pick scenarios at random from a weighted
+mix that approximates production traffic: citizens logging in, listing
+their complaints, filing complaints with a photo, looking up and rating
+nearby facilities, and officers on the admin dashboard and complaint list.
+
+Requests go either through the WSGI handler in-process (django.test.Client,
+the full middleware stack, no network), or over HTTP to a running server,
+e.g. a local gunicorn with the worker count being evaluated. In-process
+runs share one interpreter, so they measure per-request cost rather than
+capacity. Use an HTTP target to size the worker count.
+
+Load-test accounts are named loadtest_*. Everything they create
+(complaints, photos, ratings) is removed by cleanup(). One of them is a
+superuser, so prepare() needs an explicit password and refuses to create
+them on a database that isn't local (SQLite, or PostgreSQL on localhost):
+a killed or --keep-data run must not leave a known login behind on a
+shared database.
+"""
+from collections import defaultdict
+import http.cookiejar
+import io
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.utils import timezone
+
+from .models import Complaint, ComplaintCategory, Department, Facility, ImageHash, Officer
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "loadtest_"
+
+# scenario -> relative weight
+DEFAULT_MIX = {
+    "citizen_login": 5,
+    "my_complaints": 30,
+    "create_complaint": 10,
+    "nearby_facilities": 25,
+    "rate_facility": 10,
+    "officer_dashboard": 5,
+    "officer_changelist": 15,
+}
+
+FACILITY_SCENARIOS = {"nearby_facilities", "rate_facility"}
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def parse_mix(value):
+    """"my_complaints=3,nearby_facilities=1" -> {"my_complaints": 3.0, "nearby_facilities": 1.0}"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.strip().partition("=")
+        if name not in DEFAULT_MIX:
+            raise LoadTestError(f"Unknown scenario {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise LoadTestError(f"Bad weight in {item!r}")
+        if mix[name] < 0:
+            raise LoadTestError(f"Negative weight in {item!r}")
+    if not any(mix.values()):
+        raise LoadTestError("The mix has no scenario with a positive weight")
+    return mix
+
+
+# ========================
+# Accounts and fixture data
+# ========================
+
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+
+
+def is_local_database(settings_dict):
+    return "sqlite" in settings_dict["ENGINE"] or (settings_dict.get("HOST") or "") in LOCAL_HOSTS
+
+
+def check_local_database(using=DEFAULT_DB_ALIAS):
+    """Raise LoadTestError unless `using` is SQLite or a database on this machine"""
+    settings_dict = connections[using].settings_dict
+    if not is_local_database(settings_dict):
+        raise LoadTestError(
+            f"Refusing to create load-test accounts on {settings_dict['HOST']}: point DATABASE_URL "
+            "(or USE_SQLITE=True) at a local copy of the data"
+        )
+
+
+def prepare(citizens, password):
+    """
+    Create (or reuse) the load-test accounts and collect the ids the
+    scenarios need. Returns the fixture dict handed to every virtual user.
+    """
+    if not password:
+        raise LoadTestError("--password is required (the load-test accounts include a superuser)")
+    check_local_database()
+    department = Department.objects.annotate(n=Count("complaint")).order_by("-n", "id").first()
+    if department is None:
+        raise LoadTestError("No departments; load demo data or run generate_dataset first")
+
+    password_hash = make_password(password)
+    usernames = [f"{PREFIX}citizen{n}" for n in range(citizens)]
+    existing = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(username=name, email=f"{name}@example.com", password=password_hash)
+            for name in usernames if name not in existing
+        ])
+        User.objects.filter(username__in=usernames).update(password=password_hash)
+
+        officer_user, _ = User.objects.update_or_create(
+            username=f"{PREFIX}officer",
+            defaults={"email": f"{PREFIX}officer@example.com", "password": password_hash, "is_staff": True},
+        )
+        Officer.objects.update_or_create(
+            user=officer_user, defaults={"department": department, "role": "Load Test Officer"}
+        )
+        admin_user, _ = User.objects.update_or_create(
+            username=f"{PREFIX}admin",
+            defaults={
+                "email": f"{PREFIX}admin@example.com", "password": password_hash,
+                "is_staff": True, "is_superuser": True,
+            },
+        )
+
+    facilities = list(
+        Facility.objects.filter(is_active=True, location_lat__isnull=False, location_lng__isnull=False)
+        .order_by("id").values_list("id", "location_lat", "location_lng")[:200]
+    )
+    return {
+        "citizens": usernames,
+        "officer": officer_user.username,
+        "admin": admin_user.username,
+        "password": password,
+        "facilities": [(pk, float(lat), float(lng)) for pk, lat, lng in facilities],
+        "categories": list(ComplaintCategory.objects.values_list("id", flat=True)),
+    }
+
+
+def cleanup():
+    """Delete the load-test accounts and everything they created. Returns the number of accounts."""
+    users = User.objects.filter(username__startswith=PREFIX)
+    complaints = Complaint.objects.filter(user__in=users)
+    for complaint in complaints.exclude(image="").exclude(image__isnull=True).only("image"):
+        complaint.image.delete(save=False)
+    ImageHash.objects.filter(source="complaint", object_id__in=complaints.values("id")).delete()
+    ImageHash.objects.filter(uploaded_by__in=users).delete()
+    count = users.count()
+    users.delete()
+    return count
+
+
+def photos(seed, count=8):
+    """A few small distinct JPEGs to attach to complaints"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        image = Image.new("RGB", (320, 240), tuple(rng.randrange(256) for _ in range(3)))
+        for _ in range(40):
+            x, y = rng.randrange(300), rng.randrange(220)
+            image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + 20, y + 20))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=80)
+        images.append(buffer.getvalue())
+    return images
+
+
+# ========================
+# Transports
+# ========================
+
+class InProcessTransport:
+    """Requests through the WSGI handler in this process"""
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST=_host())
+
+    def request(self, method, path, *, query=None, data=None, files=None, headers=None):
+        kwargs = {"headers": headers or {}}
+        if method == "GET":
+            response = self.client.get(path, query, **kwargs)
+        elif files:
+            response = self.client.post(path, {**(data or {}), **files}, **kwargs)
+        elif data is not None and path.startswith("/admin/"):
+            response = self.client.post(path, data, **kwargs)
+        else:
+            response = self.client.post(path, json.dumps(data or {}), content_type="application/json", **kwargs)
+        return response.status_code, response.content
+
+    def cookie(self, name):
+        morsel = self.client.cookies.get(name)
+        return morsel.value if morsel else ""
+
+    def close(self):
+        connections.close_all()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpTransport:
+    """Requests over HTTP to a running server; redirects are not followed, as in-process"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect
+        )
+
+    def request(self, method, path, *, query=None, data=None, files=None, headers=None):
+        url = self.base_url + path
+        if query:
+            url += "?" + urllib.parse.urlencode(query)
+        headers = dict(headers or {})
+        body = None
+        if method == "POST":
+            if files:
+                body = encode_multipart(BOUNDARY, {**(data or {}), **files})
+                headers["Content-Type"] = MULTIPART_CONTENT
+            elif path.startswith("/admin/"):
+                body = urllib.parse.urlencode(data or {}).encode()
+                headers["Content-Type"] = "application/x-www-form-urlencoded"
+            else:
+                body = json.dumps(data or {}).encode()
+                headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(url, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def cookie(self, name):
+        return next((c.value for c in self.cookies if c.name == name), "")
+
+    def close(self):
+        pass
+
+
+def _host():
+    """A host name the app accepts, for in-process requests"""
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip(".")
+        if host and "*" not in host:
+            return host
+    return "localhost"
+
+
+# ========================
+# Scenarios
+# ========================
+
+class VirtualUser:
+    """
+    One simulated person: a citizen using the mobile API, who sometimes acts
+    as an officer in the admin. The two get separate clients (cookie jars),
+    as a phone and a desktop browser would.
+    """
+
+    def __init__(self, api, browser, fixture, citizen, rng, photos, recorder):
+        self.api = api
+        self.browser = browser
+        self.fixture = fixture
+        self.citizen = citizen
+        self.rng = rng
+        self.photos = photos
+        self.recorder = recorder
+        self.token = None
+        self.admin_session = False
+
+    def call(self, label, method, path, expect=(200,), **kwargs):
+        transport = self.browser if path.startswith("/admin/") else self.api
+        start = time.perf_counter()
+        try:
+            status, body = transport.request(method, path, **kwargs)
+        except Exception as e:
+            logger.debug(f"Load test: {label} raised {e}")
+            status, body = None, b""
+        self.recorder.record(label, time.perf_counter() - start, status in expect)
+        return status, body
+
+    def auth(self):
+        if self.token is None:
+            citizen_login(self)
+        return {"Authorization": f"Token {self.token}"} if self.token else {}
+
+    def ensure_admin_session(self):
+        if not self.admin_session:
+            self.browser.request("GET", "/admin/login/")
+            status, _ = self.call("officer_login", "POST", "/admin/login/", expect=(302,), data={
+                "username": self.fixture["officer"],
+                "password": self.fixture["password"],
+                "csrfmiddlewaretoken": self.browser.cookie(settings.CSRF_COOKIE_NAME),
+                "next": "/admin/",
+            })
+            self.admin_session = status == 302
+
+
+def citizen_login(user):
+    status, body = user.call("citizen_login", "POST", "/auth/login/", data={
+        "username": user.citizen, "password": user.fixture["password"],
+    })
+    user.token = json.loads(body)["data"]["token"] if status == 200 else None
+
+
+def my_complaints(user):
+    user.call("my_complaints", "GET", "/complaints/", headers=user.auth())
+
+
+def create_complaint(user):
+    rng = user.rng
+    data = {
+        "title": f"Load test complaint {rng.randrange(10**6)}",
+        "description": "Garbage has been piling up near the bus stop for several days now.",
+        "location": f"Ward {rng.randint(1, 150)}",
+        "priority": rng.choice([1, 1, 1, 2, 3]),
+    }
+    if user.fixture["categories"]:
+        data["category"] = rng.choice(user.fixture["categories"])
+    photo = io.BytesIO(rng.choice(user.photos))
+    photo.name = "photo.jpg"
+    user.call("create_complaint", "POST", "/complaints/create/", expect=(201,),
+              data=data, files={"image": photo}, headers=user.auth())
+
+
+def nearby_facilities(user):
+    _, lat, lng = user.rng.choice(user.fixture["facilities"])
+    user.call("nearby_facilities", "GET", "/facilities/nearby/", query={
+        "lat": f"{lat + user.rng.uniform(-0.01, 0.01):.6f}",
+        "lng": f"{lng + user.rng.uniform(-0.01, 0.01):.6f}",
+        "radius": 5,
+    })
+
+
+def rate_facility(user):
+    pk, _, _ = user.rng.choice(user.fixture["facilities"])
+    user.call("rate_facility", "POST", f"/facilities/{pk}/rate/", expect=(201,), data={
+        "cleanliness_rating": user.rng.randint(1, 5), "comment": "Load test rating",
+    }, headers=user.auth())
+
+
+def officer_dashboard(user):
+    user.ensure_admin_session()
+    user.call("officer_dashboard", "GET", "/admin/")
+
+
+def officer_changelist(user):
+    user.ensure_admin_session()
+    user.call("officer_changelist", "GET", "/admin/civic_saathi/complaint/")
+
+
+SCENARIOS = {
+    "citizen_login": citizen_login,
+    "my_complaints": my_complaints,
+    "create_complaint": create_complaint,
+    "nearby_facilities": nearby_facilities,
+    "rate_facility": rate_facility,
+    "officer_dashboard": officer_dashboard,
+    "officer_changelist": officer_changelist,
+}
+
+
+# ========================
+# Running and reporting
+# ========================
+
+class Recorder:
+    """Latencies per endpoint label. Nothing is kept until `recording` is set (after warm-up)."""
+
+    def __init__(self):
+        self.recording = False
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def record(self, label, seconds, ok):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[label].append(seconds)
+            self.count += 1
+            if not ok:
+                self.errors[label] += 1
+
+
+def run(transport_factory, fixture, *, mix, concurrency, duration, warmup=0, requests=None, seed=42):
+    """
+    Drive `concurrency` virtual users until `duration` seconds (or `requests`
+    recorded requests) have passed after the warm-up. Returns summarize()'s result.
+    """
+    if not fixture["facilities"]:
+        mix = {name: weight for name, weight in mix.items() if name not in FACILITY_SCENARIOS}
+        if not any(mix.values()):
+            raise LoadTestError("The mix only has facility scenarios, and there are no facilities with coordinates")
+        logger.warning("Load test: no facilities with coordinates; facility scenarios skipped")
+
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    images = photos(seed)
+    recorder = Recorder()
+    stop = threading.Event()
+
+    def virtual_user(n):
+        rng = random.Random(f"{seed}:{n}")
+        api, browser = transport_factory(), transport_factory()
+        citizen = fixture["citizens"][n % len(fixture["citizens"])]
+        user = VirtualUser(api, browser, fixture, citizen, rng, images, recorder)
+        try:
+            while not stop.is_set():
+                SCENARIOS[rng.choices(names, weights)[0]](user)
+                if requests is not None and recorder.count >= requests:
+                    stop.set()
+        finally:
+            api.close()
+            browser.close()
+
+    threads = [threading.Thread(target=virtual_user, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    stop.wait(warmup)
+    recorder.recording = True
+    start = time.perf_counter()
+    stop.wait(duration)
+    stop.set()
+    elapsed = time.perf_counter() - start
+    for thread in threads:
+        thread.join()
+
+    return summarize(recorder, elapsed)
+
+
+def percentile(ordered, p):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * p / 100
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+def latency_stats(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+def summarize(recorder, elapsed):
+    endpoints = {
+        label: latency_stats(latencies, recorder.errors[label], elapsed)
+        for label, latencies in sorted(recorder.latencies.items())
+    }
+    everything = [seconds for latencies in recorder.latencies.values() for seconds in latencies]
+    return {
+        "finished_at": timezone.now().isoformat(),
+        "duration_s": round(elapsed, 2),
+        "endpoints": endpoints,
+        "total": latency_stats(everything, sum(recorder.errors.values()), elapsed),
+    }
+
+
+def compare(baseline, current, threshold=10.0):
+    """
+    Per-endpoint differences between two results. An endpoint regressed if
+    its p95 rose, or its throughput fell, by more than `threshold` percent.
+    Returns a list of row dicts (label, metric values for both runs, change %, regressed).
+    """
+    def change(before, after):
+        return round((after - before) / before * 100, 1) if before else None
+
+    rows = []
+    labels = sorted(set(baseline["endpoints"]) | set(current["endpoints"])) + ["total"]
+    for label in labels:
+        before = baseline["total"] if label == "total" else baseline["endpoints"].get(label)
+        after = current["total"] if label == "total" else current["endpoints"].get(label)
+        row = {"label": label, "baseline": before, "current": after, "change": {}, "regressed": False}
+        if before and after:
+            for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                row["change"][metric] = change(before[metric], after[metric])
+            p95, rps = row["change"]["p95_ms"], row["change"]["rps"]
+            row["regressed"] = (p95 is not None and p95 > threshold) or (rps is not None and rps < -threshold)
+        rows.append(row)
+    return rows
@@ -6,11 +6,13 @@ Schedule with cron or Windows Task Scheduler for periodic execution.
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from civic_saathi.models import Complaint, ComplaintEscalation, ComplaintLog, Officer
+from civic_saathi.metrics import track_command
 
 
 class Command(BaseCommand):
     help = "Auto-escalate complaints that exceed SLA thresholds"
 
+    @track_command("auto_escalate")
     def handle(self, *args, **options):
         now = timezone.now()
         escalated_count = 0
@@ -21,7 +23,7 @@ class Command(BaseCommand):
             status__in=["pending", "in_progress"],
             is_deleted=False,
             is_spam=False
-        ).select_related("category", "current_officer", "department")
+        ).select_related("category", "current_officer", "department").order_by("created_at")
 
         for complaint in complaints:
             # Skip if no SLA configured
@@ -0,0 +1,160 @@
+"""
+Management command to compare how many concurrent connections one server
+process can serve on the read-heavy public endpoints: ASGI (uvicorn, async
+views) vs WSGI (gunicorn sync worker, DRF views).
+Run via: python manage.py benchmark_async --levels 1,16,64,256 --duration 10 --client-delay-ms 200
+
+Starts each server in turn (--workers processes, default 1, against the
+current database) and, for each concurrency level, keeps that many
+clients requesting the home page, categories, departments and the
+facility list / detail / nearby endpoints for --duration seconds.
+--client-delay-ms makes every client pause halfway through sending its
+request headers, like a phone on a slow network: a sync worker is held
+for the whole pause, the event loop is not.
+
+Reports req/s, p50/p95 latency and errors per level, and the capacity of
+each server: the highest level with no errors and p95 under --p95-limit-ms.
+Needs uvicorn (pip install uvicorn) and some facilities in the database.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import importlib.util
+import json
+import socket
+import sys
+import threading
+import time
+
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from civic_saathi import loadtest
+from civic_saathi.management.commands.loadtest import Command as LoadTestCommand
+from civic_saathi.models import Facility
+
+
+def fetch(port, path, delay, timeout):
+    """One GET over a fresh connection, headers sent in two parts `delay` seconds apart. Returns the status."""
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as sock:
+        sock.sendall(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n".encode())
+        if delay:
+            time.sleep(delay)
+        sock.sendall(b"User-Agent: benchmark_async\r\nConnection: close\r\n\r\n")
+        response = bytearray()
+        while chunk := sock.recv(65536):
+            response += chunk
+    return int(response[9:12])
+
+
+def run_level(port, paths, concurrency, duration, delay, timeout):
+    """`concurrency` clients in a loop for `duration` seconds; latency_stats of the successful requests"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset):
+        nonlocal errors
+        n = offset
+        while time.monotonic() < stop_at:
+            path = paths[n % len(paths)]
+            n += 1
+            start = time.perf_counter()
+            try:
+                ok = fetch(port, path, delay, timeout) == 200
+            except (OSError, ValueError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    return loadtest.latency_stats(latencies, errors, time.monotonic() - start)
+
+
+class Command(LoadTestCommand):
+    help = "Concurrent-connection capacity of the async endpoints per process: ASGI vs WSGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--levels', default='1,16,64,256', help='Concurrent clients per step, comma-separated')
+        parser.add_argument('--duration', type=float, default=10, help='Seconds per step')
+        parser.add_argument('--client-delay-ms', type=float, default=200, help='Pause while sending headers')
+        parser.add_argument('--timeout', type=float, default=10, help='Seconds before a request counts as failed')
+        parser.add_argument('--p95-limit-ms', type=float, default=1000, help='p95 still counted as served')
+        parser.add_argument('--workers', type=int, default=1, help='Processes per server')
+        parser.add_argument('--servers', default='wsgi,asgi', help='Which servers to run: wsgi, asgi or both')
+        parser.add_argument('--output', help='Save the results to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['levels'].split(',')]
+        except ValueError:
+            raise CommandError("--levels must be comma-separated integers")
+        servers = [name.strip() for name in options['servers'].split(',')]
+        if not levels or min(levels) < 1 or not set(servers) <= {'wsgi', 'asgi'}:
+            raise CommandError("--levels must be positive; --servers takes wsgi and/or asgi")
+        if 'asgi' in servers and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError("The ASGI run needs uvicorn: pip install uvicorn")
+
+        facility = Facility.objects.filter(is_active=True, location_lat__isnull=False).first()
+        if facility is None:
+            raise CommandError("No facilities to request; load data first (load_demo_data.py or generate_dataset)")
+        paths = [
+            reverse('home'), reverse('categories'), reverse('departments'), reverse('facilities'),
+            reverse('facility_detail', args=[facility.id]),
+            reverse('nearby_facilities') + f"?lat={facility.location_lat}&lng={facility.location_lng}",
+        ]
+
+        results = {}
+        for name in servers:
+            server, url = self._start(name, options['workers'])
+            port = int(url.rsplit(':', 1)[1])
+            self.stdout.write(f"\n{name.upper()} ({options['workers']} process(es)):")
+            try:
+                results[name] = []
+                for level in levels:
+                    stats = run_level(
+                        port, paths, level, options['duration'],
+                        options['client_delay_ms'] / 1000, options['timeout'],
+                    )
+                    results[name].append({"concurrency": level, **stats})
+                    self._line(level, stats, options)
+            finally:
+                self._stop_server(server)
+
+        self.stdout.write("\nCapacity (most concurrent clients with no errors and p95 within "
+                          f"{options['p95_limit_ms']:g} ms):")
+        for name, steps in results.items():
+            served = [step["concurrency"] for step in steps if self._served(step, options)]
+            self.stdout.write(f"  {name.upper()}: {max(served) if served else 'below ' + str(levels[0])}")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({"options": {key: options[key] for key in (
+                    'levels', 'duration', 'client_delay_ms', 'timeout', 'p95_limit_ms', 'workers'
+                )}, "results": results}, f, indent=2)
+            self.stdout.write(f"\nSaved results to {options['output']}")
+
+    def _start(self, name, workers):
+        if name == 'wsgi':
+            return self._start_gunicorn(workers)
+        port = self._free_port()
+        return self._start_server(
+            [sys.executable, "-m", "uvicorn", "municipal.asgi:application",
+             "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            port, "uvicorn",
+        )
+
+    def _served(self, step, options):
+        return step["errors"] == 0 and step["p95_ms"] <= options['p95_limit_ms']
+
+    def _line(self, level, stats, options):
+        line = (
+            f"  {level:>5} clients  {stats['rps']:>8.1f} req/s  p50 {stats['p50_ms']:>8.1f} ms  "
+            f"p95 {stats['p95_ms']:>8.1f} ms  errors {stats['errors']:>5}"
+        )
+        self.stdout.write(line if self._served(stats, options) else self.style.ERROR(line))
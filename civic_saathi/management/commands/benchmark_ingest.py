@@ -0,0 +1,90 @@
+"""
+Management command to benchmark complaint ingestion throughput.
+Run via: python manage.py benchmark_ingest --count 1000
+
+Compares the one-by-one path used by ComplaintCreateView (serializer,
+insert, log insert, post_save email) with the batch ingestion path, and
+reports complaints/second for each. Everything runs inside a transaction
+that is rolled back, so no data is left behind.
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from civic_saathi.ingest import ingest_complaints
+from civic_saathi.models import ComplaintCategory, ComplaintLog, Department
+from civic_saathi.serializers import ComplaintCreateSerializer
+
+
+class Command(BaseCommand):
+    help = "Measure complaints/second for single vs batch ingestion"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500, help='Complaints per run')
+        parser.add_argument('--batch-size', type=int, default=500, help='Complaints per batch request')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        count = options['count']
+        batch_size = options['batch_size']
+        rng = random.Random(options['seed'])
+
+        # Emails go to memory so SMTP latency doesn't dominate the numbers
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            with transaction.atomic():
+                user = User.objects.create_user(username='benchmark_ingest_user', email='bench@example.com')
+                category_ids = list(ComplaintCategory.objects.values_list('id', flat=True))
+                if not category_ids:
+                    dept = Department.objects.create(name='Benchmark Dept')
+                    category_ids = [ComplaintCategory.objects.create(name='Benchmark', department=dept).id]
+
+                items = [self._item(rng, category_ids, i) for i in range(count)]
+
+                single = self._time(self._ingest_single, items, user)
+                batch = self._time(self._ingest_batch, items, user, batch_size)
+
+                transaction.set_rollback(True)
+
+        self.stdout.write(f"\nIngested {count} complaints per run")
+        for label, elapsed in [("Single (ComplaintCreateView path)", single),
+                               (f"Batch ({batch_size} per request)", batch)]:
+            self.stdout.write(f"  {label:<36} {count / elapsed:10.1f} complaints/s  ({elapsed:.2f}s)")
+        self.stdout.write(self.style.SUCCESS(f"\nSpeed-up: {single / batch:.1f}x"))
+
+    def _item(self, rng, category_ids, i):
+        return {
+            'title': f"Benchmark complaint number {i}",
+            'description': f"Synthetic complaint body used for ingestion benchmark #{i}",
+            'category': rng.choice(category_ids),
+            'location': f"Ward {rng.randint(1, 150)}",
+            'priority': rng.choice([1, 1, 1, 2, 3]),
+        }
+
+    def _time(self, func, *args):
+        start = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - start
+
+    def _ingest_single(self, items, user):
+        for item in items:
+            serializer = ComplaintCreateSerializer(data=item)
+            serializer.is_valid(raise_exception=True)
+            complaint = serializer.save(user=user)
+            ComplaintLog.objects.create(
+                complaint=complaint,
+                action_by=user,
+                note="Complaint registered via mobile app",
+                old_status="",
+                new_status="pending"
+            )
+
+    def _ingest_batch(self, items, user, batch_size):
+        for start in range(0, len(items), batch_size):
+            results = ingest_complaints(items[start:start + batch_size], user, source="benchmark")
+            failed = [r for r in results if not r["success"]]
+            if failed:
+                raise ValueError(f"Benchmark batch had invalid items: {failed[:3]}")
@@ -0,0 +1,93 @@
+"""
+Management command run before gunicorn on every deploy/restart.
+Run via: python manage.py boot
+
+Replaces `python fix_custom_user.py && python manage.py migrate` in the
+Procfile. The schema repairs (civic_saathi/schema.py, also available as
+`repair_schema`) run only when the schema fingerprint differs from the
+one recorded by the last boot, and `migrate` only when migrations are
+pending, so an unchanged database starts with two catalog queries.
+Prints how long each phase took.
+"""
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from civic_saathi import schema
+
+
+class Command(BaseCommand):
+    help = "Repair the schema and migrate, but only when something changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--force', action='store_true', help='Run the repairs even if the fingerprint matches')
+        parser.add_argument('--check', action='store_true', help='Only report drift; exit with an error if there is any')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        self.phases = []
+        started = time.perf_counter()
+
+        with schema.boot_lock(using):
+            rows = self.phase("introspect", schema.catalog, using)
+            current = schema.fingerprint(rows)
+            stored = self.phase("fingerprint", schema.stored_fingerprint, rows, using)
+            drift = current != stored
+            pending = self.phase("plan", schema.pending_migrations, using)
+
+            if options['check']:
+                self.report(started)
+                if drift or pending:
+                    raise CommandError(
+                        f"Schema drift: {'fingerprint changed' if drift else 'fingerprint unchanged'}, "
+                        f"{len(pending)} pending migrations"
+                    )
+                return
+
+            repaired = True
+            if drift or options['force']:
+                skip_apps = {migration.app_label for migration, _backwards in pending}
+                try:
+                    statements = self.phase("repair", schema.repair, rows, using, skip_apps)
+                    self.note(f"{len(statements)} statements applied")
+                except schema.SchemaError as e:
+                    # Start anyway, as before; the next boot tries again
+                    repaired = False
+                    self.phases.append(("repair", None, "rolled back"))
+                    self.stderr.write(str(e))
+            else:
+                self.skip("repair", "fingerprint unchanged")
+
+            if pending:
+                self.phase("migrate", call_command, "migrate", database=using, interactive=False, verbosity=0)
+                self.note(f"{len(pending)} migrations applied")
+            else:
+                self.skip("migrate", "no pending migrations")
+
+            if repaired and (drift or options['force'] or pending):
+                rows = self.phase("re-introspect", schema.catalog, using)
+                self.phase("record", schema.record_fingerprint, schema.fingerprint(rows), using)
+
+        self.report(started)
+
+    def phase(self, name, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.phases.append((name, (time.perf_counter() - start) * 1000, ""))
+        return result
+
+    def skip(self, name, reason):
+        self.phases.append((name, None, reason))
+
+    def note(self, text):
+        name, ms, _ = self.phases[-1]
+        self.phases[-1] = (name, ms, text)
+
+    def report(self, started):
+        for name, ms, note in self.phases:
+            timing = "skipped" if ms is None else f"{ms:8.1f} ms"
+            self.stdout.write(f"  {name:<14} {timing:>11}  {note}".rstrip())
+        total = (time.perf_counter() - started) * 1000
+        self.stdout.write(self.style.SUCCESS(f"Boot checks done in {total:.1f} ms"))
@@ -0,0 +1,24 @@
+"""
+Management command to remove abandoned chunked uploads.
+Run via: python manage.py cleanup_uploads
+Schedule daily with cron to reclaim disk space from unfinished uploads.
+"""
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from civic_saathi.uploads import cleanup_stale_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions (and temp files) that have not been touched recently"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.UPLOAD_SESSION_TTL_HOURS,
+            help='Remove sessions idle for more than this many hours',
+        )
+
+    def handle(self, *args, **options):
+        count = cleanup_stale_sessions(options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} stale upload session(s)"))
@@ -0,0 +1,47 @@
+"""
+Management command to save and restore database snapshots.
+Run via: python manage.py db_snapshot create|restore|delete <tag>
+         python manage.py db_snapshot list
+
+Snapshots live in DB_SNAPSHOT_DIR. SQLite databases are copied with the
+online backup API; PostgreSQL uses pg_dump/pg_restore (custom format).
+`generate_dataset --snapshot` creates and reuses snapshots automatically.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from civic_saathi import snapshots
+
+
+class Command(BaseCommand):
+    help = "Create, restore, list or delete database snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['create', 'restore', 'list', 'delete'])
+        parser.add_argument('tag', nargs='?')
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--jobs', type=int, help='Parallel pg_restore jobs (PostgreSQL only)')
+
+    def handle(self, *args, **options):
+        action, tag, using = options['action'], options['tag'], options['database']
+        if action == 'list':
+            for meta in snapshots.list_snapshots():
+                self.stdout.write(
+                    f"{meta['tag']:<60} {meta['vendor']:<11} {meta['size'] / 2**20:9.1f} MB  {meta['created_at']}"
+                )
+            return
+        if not tag:
+            raise CommandError(f"{action} needs a snapshot tag")
+
+        try:
+            if action == 'create':
+                meta = snapshots.create(tag, using)
+                self.stdout.write(self.style.SUCCESS(f"Saved snapshot {tag} ({meta['size'] / 2**20:.1f} MB)"))
+            elif action == 'restore':
+                snapshots.restore(tag, using, options['jobs'])
+                self.stdout.write(self.style.SUCCESS(f"Restored snapshot {tag}"))
+            elif snapshots.delete(tag):
+                self.stdout.write(self.style.SUCCESS(f"Deleted snapshot {tag}"))
+            else:
+                raise CommandError(f"No snapshot named {tag}")
+        except snapshots.SnapshotError as e:
+            raise CommandError(str(e))
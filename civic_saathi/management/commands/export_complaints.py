@@ -0,0 +1,57 @@
+"""
+Management command to export complaints as CSV or NDJSON.
+Run via: python manage.py export_complaints --format csv --output complaints.csv
+
+Streams rows from the database in chunks, so memory use stays constant
+regardless of how many complaints are exported. Reads from the read
+replica when one is configured (civic_saathi/replica.py).
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from civic_saathi import replica
+from civic_saathi.exports import DEFAULT_CHUNK_SIZE, EXPORT_FORMATS
+from civic_saathi.models import Complaint
+
+
+class Command(BaseCommand):
+    help = "Export complaints (optionally with log history) as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', default='-', help='Output file (default: stdout)')
+        parser.add_argument('--department', type=int, help='Only export this department id')
+        parser.add_argument('--status', help='Only export complaints with this status')
+        parser.add_argument('--logs', action='store_true', help='Include ComplaintLog history')
+        parser.add_argument('--include-deleted', action='store_true', help='Include deleted/spam complaints')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset = Complaint.objects.all()
+        if options['department']:
+            queryset = queryset.filter(department_id=options['department'])
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+        if not options['include_deleted']:
+            queryset = queryset.filter(is_deleted=False, is_spam=False)
+
+        stream, _ = EXPORT_FORMATS[options['format']]
+        lines = stream(queryset, include_logs=options['logs'], chunk_size=options['chunk_size'])
+
+        try:
+            out = sys.stdout if options['output'] == '-' else open(options['output'], 'w', newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f"Cannot open {options['output']}: {e}")
+
+        count = -1 if options['format'] == 'csv' else 0  # don't count the CSV header
+        try:
+            with replica.reads():
+                for line in lines:
+                    out.write(line)
+                    count += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if out is not sys.stdout:
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} complaints to {options['output']}"))
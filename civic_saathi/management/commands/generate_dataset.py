@@ -0,0 +1,129 @@
+"""
+Management command to generate a deterministic synthetic dataset at a chosen scale.
+Run via: python manage.py generate_dataset --complaints 2_000_000 --workers 5000 --days 365
+
+With --processes 1, the same arguments (including --seed, --until and
+--chunk-size) give the same rows. On PostgreSQL the work is split across
+--processes worker processes; ids then depend on which worker inserts
+first, so only single-process datasets are reproducible. SQLite allows
+only one writer, so there it always runs in one process. See
+civic_saathi/synthetic.py for the distributions used.
+
+Synthetic accounts are named syn_*. Use --flush to replace an earlier
+dataset. With --snapshot the database is snapshotted after generation,
+tagged by seed, scale and chunk size (and the process count when it is
+above 1). A later run with the same arguments restores
+that snapshot in seconds instead of generating again. Note that a restore
+replaces the whole database (see db_snapshot).
+
+The dedup index (rebuild_dedup_index) and photo hashes are not built for
+generated complaints.
+"""
+from datetime import date
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from civic_saathi import snapshots, synthetic
+
+
+def count(value):
+    """Accept 2_000_000 / 2,000,000 style numbers"""
+    try:
+        number = int(value.replace(",", "").replace("_", ""))
+    except ValueError:
+        raise ValueError(f"not a number: {value}")
+    if number < 0:
+        raise ValueError("must not be negative")
+    return number
+
+
+class Command(BaseCommand):
+    help = "Generate a seeded synthetic dataset (citizens, workers, complaints, attendance, facilities)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--complaints', type=count, default=50_000)
+        parser.add_argument('--citizens', type=count, help='Default: one per 15 complaints')
+        parser.add_argument('--workers', type=count, default=300)
+        parser.add_argument('--facilities', type=count, help='Default: one per 10 workers')
+        parser.add_argument('--ratings', type=count, help='Default: 20 per facility')
+        parser.add_argument('--days', type=count, default=365, help='History length in days')
+        parser.add_argument('--until', type=date.fromisoformat, help='Last day of the history (YYYY-MM-DD, default today)')
+        parser.add_argument('--wards', type=count, default=150)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--chunk-size', type=count, default=10_000, help='Rows per bulk insert chunk')
+        parser.add_argument('--flush', action='store_true', help='Delete a previously generated dataset first')
+        parser.add_argument(
+            '--snapshot', action='store_true',
+            help='Restore the snapshot for these arguments if there is one, otherwise generate and snapshot'
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['wards'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--days, --wards and --chunk-size must be at least 1")
+
+        complaints = options['complaints']
+        workers = options['workers']
+        facilities = options['facilities'] if options['facilities'] is not None else workers // 10
+        dataset = {
+            'complaints': complaints,
+            'citizens': options['citizens'] if options['citizens'] is not None else max(1, complaints // 15),
+            'workers': workers,
+            'facilities': facilities,
+            'ratings': options['ratings'] if options['ratings'] is not None else facilities * 20,
+            'days': options['days'],
+            'until': options['until'] or timezone.localdate(),
+            'wards': options['wards'],
+            'seed': options['seed'],
+        }
+
+        processes = max(1, options['processes'])
+        if connection.vendor == 'sqlite' and processes > 1:
+            self.stdout.write(self.style.WARNING("SQLite allows one writer at a time; using a single process"))
+            processes = 1
+
+        # Multi-process runs are not reproducible, so they never share a tag with one
+        tag = snapshots.dataset_tag(
+            **dataset, chunk_size=options['chunk_size'], processes=processes if processes > 1 else None
+        )
+        if options['snapshot'] and snapshots.exists(tag):
+            start = time.perf_counter()
+            snapshots.restore(tag)
+            self.stdout.write(self.style.SUCCESS(
+                f"Restored snapshot {tag} in {time.perf_counter() - start:.1f}s"
+            ))
+            return
+
+        if synthetic.synthetic_data_exists():
+            if not options['flush']:
+                raise CommandError("A synthetic dataset already exists; pass --flush to replace it")
+            self.stdout.write("Deleting the previous synthetic dataset...")
+            deleted = synthetic.flush()
+            self.stdout.write(f"  {deleted} synthetic accounts and their data deleted")
+
+        start = time.perf_counter()
+        created = synthetic.generate(
+            **dataset,
+            processes=processes,
+            chunk_size=options['chunk_size'],
+            progress=self._progress,
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write("")
+        for label, rows in created.items():
+            self.stdout.write(f"  {label:<12} {rows:>12,}")
+        self.stdout.write(self.style.SUCCESS(
+            f"\nDataset generated in {elapsed:.1f}s ({sum(created.values()) / elapsed:,.0f} rows/s, {processes} process(es))"
+        ))
+
+        if options['snapshot']:
+            meta = snapshots.create(tag, extra={'rows': created})
+            self.stdout.write(f"Saved snapshot {tag} ({meta['size'] / 2**20:.1f} MB)")
+
+    def _progress(self, label, done, total):
+        self.stdout.write(f"  {label}: {done:,}/{total:,}")
@@ -0,0 +1,45 @@
+"""
+Management command to compute perceptual hashes for existing photos.
+Run via: python manage.py hash_photos
+New uploads are hashed automatically in the background; this backfills
+photos uploaded before hashing existed (or re-hashes with --force).
+"""
+from django.core.management.base import BaseCommand
+
+from civic_saathi.models import ImageHash
+from civic_saathi.photo_hashes import SOURCES, hash_image
+
+
+class Command(BaseCommand):
+    help = "Backfill dHash records for complaint images and facility rating photos"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source',
+            choices=list(SOURCES),
+            help='Only hash photos from this source',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-hash photos that already have a hash',
+        )
+
+    def handle(self, *args, **options):
+        sources = [options['source']] if options['source'] else list(SOURCES)
+
+        for source in sources:
+            model, field_name = SOURCES[source]
+            queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f"{field_name}__isnull": True})
+            if options['force']:
+                ImageHash.objects.filter(source=source).delete()
+            else:
+                queryset = queryset.exclude(
+                    id__in=ImageHash.objects.filter(source=source).values('object_id')
+                )
+
+            hashed = 0
+            for object_id in queryset.values_list('id', flat=True).iterator(chunk_size=1000):
+                if hash_image(source, object_id):
+                    hashed += 1
+            self.stdout.write(self.style.SUCCESS(f"{source}: hashed {hashed} photo(s)"))
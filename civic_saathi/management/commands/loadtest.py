@@ -0,0 +1,236 @@
+"""
+Management command to load-test the app with a realistic traffic mix.
+Run via: python manage.py loadtest --password <password> --concurrency 16 --duration 60 --gunicorn-workers 4 --output w4.json
+
+Targets:
+- default: requests go through the WSGI app in this process. This is good
+  for comparing per-request cost before and after a change.
+- --gunicorn-workers N: starts a local gunicorn with N workers on a free
+  port, against the same database, and load-tests it over HTTP. Use this
+  to size the worker count.
+- --url: an already running server.
+
+Reports throughput and p50/p95/p99 latency per endpoint. --output saves
+the results as JSON. --compare BASELINE.json compares this run with an
+earlier one; --compare A.json B.json compares two saved runs without
+running anything. See civic_saathi/loadtest.py for the scenarios.
+
+Load-test accounts (loadtest_*) and the complaints and ratings they create
+are deleted after the run unless --keep-data is given. --cleanup only
+deletes them, e.g. after an interrupted run. They include a superuser, so
+--password is required and the command refuses to run against a database
+that isn't local.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from civic_saathi import loadtest
+
+
+class Command(BaseCommand):
+    help = "Run a weighted traffic mix against the app and report per-endpoint latency percentiles"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Virtual users (threads)')
+        parser.add_argument('--duration', type=float, default=30, help='Measured seconds (after warm-up)')
+        parser.add_argument('--warmup', type=float, default=5, help='Seconds of unrecorded traffic first')
+        parser.add_argument('--requests', type=int, help='Stop after this many measured requests instead')
+        parser.add_argument(
+            '--mix', type=loadtest.parse_mix, default=loadtest.DEFAULT_MIX,
+            help='Scenario weights, e.g. "my_complaints=3,nearby_facilities=1". Scenarios: '
+                 + ', '.join(loadtest.DEFAULT_MIX)
+        )
+        parser.add_argument('--citizens', type=int, default=50, help='Citizen accounts shared by the virtual users')
+        parser.add_argument('--password', help='Password of the load-test accounts (required)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--url', help='Base URL of a running server (default: in-process)')
+        parser.add_argument('--gunicorn-workers', type=int, help='Start a local gunicorn with this many workers')
+        parser.add_argument('--output', help='Save the results to this JSON file')
+        parser.add_argument(
+            '--compare', nargs='+', metavar='RESULT',
+            help='Baseline JSON to compare this run with, or two JSON files to compare without running'
+        )
+        parser.add_argument('--threshold', type=float, default=10, help='Percent change counted as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the load-test accounts and their data')
+        parser.add_argument('--cleanup', action='store_true', help='Only delete load-test accounts and their data')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.stdout.write(f"Deleted {loadtest.cleanup()} load-test accounts and their data")
+            return
+
+        compare = options['compare'] or []
+        if len(compare) > 2:
+            raise CommandError("--compare takes one baseline, or two results to compare")
+        if len(compare) == 2:
+            self._compare(self._read(compare[0]), self._read(compare[1]), options)
+            return
+        baseline = self._read(compare[0]) if compare else None
+
+        if options['concurrency'] < 1 or options['citizens'] < 1:
+            raise CommandError("--concurrency and --citizens must be at least 1")
+        if options['url'] and options['gunicorn_workers']:
+            raise CommandError("Use either --url or --gunicorn-workers")
+
+        try:
+            fixture = loadtest.prepare(options['citizens'], options['password'])
+        except loadtest.LoadTestError as e:
+            raise CommandError(str(e))
+
+        server = None
+        try:
+            if options['gunicorn_workers']:
+                server, url = self._start_gunicorn(options['gunicorn_workers'])
+                target = f"gunicorn ({options['gunicorn_workers']} workers)"
+            else:
+                url = options['url']
+                target = url or "in-process"
+
+            self.stdout.write(
+                f"Load testing {target}: {options['concurrency']} virtual users, "
+                f"{options['warmup']:g}s warm-up, {options['duration']:g}s measured..."
+            )
+            if url:
+                factory = lambda: loadtest.HttpTransport(url)
+                result = self._run(factory, fixture, options)
+            else:
+                # Emails go nowhere so SMTP latency doesn't dominate the numbers
+                with override_settings(EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend'):
+                    result = self._run(loadtest.InProcessTransport, fixture, options)
+        except loadtest.LoadTestError as e:
+            raise CommandError(str(e))
+        finally:
+            if server is not None:
+                self._stop_server(server)
+            if not options['keep_data']:
+                loadtest.cleanup()
+
+        result["meta"] = {
+            "target": target,
+            "gunicorn_workers": options['gunicorn_workers'],
+            "concurrency": options['concurrency'],
+            "mix": options['mix'],
+            "seed": options['seed'],
+            "database": settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+        }
+        self._report(result)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(result, f, indent=2)
+            self.stdout.write(f"\nSaved results to {options['output']}")
+        if baseline is not None:
+            self._compare(baseline, result, options)
+
+    def _run(self, factory, fixture, options):
+        return loadtest.run(
+            factory, fixture,
+            mix=options['mix'],
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            warmup=options['warmup'],
+            requests=options['requests'],
+            seed=options['seed'],
+        )
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Can't read results from {path}: {e}")
+
+    def _start_gunicorn(self, workers):
+        port = self._free_port()
+        return self._start_server(
+            [sys.executable, "-m", "gunicorn", "municipal.wsgi",
+             "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--timeout", "120"],
+            port, "gunicorn",
+        )
+
+    def _free_port(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
+
+    def _start_server(self, command, port, name):
+        """Start a server process against the same database; returns (process, base URL) once it answers"""
+        url = f"http://127.0.0.1:{port}"
+        # A file, not a pipe: nobody reads the server's log while the test runs
+        log = tempfile.TemporaryFile()
+        server = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=log,
+        )
+        server.log = log
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"{name} exited: {log.read().decode(errors='replace')[-2000:]}")
+            try:
+                urllib.request.urlopen(url + "/", timeout=2).close()
+                return server, url
+            except OSError:
+                time.sleep(0.25)
+        self._stop_server(server)
+        raise CommandError(f"{name} did not start within 60s")
+
+    def _stop_server(self, server):
+        server.terminate()
+        try:
+            server.wait(timeout=35)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+        server.log.close()
+
+    def _report(self, result):
+        rows = list(result["endpoints"].items()) + [("total", result["total"])]
+        width = max(20, *(len(label) for label, _ in rows))
+        self.stdout.write("")
+        self.stdout.write(
+            f"  {'endpoint':<{width}} {'requests':>9} {'errors':>7} {'req/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+        )
+        for label, stats in rows:
+            line = (
+                f"  {label:<{width}} {stats['count']:>9} {stats['errors']:>7} {stats['rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+
+    def _compare(self, baseline, current, options):
+        rows = loadtest.compare(baseline, current, options['threshold'])
+        describe = lambda result: (result.get("meta") or {}).get("target", "?")
+        self.stdout.write(f"\nBaseline: {describe(baseline)}   Current: {describe(current)}")
+        width = max(20, *(len(row["label"]) for row in rows))
+        self.stdout.write(
+            f"  {'endpoint':<{width}} {'req/s':>17} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17}"
+        )
+        for row in rows:
+            if not (row["baseline"] and row["current"]):
+                missing = "baseline" if not row["baseline"] else "current run"
+                self.stdout.write(f"  {row['label']:<{width}} (not in {missing})")
+                continue
+            cells = []
+            for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+                delta = row["change"][metric]
+                cells.append(f"{row['current'][metric]:>8.1f} {'' if delta is None else f'{delta:+.0f}%':>8}")
+            line = f"  {row['label']:<{width}} " + " ".join(cells)
+            self.stdout.write(self.style.ERROR(line + "  REGRESSED") if row["regressed"] else line)
+
+        regressed = [row["label"] for row in rows if row["regressed"]]
+        if regressed and options['fail_on_regression']:
+            raise CommandError(f"Regressed beyond {options['threshold']:g}%: {', '.join(regressed)}")
@@ -6,6 +6,7 @@ Schedule to run daily at end of shift (e.g., 6 PM).
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from civic_saathi.models import Worker, WorkerAttendance
+from civic_saathi.metrics import track_command
 
 
 class Command(BaseCommand):
@@ -18,6 +19,7 @@ class Command(BaseCommand):
             help='Show what would be marked without making changes',
         )
 
+    @track_command("mark_absent_workers")
     def handle(self, *args, **options):
         today = timezone.now().date()
         dry_run = options['dry_run']
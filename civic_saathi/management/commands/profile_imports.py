@@ -0,0 +1,72 @@
+"""
+Management command to profile what a worker imports at startup.
+Run via: python manage.py profile_imports [--module municipal.wsgi] [--top 25]
+
+Starts a fresh interpreter with `python -X importtime`, imports the WSGI
+module (which runs django.setup(): settings, every app's models and
+admin) and, unless --no-urls is given, the URLconf that Django would
+otherwise import on the first request. Prints the slowest modules by
+cumulative and by self time; --output saves the raw -X importtime report.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Report import times of the app's startup (python -X importtime)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='municipal.wsgi')
+        parser.add_argument('--no-urls', action='store_true', help="Don't import the URLconf")
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument('--output', help='Write the raw -X importtime report here')
+
+    def handle(self, *args, **options):
+        code = f"import {options['module']}"
+        if not options['no_urls']:
+            code += "; from django.urls import get_resolver; get_resolver().url_patterns"
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "municipal.settings")}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Import failed:\n{result.stderr[-2000:]}")
+
+        rows = parse(result.stderr)
+        if not rows:
+            raise CommandError("No -X importtime output")
+        if options['output']:
+            Path(options['output']).write_text(result.stderr)
+
+        total = sum(own for own, _, _ in rows)
+        self.stdout.write(f"{len(rows)} modules imported in {total / 1000:.0f} ms ({code})\n")
+        for title, key in (("cumulative", 1), ("self", 0)):
+            self.stdout.write(f"Slowest by {title} time:")
+            for row in sorted(rows, key=lambda row: row[key], reverse=True)[:options['top']]:
+                self.stdout.write(f"  {row[key] / 1000:8.1f} ms  {row[2]}")
+            self.stdout.write("")
+
+        packages = {}
+        for own, _, name in rows:
+            top = name.split(".")[0]
+            packages[top] = packages.get(top, 0) + own
+        self.stdout.write("By top-level package (self time):")
+        for name, own in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]:
+            self.stdout.write(f"  {own / 1000:8.1f} ms  {name}")
+
+
+def parse(report):
+    """(self us, cumulative us, module) for each line of -X importtime output"""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(own), int(cumulative), name.strip()))
+    return rows
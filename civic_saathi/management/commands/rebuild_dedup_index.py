@@ -0,0 +1,52 @@
+"""
+Management command to maintain the near-duplicate complaint index.
+Run via: python manage.py rebuild_dedup_index
+Schedule daily with cron: drops index entries older than the dedup window
+and fingerprints any recent complaints that are missing from it (e.g.
+complaints imported in batches or created before the index existed).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from civic_saathi import dedup
+from civic_saathi.models import Complaint
+
+
+class Command(BaseCommand):
+    help = "Prune and backfill the MinHash/LSH index used for duplicate detection"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=settings.DEDUP_WINDOW_HOURS,
+            help='Keep/backfill complaints created within this many hours',
+        )
+        parser.add_argument(
+            '--link',
+            action='store_true',
+            help='Also link backfilled complaints to earlier duplicates',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+
+        buckets, fingerprints = dedup.prune(cutoff)
+        self.stdout.write(f"Pruned {fingerprints} fingerprint(s) and {buckets} bucket(s) older than {options['hours']}h")
+
+        missing = Complaint.objects.filter(
+            created_at__gte=cutoff, is_deleted=False, fingerprint__isnull=True
+        ).only(
+            'id', 'title', 'description', 'location', 'status', 'department_id', 'duplicate_of_id', 'created_at'
+        ).order_by('created_at')
+
+        indexed = linked = 0
+        for complaint in missing.iterator(chunk_size=500):
+            if dedup.register(complaint, link=options['link'] and not complaint.duplicate_of_id):
+                linked += 1
+            indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} complaint(s), linked {linked} duplicate(s)"))
@@ -0,0 +1,23 @@
+"""
+Management command to (re)create the complaint search index.
+Run via: python manage.py rebuild_search_index
+
+Only needed if the search objects were dropped, e.g. after restoring a
+dump taken without them or after SQLite rebuilt the complaint table.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+from civic_saathi import search
+
+
+class Command(BaseCommand):
+    help = "Recreate the full-text search document/index for complaints"
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            # Triggers are lost whenever SQLite rebuilds the table, so start clean
+            search.uninstall(connection)
+        search.install(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f"Search index ready (backend: {search.backend(connection)})"
+        ))
@@ -0,0 +1,37 @@
+"""
+Management command to delete photo files no complaint or rating uses.
+Run via: python manage.py reclaim_photo_storage --dry-run
+Files are only deleted after checking that no row references them, and
+recent files are left alone (their row may still be uncommitted).
+"""
+from django.core.management.base import BaseCommand
+
+from civic_saathi.photo_hashes import unreferenced_files
+
+
+class Command(BaseCommand):
+    help = "Delete complaint and facility rating photos that no row references"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Only consider files older than this many hours',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List the files without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        count = 0
+        for storage, name in unreferenced_files(options['hours']):
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+            count += 1
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} unreferenced photo(s)"))
@@ -0,0 +1,69 @@
+"""
+Management command to find and fix drift between the database and the models.
+Run via: python manage.py repair_schema [--apply] [--check]
+
+Reads the whole schema in one catalog query, diffs it against the Django
+models and prints the drift and the SQL that fixes it. With --apply the
+SQL runs in a single transaction (all or nothing). Replaces check_tables.py,
+compare_schema.py, fix_db.py, fix_constraints.py and friends; see
+civic_saathi/schema.py for the rules.
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from civic_saathi import schema
+
+
+class Command(BaseCommand):
+    help = "Diff the database schema against the models and repair it"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--apply', action='store_true', help='Run the repair plan (one transaction)')
+        parser.add_argument('--check', action='store_true', help='Exit with an error if anything needs repairing')
+        parser.add_argument('--include-pending', action='store_true',
+                            help="Also repair apps with pending migrations (normally left to migrate)")
+
+    def handle(self, *args, **options):
+        using = options['database']
+        start = time.perf_counter()
+        rows = schema.catalog(using)
+        introspected = time.perf_counter()
+        skip_apps = set() if options['include_pending'] else schema.pending_apps(using)
+        found = schema.drift(rows, skip_apps)
+        self.stdout.write(
+            f"Read {len(schema.relations(rows))} tables/views in {(introspected - start) * 1000:.1f} ms, "
+            f"diffed in {(time.perf_counter() - introspected) * 1000:.1f} ms"
+        )
+        if skip_apps:
+            self.stdout.write(f"Left to migrate (pending migrations): {', '.join(sorted(skip_apps))}")
+
+        needed = [item for item in found if item.kind != "extra_column"]
+        for item in found:
+            self.stdout.write(f"  {item}", self.style.NOTICE if item in needed else None)
+        if not needed:
+            self.stdout.write(self.style.SUCCESS("No schema drift"))
+            return
+
+        try:
+            statements = schema.plan(found, using)
+        except schema.SchemaError as e:
+            raise CommandError(str(e))
+        self.stdout.write("\nPlan:")
+        for sql in statements:
+            self.stdout.write(f"  {' '.join(sql.split())};")
+
+        if options['apply']:
+            start = time.perf_counter()
+            try:
+                schema.apply(statements, using)
+            except schema.SchemaError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"Applied {len(statements)} statements in {(time.perf_counter() - start) * 1000:.1f} ms"
+            ))
+        elif options['check']:
+            raise CommandError(f"{len(needed)} schema differences need repairing")
+        else:
+            self.stdout.write("Dry run; rerun with --apply to execute")
@@ -0,0 +1,151 @@
+"""
+Management command to replay captured production traffic against a local instance.
+Run via: python manage.py replay_traffic traffic/ --password <password> --speed 5 --concurrency 16 --gunicorn-workers 4
+
+Reads the NDJSON files written by TrafficCaptureMiddleware (files or
+directories; several days are merged in time order). It re-issues the
+requests at the captured pace (--speed 1), N times faster (--speed N),
+or as fast as possible (--speed 0). Latency is reported per URL name,
+next to the latency recorded at capture time.
+
+Targets are the same as for loadtest: in-process by default, a local
+gunicorn (--gunicorn-workers) or --url. --output / --compare save and diff
+replay results, so a change can be benchmarked against the same stream.
+See civic_saathi/traffic.py for what is captured and how requests are rebuilt.
+"""
+from itertools import islice
+import json
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from civic_saathi import loadtest, traffic
+from civic_saathi.management.commands.loadtest import Command as LoadTestCommand
+
+
+class Command(LoadTestCommand):
+    help = "Replay captured request shapes and compare latency with capture time or an earlier replay"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Capture files or directories')
+        parser.add_argument('--speed', type=float, default=1, help='Replay speed multiplier; 0 = as fast as possible')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at most')
+        parser.add_argument('--limit', type=int, help='Replay only the first N requests')
+        parser.add_argument('--views', help='Only these URL names, comma-separated')
+        parser.add_argument('--keep-ids', action='store_true', help="Don't remap ids in paths to local rows")
+        parser.add_argument('--citizens', type=int, default=50, help='Citizen accounts to spread requests over')
+        parser.add_argument('--password', help='Password of the load-test accounts (required)')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--url', help='Base URL of a running server (default: in-process)')
+        parser.add_argument('--gunicorn-workers', type=int, help='Start a local gunicorn with this many workers')
+        parser.add_argument('--output', help='Save the results to this JSON file')
+        parser.add_argument('--compare', metavar='RESULT', help='Earlier replay result (JSON) to compare with')
+        parser.add_argument('--threshold', type=float, default=10, help='Percent change counted as a regression')
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--keep-data', action='store_true', help='Keep the load-test accounts and their data')
+
+    def handle(self, *args, **options):
+        if options['speed'] < 0 or options['concurrency'] < 1 or options['citizens'] < 1:
+            raise CommandError("--speed must be >= 0, --concurrency and --citizens at least 1")
+        if options['url'] and options['gunicorn_workers']:
+            raise CommandError("Use either --url or --gunicorn-workers")
+        files = traffic.capture_files(options['paths'])
+        missing = [str(path) for path in files if not path.exists()]
+        if not files or missing:
+            raise CommandError(f"No capture files found{': ' + ', '.join(missing) if missing else ''}")
+        baseline = self._read(options['compare']) if options['compare'] else None
+
+        entries = traffic.read(files)
+        if options['views']:
+            views = {name.strip() for name in options['views'].split(',')}
+            entries = (entry for entry in entries if entry.get('v') in views)
+        if options['limit']:
+            entries = islice(entries, options['limit'])
+
+        try:
+            fixture = traffic.prepare(options['citizens'], options['password'])
+        except loadtest.LoadTestError as e:
+            raise CommandError(str(e))
+
+        server = None
+        try:
+            if options['gunicorn_workers']:
+                server, url = self._start_gunicorn(options['gunicorn_workers'])
+                target = f"gunicorn ({options['gunicorn_workers']} workers)"
+            else:
+                url = options['url']
+                target = url or "in-process"
+
+            speed = f"{options['speed']:g}x speed" if options['speed'] else "full speed"
+            self.stdout.write(f"Replaying {len(files)} capture file(s) against {target} at {speed}...")
+            replay = lambda factory: traffic.replay(
+                factory, fixture, entries,
+                speed=options['speed'],
+                concurrency=options['concurrency'],
+                keep_ids=options['keep_ids'],
+                seed=options['seed'],
+            )
+            if url:
+                result = replay(lambda: loadtest.HttpTransport(url))
+            else:
+                # Emails go nowhere so SMTP latency doesn't dominate the numbers
+                with override_settings(EMAIL_BACKEND='django.core.mail.backends.dummy.EmailBackend'):
+                    result = replay(loadtest.InProcessTransport)
+        finally:
+            if server is not None:
+                self._stop_server(server)
+            if not options['keep_data']:
+                loadtest.cleanup()
+
+        result["meta"] = {
+            "target": target,
+            "gunicorn_workers": options['gunicorn_workers'],
+            "concurrency": options['concurrency'],
+            "speed": options['speed'],
+            "captures": [str(path) for path in files],
+            "database": settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+        }
+        self._report(result)
+
+        if options['output']:
+            self._write(options['output'], result)
+        if baseline is not None:
+            self._compare(baseline, result, options)
+
+    def _write(self, path, result):
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+        self.stdout.write(f"\nSaved results to {path}")
+
+    def _report(self, result):
+        width = max(20, *(len(label) for label in result["endpoints"]))
+        self.stdout.write("")
+        self.stdout.write(
+            f"  {'view':<{width}} {'requests':>8} {'errors':>6} {'mismatch':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'captured p95':>12} {'change':>7}"
+        )
+        for label, stats in result["endpoints"].items():
+            captured = result["captured"].get(label)
+            delta = ""
+            if captured and captured["p95_ms"]:
+                delta = f"{(stats['p95_ms'] - captured['p95_ms']) / captured['p95_ms'] * 100:+.0f}%"
+            line = (
+                f"  {label:<{width}} {stats['count']:>8} {stats['errors']:>6} {result['mismatched'].get(label, 0):>8} "
+                f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                f"{captured['p95_ms'] if captured else 0:>12.1f} {delta:>7}"
+            )
+            self.stdout.write(self.style.ERROR(line) if stats['errors'] else line)
+
+        total = result["total"]
+        self.stdout.write(
+            f"\n  {total['count']} requests in {result['duration_s']}s ({total['rps']} req/s), {total['errors']} errors"
+        )
+        if result["lag"]:
+            self.stdout.write(
+                f"  Sent behind schedule (all workers busy): p95 {result['lag']['p95_ms']} ms, "
+                f"max {result['lag']['max_ms']} ms"
+            )
+        if result["skipped"]:
+            skipped = ", ".join(f"{label} ({n})" for label, n in sorted(result["skipped"].items()))
+            self.stdout.write(f"  Not replayed: {skipped}")
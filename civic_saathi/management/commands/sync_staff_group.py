@@ -0,0 +1,29 @@
+"""
+Management command to sync the "Department Staff" group's permissions.
+Run via: python manage.py sync_staff_group
+
+Sets the group's permissions to exactly those in
+civic_saathi/staff_group.py (creating the group if it is missing). With
+--add-existing, also puts every non-superuser staff account in the group;
+the middleware otherwise does that the first time they open the admin.
+"""
+from django.contrib.auth.models import Group, Permission, User
+from django.core.management.base import BaseCommand
+
+from civic_saathi import staff_group
+
+
+class Command(BaseCommand):
+    help = 'Create/update the "Department Staff" permission group'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--add-existing', action='store_true', help='Add all staff accounts to the group')
+
+    def handle(self, *args, **options):
+        group = staff_group.sync_group(Group, Permission)
+        self.stdout.write(self.style.SUCCESS(
+            f'"{group.name}" has {group.permissions.count()} permissions'
+        ))
+        if options['add_existing']:
+            added = staff_group.add_existing_staff(Group, User)
+            self.stdout.write(f"Added {added} staff accounts to the group")
@@ -0,0 +1,252 @@
+"""
+Prometheus metrics for Civic Saathi, served at /metrics.
+
+- Request latency and DB query count per URL name (MetricsMiddleware)
+- Email send latency / failures per email type (email_service)
+- Complaint backlog and SLA breaches per department (read from the DB at scrape time)
+- Duration and outcome of scheduled management commands
+- Database connection pool size, connections in use, waits and broken connections
+
+Under gunicorn, PROMETHEUS_MULTIPROC_DIR is set by gunicorn.conf.py and
+every worker writes its samples to memory-mapped files in that directory;
+a scrape of any worker aggregates all of them. Cron-run commands (e.g.
+auto_escalate) only show up if they run with the same directory set.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
+import os
+import time
+
+from django.db import connections
+from django.db.models import Count
+from django.utils import timezone
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram,
+    generate_latest, multiprocess
+)
+from prometheus_client.core import GaugeMetricFamily
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+OPEN_STATUSES = ["pending", "assigned", "in_progress", "escalated"]
+
+
+# ========================
+# Metrics
+# ========================
+
+REQUEST_LATENCY = Histogram(
+    "civic_request_duration_seconds",
+    "Time to produce a response, by URL name",
+    ["view", "method", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_QUERIES = Histogram(
+    "civic_request_db_queries",
+    "Database queries per request, by URL name",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250),
+)
+
+EMAIL_LATENCY = Histogram(
+    "civic_email_send_duration_seconds",
+    "Time to hand one notification email to the mail server",
+    ["kind"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+EMAIL_FAILURES = Counter(
+    "civic_email_send_failures_total",
+    "Notification emails the mail server rejected or that errored",
+    ["kind"],
+)
+
+# Which email_service sender is running, so individual sends can be labelled
+_email_kind = ContextVar("email_kind", default="other")
+
+COMMAND_DURATION = Histogram(
+    "civic_command_duration_seconds",
+    "Run time of scheduled management commands",
+    ["command"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800),
+)
+COMMAND_RUNS = Counter(
+    "civic_command_runs_total",
+    "Scheduled management command runs",
+    ["command", "result"],
+)
+COMMAND_LAST_SUCCESS = Gauge(
+    "civic_command_last_success_timestamp_seconds",
+    "Unix time of the last successful run",
+    ["command"],
+    multiprocess_mode="mostrecent",
+)
+
+# Connection pool (DB_POOL_ENABLED). Gauges are summed over worker processes
+DB_POOL_SIZE = Gauge(
+    "civic_db_pool_connections", "Open connections in the pool", ["alias"], multiprocess_mode="livesum"
+)
+DB_POOL_IN_USE = Gauge(
+    "civic_db_pool_connections_in_use", "Connections checked out of the pool", ["alias"], multiprocess_mode="livesum"
+)
+DB_POOL_WAITING = Gauge(
+    "civic_db_pool_requests_waiting", "Threads waiting for a free connection", ["alias"], multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUTS = Counter(
+    "civic_db_pool_checkouts_total", "Connections handed out by the pool", ["alias"]
+)
+DB_POOL_WAIT = Counter(
+    "civic_db_pool_wait_seconds_total", "Time spent waiting for a free connection", ["alias"]
+)
+DB_POOL_TIMEOUTS = Counter(
+    "civic_db_pool_timeouts_total", "Checkouts that gave up waiting (DB_POOL_TIMEOUT)", ["alias"]
+)
+DB_POOL_BAD = Counter(
+    "civic_db_pool_bad_connections_total", "Connections found broken by the health check or on return", ["alias"]
+)
+DB_POOL_OPENED = Counter(
+    "civic_db_pool_connects_total", "Connection attempts to the database by the pool", ["alias"]
+)
+
+
+def observe_request(request, response, duration, queries):
+    match = getattr(request, "resolver_match", None)
+    view = (match.view_name or match.url_name or "unnamed") if match else "unmatched"
+    REQUEST_LATENCY.labels(view, request.method, str(response.status_code)).observe(duration)
+    if queries is not None:  # None: not countable (ASGI)
+        REQUEST_QUERIES.labels(view).observe(queries)
+
+
+def record_pool_stats(alias, stats):
+    """Export one psycopg_pool pop_stats() result (current values plus counters since the last pop)"""
+    DB_POOL_SIZE.labels(alias).set(stats.get("pool_size", 0))
+    DB_POOL_IN_USE.labels(alias).set(stats.get("pool_size", 0) - stats.get("pool_available", 0))
+    DB_POOL_WAITING.labels(alias).set(stats.get("requests_waiting", 0))
+    DB_POOL_CHECKOUTS.labels(alias).inc(stats.get("requests_num", 0))
+    DB_POOL_WAIT.labels(alias).inc(stats.get("requests_wait_ms", 0) / 1000)
+    DB_POOL_TIMEOUTS.labels(alias).inc(stats.get("requests_errors", 0))
+    DB_POOL_BAD.labels(alias).inc(stats.get("returns_bad", 0) + stats.get("connections_lost", 0))
+    DB_POOL_OPENED.labels(alias).inc(stats.get("connections_num", 0))
+
+
+def observe_db_pools():
+    """Called after each request: export the stats of this process's connection pools (if any)"""
+    for connection in connections.all(initialized_only=True):
+        # Only the PostgreSQL backend has pools; `pool` is None unless DB_POOL_ENABLED
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            record_pool_stats(connection.alias, pool.pop_stats())
+
+
+def track_email(kind):
+    """Decorator for email_service senders: labels the sends made inside with `kind`"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _email_kind.set(kind)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _email_kind.reset(token)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def email_send_timer():
+    """Time one email send; count it as failed if it raises"""
+    kind = _email_kind.get()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EMAIL_FAILURES.labels(kind).inc()
+        raise
+    finally:
+        EMAIL_LATENCY.labels(kind).observe(time.perf_counter() - start)
+
+
+def track_command(name):
+    """Decorator for a management command's handle()"""
+    def decorator(handle):
+        @wraps(handle)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = handle(*args, **kwargs)
+            except Exception:
+                COMMAND_RUNS.labels(name, "error").inc()
+                raise
+            finally:
+                COMMAND_DURATION.labels(name).observe(time.perf_counter() - start)
+            COMMAND_RUNS.labels(name, "success").inc()
+            COMMAND_LAST_SUCCESS.labels(name).set_to_current_time()
+            return result
+        return wrapper
+    return decorator
+
+
+# ========================
+# Backlog gauges (computed at scrape time)
+# ========================
+
+def sla_breach_counts(complaints=None, by="department__name"):
+    """
+    {department (`by`): pending/in-progress complaints past their category's resolution SLA}
+    over `complaints` (default: all not deleted). Also feeds the admin dashboard.
+    """
+    from .models import Complaint, SLAConfig
+
+    if complaints is None:
+        complaints = Complaint.objects.filter(is_deleted=False)
+    now = timezone.now()
+    counts = {}
+    # One query per distinct SLA length (a handful), not one per complaint
+    for hours in SLAConfig.objects.values_list("resolution_hours", flat=True).distinct():
+        rows = complaints.filter(
+            status__in=["pending", "in_progress"],
+            category__sla__resolution_hours=hours,
+            created_at__lt=now - timedelta(hours=hours),
+        ).order_by().values_list(by).annotate(n=Count("id"))
+        for department, n in rows:
+            counts[department] = counts.get(department, 0) + n
+    return counts
+
+
+class BacklogCollector:
+    """Open complaints and SLA breaches per department, read from the database"""
+
+    def collect(self):
+        from .models import Complaint
+
+        backlog = GaugeMetricFamily(
+            "civic_open_complaints", "Open complaints per department", labels=["department"]
+        )
+        rows = Complaint.objects.filter(
+            status__in=OPEN_STATUSES, is_deleted=False
+        ).values_list("department__name").annotate(n=Count("id"))
+        for department, n in rows:
+            backlog.add_metric([department or "Unassigned"], n)
+        yield backlog
+
+        breached = GaugeMetricFamily(
+            "civic_sla_breached_complaints", "Open complaints past their resolution SLA", labels=["department"]
+        )
+        for department, n in sla_breach_counts().items():
+            breached.add_metric([department or "Unassigned"], n)
+        yield breached
+
+
+_db_registry = CollectorRegistry()
+_db_registry.register(BacklogCollector())
+
+
+def render():
+    """Exposition text for a scrape, aggregated across worker processes when multiprocess mode is on"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(_db_registry)
@@ -1,95 +1,444 @@
 """
-Middleware to auto-assign permissions to staff users.
-Any user with is_staff=True gets full model access automatically.
-Data filtering is handled at the admin queryset level.
+Middleware for Civic Saathi.
+
+- CivicRoleMiddleware: request.civic_role, the user's officer/worker role and
+  department, resolved lazily once per request (see roles.py).
+- AutoStaffPermissionsMiddleware: puts staff users in the "Department Staff"
+  group, so any user with is_staff=True gets full model access automatically.
+  Data filtering is handled at the admin queryset level.
+- RequestInstrumentationMiddleware: per-request query count, DB time and
+  view time, as a Server-Timing header and a slow-request log.
+- MetricsMiddleware: Prometheus request latency / query count per URL name, pool stats.
+- ProfilingMiddleware: cProfile/tracemalloc reports for staff-flagged or sampled requests.
+- TrafficCaptureMiddleware: sanitized request shapes for replay_traffic.
+- StaticFilesMiddleware: WhiteNoise static files.
+- AsgiUrlconfMiddleware: ASGI requests are resolved with ASGI_URLCONF
+  (async public read views).
+- ReplicaRoutingMiddleware: reads of safe requests go to the read replica,
+  with read-your-writes pins (see replica.py).
+
+The middleware that is on by default also runs natively under ASGI
+(AsyncCapableMiddleware), so the async views aren't pushed back onto a
+thread. RequestInstrumentation and TrafficCapture are sync-only; turning
+them on under ASGI puts every request through Django's single sync thread.
 """
-from django.contrib.auth.models import Permission
-from django.contrib.contenttypes.models import ContentType
+from collections import Counter
+from contextlib import ExitStack
+import heapq
+import json
+import os
+import random
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import StreamingHttpResponse
+from django.utils.functional import SimpleLazyObject
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import replica, roles, staff_group
 
+import logging
 
-class AutoStaffPermissionsMiddleware:
+slow_request_logger = logging.getLogger("civic_saathi.slow_requests")
+
+
+class AsyncCapableMiddleware:
     """
-    Automatically grants model permissions to staff users on login.
-    This ensures all staff see the full admin UI.
+    Base for middleware that runs on the event loop under ASGI (municipal/asgi.py).
+    Django runs sync-only middleware on one shared thread, which would queue
+    every async view behind it. Subclasses implement __call__ for WSGI and
+    __acall__ for ASGI; __call__ hands over with `if self.async_mode`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+
+class CivicRoleMiddleware(AsyncCapableMiddleware):
+    """
+    Sets request.civic_role (a roles.CivicRole), looked up on first use.
+    For API token auth, DRF sets request.user when the view starts, so the
+    role follows the token user as long as it isn't read before that.
+    """
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.civic_role = SimpleLazyObject(lambda: roles.resolve(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Async views don't use it; sync views (run in a thread) resolve it there
+        request.civic_role = SimpleLazyObject(lambda: roles.resolve(request.user))
+        return await self.get_response(request)
+
+
+class AutoStaffPermissionsMiddleware(AsyncCapableMiddleware):
+    """
+    Puts staff users in the "Department Staff" group (civic_saathi/staff_group.py)
+    the first time they open the admin in a session, so all staff see the full admin UI.
     Data isolation is done via get_queryset() in admin classes.
+
+    A marker in the session records that this was done; after that, admin
+    requests cost no extra queries here.
+    """
+    SESSION_KEY = "_staff_provisioned"
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path.startswith('/admin/'):
+            self.provision(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.path.startswith('/admin/'):
+            # Session and user lookups are sync ORM calls
+            await sync_to_async(self.provision)(request)
+        return await self.get_response(request)
+
+    def provision(self, request):
+        if not request.session.get(self.SESSION_KEY):
+            user = request.user
+            if user.is_authenticated and user.is_staff and not user.is_superuser:
+                staff_group.provision(user)
+                request.session[self.SESSION_KEY] = True
+
+
+class QueryStats:
+    """
+    `connection.execute_wrapper` callback that tallies the queries of one request:
+    count, total time, the slowest statements and statements run repeatedly.
+    """
+
+    def __init__(self, keep_slowest=5):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_slowest = keep_slowest
+        self.slowest = []  # min-heap of (duration, sql)
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.duration += elapsed
+            self.statements[sql] += 1
+            entry = (elapsed, sql)
+            if len(self.slowest) < self.keep_slowest:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def repeated(self, minimum=3):
+        """Statements run `minimum`+ times (usually an N+1 loop)"""
+        return [(sql, n) for sql, n in self.statements.most_common(5) if n >= minimum]
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Records query count, DB time and view time for every request.
+
+    Adds a Server-Timing header (visible in browser dev tools) and writes a
+    JSON record to the slow-request log (stderr, or SLOW_REQUEST_LOG_FILE)
+    when a request is slower than SLOW_REQUEST_MS or runs more than
+    SLOW_REQUEST_QUERIES queries.
+    Disabled unless REQUEST_INSTRUMENTATION_ENABLED is set, in which case
+    Django drops it from the chain entirely.
+    Queries run while a streaming response is being consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if os.path.dirname(settings.SLOW_REQUEST_LOG_FILE):
+            os.makedirs(os.path.dirname(settings.SLOW_REQUEST_LOG_FILE), exist_ok=True)
+
+    def __call__(self, request):
+        stats = QueryStats(settings.REQUEST_INSTRUMENTATION_TOP_QUERIES)
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        # View time: from URL resolution until the response came back (includes template rendering)
+        view_start = getattr(request, "_instrumentation_view_start", None)
+        view = time.perf_counter() - view_start if view_start else None
+
+        response["Server-Timing"] = ", ".join(filter(None, [
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"',
+            f"view;dur={view * 1000:.1f}" if view is not None else None,
+            f"total;dur={total * 1000:.1f}",
+        ]))
+
+        if total * 1000 >= settings.SLOW_REQUEST_MS or stats.count >= settings.SLOW_REQUEST_QUERIES:
+            self._log_slow_request(request, response, stats, total, view)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._instrumentation_view_start = time.perf_counter()
+
+    def _log_slow_request(self, request, response, stats, total, view):
+        match = getattr(request, "resolver_match", None)
+        user = getattr(request, "user", None)
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "user_id": user.pk if user is not None and user.is_authenticated else None,
+            "total_ms": round(total * 1000, 1),
+            "view_ms": round(view * 1000, 1) if view is not None else None,
+            "db_ms": round(stats.duration * 1000, 1),
+            "queries": stats.count,
+            "slowest": [
+                {"ms": round(duration * 1000, 1), "sql": sql[:1000]}
+                for duration, sql in sorted(stats.slowest, reverse=True)
+            ],
+            "repeated": [{"count": n, "sql": sql[:1000]} for sql, n in stats.repeated()],
+        }
+        slow_request_logger.warning(json.dumps(record))
+
+
+class MetricsMiddleware(AsyncCapableMiddleware):
+    """
+    Feeds request latency and DB query count per URL name, and connection
+    pool stats, into the Prometheus metrics served at /metrics (see
+    civic_saathi/metrics.py). Dropped from the chain when METRICS_ENABLED is off.
+    Under ASGI queries run on other threads' connections and aren't counted.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        from .metrics import observe_db_pools, observe_request
+
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        observe_request(request, response, time.perf_counter() - start, queries)
+        observe_db_pools()
+        return response
+
+    async def __acall__(self, request):
+        from .metrics import observe_db_pools, observe_request
+
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        observe_request(request, response, time.perf_counter() - start, None)
+        observe_db_pools()
+        return response
+
+
+class ProfilingMiddleware(AsyncCapableMiddleware):
     """
-    
+    Profiles a request when a staff user asks for it (X-Profile header or
+    ?_profile=1), or at random for URL names in PROFILING_SAMPLE_RATES.
+    See civic_saathi/profiling.py. Dropped from the chain when PROFILING_ENABLED is off.
+    """
+
     def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        from . import profiling
+
+        super().__init__(get_response)
+        self.profiling = profiling
+        self.sample_rates = profiling.parse_sample_rates(settings.PROFILING_SAMPLE_RATES)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        mode = self.profiling.requested_mode(request)
+        if mode or self.profiling.sampled(request, self.sample_rates):
+            return self.profile(request, mode, self.get_response)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        mode = self.profiling.requested_mode(request)
+        if mode or self.profiling.sampled(request, self.sample_rates):
+            # The profilers work per thread: run the rest of the chain from one
+            return await sync_to_async(self.profile)(request, mode, async_to_sync(self.get_response))
+        return await self.get_response(request)
+
+    def profile(self, request, mode, get_response):
+        if not mode:
+            user = request.user if request.user.is_authenticated else None
+            return self.profiling.profile(get_response, request, user, "sampled", False)
+        user = self.profiling.staff_user(request)
+        if user is None:
+            return get_response(request)
+        return self.profiling.profile(get_response, request, user, "staff", mode == "all")
+
+
+class TrafficCaptureMiddleware:
+    """
+    Appends the sanitized shape of each sampled request (route, parameters,
+    body size, role, status, timing) to the capture log read by
+    replay_traffic. See civic_saathi/traffic.py. Dropped from the chain
+    unless TRAFFIC_CAPTURE_ENABLED is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TRAFFIC_CAPTURE_ENABLED:
+            raise MiddlewareNotUsed
+        from . import traffic
+
         self.get_response = get_response
-        self._permissions_cache = None
+        self.traffic = traffic
+        self.log = traffic.TrafficLog(settings.TRAFFIC_CAPTURE_DIR)
 
     def __call__(self, request):
-        # Only process for authenticated staff users accessing admin
-        if (request.user.is_authenticated and 
-            request.user.is_staff and 
-            not request.user.is_superuser and
-            request.path.startswith('/admin/')):
-            
-            # Check if user needs permissions (has very few)
-            if request.user.user_permissions.count() < 10:
-                self._assign_staff_permissions(request.user)
-        
+        if random.random() >= settings.TRAFFIC_CAPTURE_SAMPLE_RATE:
+            return self.get_response(request)
+
+        started = time.time()
+        body = self.traffic.body_shape(request)
+        start = time.perf_counter()
         response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        try:
+            entry = self.traffic.record(request, response, started, duration, body)
+            if entry is not None:
+                self.log.write(entry)
+        except Exception as e:
+            slow_request_logger.error(f"Traffic capture failed for {request.path}: {e}")
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, able to run on the event loop under ASGI (WhiteNoise 6 itself
+    is sync-only). There files are looked up and read in worker threads and
+    streamed asynchronously; under WSGI this is plain WhiteNoise.
+
+    The ASGI path uses WhiteNoiseMiddleware internals (files, find_file,
+    autorefresh, StaticFile.get_response), so requirements.txt pins
+    WhiteNoise to 6.x. Replace this with WhiteNoise's own ASGI support
+    once it ships one.
+    """
+    sync_capable = True
+    async_capable = True
+    chunk_size = 64 * 1024
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is None:
+            return await self.get_response(request)
+
+        served = await sync_to_async(static_file.get_response, thread_sensitive=False)(request.method, request.META)
+        response = StreamingHttpResponse(self.read_chunks(served.file), status=int(served.status))
+        del response["Content-Type"]
+        for key, value in served.headers:
+            response[key] = value
         return response
-    
-    def _get_all_permissions(self):
-        """Cache and return all civic_saathi permissions"""
-        if self._permissions_cache is None:
-            from civic_saathi.models import (
-                Complaint, ComplaintCategory, ComplaintLog, ComplaintEscalation,
-                Assignment, Worker, WorkerAttendance, Facility, FacilityInspection,
-                Streetlight, Department, Officer, SLAConfig, FacilityRating
-            )
-            
-            # Full access models
-            full_access = [
-                Complaint, ComplaintCategory, ComplaintLog, ComplaintEscalation,
-                Assignment, Worker, WorkerAttendance, Facility, FacilityInspection,
-                Streetlight, FacilityRating
-            ]
-            
-            # View only models
-            view_only = [Department, Officer, SLAConfig]
-            
-            permissions = []
-            
-            for model in full_access:
-                ct = ContentType.objects.get_for_model(model)
-                for action in ['add', 'change', 'delete', 'view']:
-                    try:
-                        perm = Permission.objects.get(
-                            content_type=ct, 
-                            codename=f"{action}_{model._meta.model_name}"
-                        )
-                        permissions.append(perm)
-                    except Permission.DoesNotExist:
-                        pass
-            
-            for model in view_only:
-                ct = ContentType.objects.get_for_model(model)
-                try:
-                    perm = Permission.objects.get(
-                        content_type=ct,
-                        codename=f"view_{model._meta.model_name}"
-                    )
-                    permissions.append(perm)
-                except Permission.DoesNotExist:
-                    pass
-            
-            # Add user view permission
-            from django.contrib.auth.models import User
-            ct = ContentType.objects.get_for_model(User)
-            try:
-                perm = Permission.objects.get(content_type=ct, codename='view_user')
-                permissions.append(perm)
-            except Permission.DoesNotExist:
-                pass
-            
-            self._permissions_cache = permissions
-        
-        return self._permissions_cache
-    
-    def _assign_staff_permissions(self, user):
-        """Assign all required permissions to a staff user"""
-        permissions = self._get_all_permissions()
-        user.user_permissions.add(*permissions)
+
+    async def read_chunks(self, file):
+        if file is None:  # HEAD, 304
+            return
+        read = sync_to_async(file.read, thread_sensitive=False)
+        try:
+            while chunk := await read(self.chunk_size):
+                yield chunk
+        finally:
+            await sync_to_async(file.close, thread_sensitive=False)()
+
+
+class AsgiUrlconfMiddleware(AsyncCapableMiddleware):
+    """
+    Resolves ASGI requests with settings.ASGI_URLCONF, so the public read
+    endpoints are served by the async views. Django hands async-capable
+    middleware an async get_response exactly when the handler is ASGI, so
+    under WSGI this drops out of the chain.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if not self.async_mode:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        return self.__acall__(request)
+
+    async def __acall__(self, request):
+        request.urlconf = settings.ASGI_URLCONF
+        return await self.get_response(request)
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    """
+    Lets ReplicaRouter send the reads of GET/HEAD/OPTIONS requests to the
+    replica, unless the client is pinned to the primary after a recent
+    write. A request that writes pins its client. Dropped from the chain
+    when no replica is configured.
+    """
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        if not replica.configured():
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with replica.scope(self.allowed(request)) as scope:
+            response = self.get_response(request)
+        if scope.wrote:
+            replica.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        # Sync views run with a copy of this context: they share the Scope object
+        allowed = await sync_to_async(self.allowed)(request)
+        with replica.scope(allowed) as scope:
+            response = await self.get_response(request)
+        if scope.wrote:
+            await sync_to_async(replica.pin)(request, response)
+        return response
+
+    def allowed(self, request):
+        return request.method in self.SAFE_METHODS and not replica.pinned(request)
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    from civic_saathi import search
+    search.install(schema_editor.connection)
+
+
+def uninstall_search(apps, schema_editor):
+    from civic_saathi import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("civic_saathi", "0008_complaint_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
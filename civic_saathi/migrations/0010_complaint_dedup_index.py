@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civic_saathi', '0009_complaint_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintFingerprint',
+            fields=[
+                ('complaint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='fingerprint', serialize=False, to='civic_saathi.complaint')),
+                ('signature', models.BinaryField()),
+                ('created_at', models.DateTimeField(help_text='Copied from the complaint')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='civic_saathi.complaint'),
+        ),
+        migrations.CreateModel(
+            name='ComplaintLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(help_text='Copied from the complaint')),
+                ('fingerprint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='civic_saathi.complaintfingerprint')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'created_at'], name='lsh_bucket_key_idx'), models.Index(fields=['created_at'], name='lsh_bucket_created_idx')],
+            },
+        ),
+    ]
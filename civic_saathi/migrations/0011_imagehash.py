@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civic_saathi', '0010_complaint_dedup_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('complaint', 'Complaint image'), ('facility_rating', 'Facility rating photo')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('file', models.CharField(help_text='Storage name of the hashed file', max_length=255)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('dhash', models.BigIntegerField(help_text='64-bit dHash (signed)')),
+                ('seg0', models.PositiveIntegerField(db_index=True)),
+                ('seg1', models.PositiveIntegerField(db_index=True)),
+                ('seg2', models.PositiveIntegerField(db_index=True)),
+                ('seg3', models.PositiveIntegerField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'object_id'), name='unique_image_hash_per_object')],
+            },
+        ),
+    ]
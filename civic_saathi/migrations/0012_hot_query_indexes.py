@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civic_saathi', '0011_imagehash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['user', '-created_at'], name='complaint_user_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['department', 'status', '-priority', '-created_at'], name='complaint_dept_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'updated_at'], name='complaint_status_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(condition=models.Q(('is_deleted', False), ('is_spam', False), ('status__in', ['pending', 'in_progress'])), fields=['created_at'], name='complaint_sla_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='facilityrating',
+            index=models.Index(fields=['facility', '-created_at'], name='rating_facility_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workerattendance',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+    ]
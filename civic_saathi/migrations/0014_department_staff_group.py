@@ -0,0 +1,73 @@
+from django.db import migrations
+
+# Frozen copy of civic_saathi.staff_group as of this migration. Later changes
+# to GRANTS are applied with `python manage.py sync_staff_group`.
+GROUP_NAME = "Department Staff"
+
+ALL_ACTIONS = ("add", "change", "delete", "view")
+
+GRANTS = [
+    ("civic_saathi", "complaint", ALL_ACTIONS),
+    ("civic_saathi", "complaintcategory", ALL_ACTIONS),
+    ("civic_saathi", "complaintlog", ALL_ACTIONS),
+    ("civic_saathi", "complaintescalation", ALL_ACTIONS),
+    ("civic_saathi", "assignment", ALL_ACTIONS),
+    ("civic_saathi", "worker", ALL_ACTIONS),
+    ("civic_saathi", "workerattendance", ALL_ACTIONS),
+    ("civic_saathi", "facility", ALL_ACTIONS),
+    ("civic_saathi", "facilityinspection", ALL_ACTIONS),
+    ("civic_saathi", "streetlight", ALL_ACTIONS),
+    ("civic_saathi", "facilityrating", ALL_ACTIONS),
+    ("civic_saathi", "department", ("view",)),
+    ("civic_saathi", "officer", ("view",)),
+    ("civic_saathi", "slaconfig", ("view",)),
+    ("auth", "user", ("view",)),
+]
+
+
+def create_group(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    Permission = apps.get_model("auth", "Permission")
+    Group = apps.get_model("auth", "Group")
+    User = apps.get_model("auth", "User")
+
+    # Permissions are normally created after all migrations ran (post_migrate);
+    # on a fresh database they don't exist yet, so create the granted ones here.
+    # post_migrate's create_permissions later skips them and adds the rest.
+    permissions = []
+    for app_label, model_name, actions in GRANTS:
+        content_type, _ = ContentType.objects.get_or_create(app_label=app_label, model=model_name)
+        verbose_name = apps.get_model(app_label, model_name)._meta.verbose_name_raw
+        for action in actions:
+            permission, _ = Permission.objects.get_or_create(
+                content_type=content_type,
+                codename=f"{action}_{model_name}",
+                defaults={"name": f"Can {action} {verbose_name}"},
+            )
+            permissions.append(permission)
+
+    group, _ = Group.objects.get_or_create(name=GROUP_NAME)
+    group.permissions.set(permissions)
+
+    Membership = User.groups.through
+    staff = User.objects.filter(is_staff=True, is_superuser=False).values_list("id", flat=True)
+    Membership.objects.bulk_create(
+        [Membership(user_id=user_id, group_id=group.id) for user_id in staff],
+        ignore_conflicts=True,
+    )
+
+
+def delete_group(apps, schema_editor):
+    apps.get_model("auth", "Group").objects.filter(name=GROUP_NAME).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("civic_saathi", "0013_profilereport"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("contenttypes", "0002_remove_content_type_name"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_group, delete_group),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('civic_saathi', '0014_department_staff_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchemaState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('database', models.CharField(help_text='Database alias', max_length=100, unique=True)),
+                ('fingerprint', models.CharField(help_text='Hash of the introspected tables, views and columns', max_length=64)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
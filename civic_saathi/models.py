@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -104,9 +106,38 @@ class Complaint(models.Model):
     is_deleted = models.BooleanField(default=False)
     is_spam = models.BooleanField(default=False)
 
+    # Set when this complaint reports the same issue as an earlier open one
+    duplicate_of = models.ForeignKey(
+        "self",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="duplicates"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Admin changelist: date_hierarchy and default ordering
+            models.Index(fields=["created_at"], name="complaint_created_at_idx"),
+            models.Index(fields=["-priority", "-created_at", "-id"], name="complaint_admin_order_idx"),
+            # MyComplaintsView: a citizen's complaints, newest first
+            models.Index(fields=["user", "-created_at"], name="complaint_user_feed_idx"),
+            # Dashboard department queues: status filter, priority/age order, LIMIT 5
+            models.Index(fields=["department", "status", "-priority", "-created_at"], name="complaint_dept_queue_idx"),
+            # "Resolved today" counters (status + updated_at range)
+            models.Index(fields=["status", "updated_at"], name="complaint_status_updated_idx"),
+            # auto_escalate / SLA scans: only the (small) set of live open complaints.
+            # Partial index; PostgreSQL uses it, SQLite can't match it against bound parameters
+            models.Index(
+                fields=["created_at"],
+                name="complaint_sla_open_idx",
+                condition=models.Q(status__in=["pending", "in_progress"], is_deleted=False, is_spam=False),
+            ),
+        ]
+
     def save(self, *args, **kwargs):
         if self.category and not self.department:
             self.department = self.category.department
@@ -216,6 +247,10 @@ class WorkerAttendance(models.Model):
         unique_together = ("worker", "date")
         ordering = ["-date"]
         verbose_name_plural = "Worker Attendance"
+        indexes = [
+            # Daily attendance summaries (present/absent counts for a date)
+            models.Index(fields=["date", "status"], name="attendance_date_status_idx"),
+        ]
 
     def __str__(self):
         return f"{self.worker.user.username} - {self.date} ({self.status})"
@@ -224,6 +259,15 @@ class WorkerAttendance(models.Model):
 # -------------------------
 # Facility (Toilets, Buildings, etc.)
 # -------------------------
+class FacilityQuerySet(models.QuerySet):
+    def with_rating_stats(self):
+        """Annotate the rating average/count so listing facilities doesn't query ratings per row"""
+        return self.annotate(
+            rating_avg=models.Avg("public_ratings__cleanliness_rating"),
+            rating_count=models.Count("public_ratings"),
+        )
+
+
 class Facility(models.Model):
     FACILITY_TYPES = [
         ("public_toilet", "Public Toilet"),
@@ -244,6 +288,8 @@ class Facility(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = FacilityQuerySet.as_manager()
+
     class Meta:
         verbose_name_plural = "Facilities"
 
@@ -253,13 +299,16 @@ class Facility(models.Model):
     @property
     def average_rating(self):
         """Get average cleanliness rating from public reviews"""
-        ratings = self.public_ratings.all()
-        if not ratings.exists():
-            return None
-        return round(sum(r.cleanliness_rating for r in ratings) / ratings.count(), 1)
+        if hasattr(self, "rating_avg"):
+            average = self.rating_avg
+        else:
+            average = self.public_ratings.aggregate(average=models.Avg("cleanliness_rating"))["average"]
+        return None if average is None else round(average, 1)
     
     @property
     def total_ratings(self):
+        if hasattr(self, "rating_count"):
+            return self.rating_count
         return self.public_ratings.count()
 
 
@@ -295,6 +344,10 @@ class FacilityRating(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Public Rating"
         verbose_name_plural = "Public Ratings"
+        indexes = [
+            # Facility detail page: latest ratings of one facility
+            models.Index(fields=["facility", "-created_at"], name="rating_facility_recent_idx"),
+        ]
     
     def __str__(self):
         return f"{self.facility.name} - {'⭐' * self.cleanliness_rating} by {self.user or 'Anonymous'}"
@@ -362,3 +415,140 @@ class Streetlight(models.Model):
 
     def __str__(self):
         return f"Pole {self.pole_id} - {self.status}"
+
+
+# -------------------------
+# Resumable Upload Sessions (chunked photo uploads)
+# -------------------------
+class UploadSession(models.Model):
+    """
+    A photo uploaded in chunks over several requests.
+    Once complete, its id can be passed as `upload_id` when creating a complaint.
+    """
+    STATUS_CHOICES = [
+        ("uploading", "Uploading"),
+        ("complete", "Complete"),
+        ("consumed", "Consumed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField(help_text="Size of the complete file in bytes")
+    checksum = models.CharField(max_length=64, help_text="Expected SHA-256 of the complete file (hex)")
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="uploading")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.id} ({self.received_bytes}/{self.total_size} bytes)"
+
+
+# -------------------------
+# Near-duplicate index (MinHash signatures + LSH buckets)
+# -------------------------
+class ComplaintFingerprint(models.Model):
+    """MinHash signature of a complaint's text, see civic_saathi/dedup.py"""
+    complaint = models.OneToOneField(
+        Complaint, on_delete=models.CASCADE, primary_key=True, related_name="fingerprint"
+    )
+    signature = models.BinaryField()
+    created_at = models.DateTimeField(help_text="Copied from the complaint")
+
+    def __str__(self):
+        return f"Fingerprint of complaint #{self.complaint_id}"
+
+
+class ComplaintLSHBucket(models.Model):
+    """
+    One row per (complaint, LSH band). `key` hashes the department and the
+    band's slice of the signature, so complaints sharing a key are candidates.
+    """
+    key = models.BigIntegerField()
+    fingerprint = models.ForeignKey(ComplaintFingerprint, on_delete=models.CASCADE, related_name="buckets")
+    created_at = models.DateTimeField(help_text="Copied from the complaint")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["key", "created_at"], name="lsh_bucket_key_idx"),
+            models.Index(fields=["created_at"], name="lsh_bucket_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"Bucket {self.key} -> #{self.fingerprint_id}"
+
+
+# -------------------------
+# Perceptual image hashes (repost / duplicate photo detection)
+# -------------------------
+class ImageHash(models.Model):
+    """
+    dHash of an uploaded photo, see civic_saathi/photo_hashes.py.
+    The 64-bit hash is also stored as four 16-bit segments so Hamming
+    distance lookups can use plain indexed equality (multi-index hashing).
+    """
+    SOURCE_CHOICES = [
+        ("complaint", "Complaint image"),
+        ("facility_rating", "Facility rating photo"),
+    ]
+
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    file = models.CharField(max_length=255, help_text="Storage name of the hashed file")
+    sha256 = models.CharField(max_length=64, db_index=True)
+    dhash = models.BigIntegerField(help_text="64-bit dHash (signed)")
+    seg0 = models.PositiveIntegerField(db_index=True)
+    seg1 = models.PositiveIntegerField(db_index=True)
+    seg2 = models.PositiveIntegerField(db_index=True)
+    seg3 = models.PositiveIntegerField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["source", "object_id"], name="unique_image_hash_per_object"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} #{self.object_id} ({self.dhash & 0xFFFFFFFFFFFFFFFF:016x})"
+
+
+# -------------------------
+# Request profiles (staff-triggered / sampled, see civic_saathi/profiling.py)
+# -------------------------
+class ProfileReport(models.Model):
+    TRIGGER_CHOICES = [
+        ("staff", "Requested by staff"),
+        ("sampled", "Random sample"),
+    ]
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    trigger = models.CharField(max_length=20, choices=TRIGGER_CHOICES)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    cpu_report = models.TextField(help_text="cProfile stats, sorted by cumulative time")
+    alloc_report = models.TextField(blank=True, help_text="Top allocation sites (tracemalloc)")
+    raw_profile = models.BinaryField(help_text="pstats dump, loadable with pstats/snakeviz")
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+# -------------------------
+# Schema fingerprint (written by `manage.py boot`, see civic_saathi/schema.py)
+# -------------------------
+class SchemaState(models.Model):
+    database = models.CharField(max_length=100, unique=True, help_text="Database alias")
+    fingerprint = models.CharField(max_length=64, help_text="Hash of the introspected tables, views and columns")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.database}: {self.fingerprint[:12]}"
@@ -0,0 +1,70 @@
+"""
+Paginators for admin changelists on large tables.
+
+Django's default paginator runs an exact COUNT(*) on every page load,
+which on PostgreSQL means scanning the whole table (or filtered subset).
+EstimatedCountPaginator uses the planner's row estimate instead once the
+table is large enough that an exact count no longer matters to the user.
+"""
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_count(queryset):
+    """
+    Planner estimate of the number of rows in `queryset` (PostgreSQL only).
+
+    Unfiltered querysets read pg_class.reltuples; filtered ones read the
+    row estimate from EXPLAIN. Returns None when no estimate is available
+    (other databases, never-analysed tables, errors).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    try:
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+                estimate = row[0] if row else None
+            else:
+                sql, params = queryset.order_by().query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                estimate = plan[0]["Plan"]["Plan Rows"]
+    except Exception as e:
+        logger.warning(f"Row estimate failed for {queryset.model.__name__}: {e}")
+        return None
+
+    # reltuples is -1 until the table has been vacuumed/analysed
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that trusts the planner's estimate on big tables.
+    Small results (below ADMIN_EXACT_COUNT_THRESHOLD) and SQLite get an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimate
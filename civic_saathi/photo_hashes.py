@@ -0,0 +1,228 @@
+"""
+Perceptual hashes of uploaded photos (Complaint.image, FacilityRating.photo).
+
+Each photo gets a 64-bit dHash: the image is shrunk to 9x8 greyscale and
+each bit records whether a pixel is brighter than its right-hand neighbour,
+so re-encoded, resized or lightly edited copies of a photo hash to the same
+or nearly the same value.
+
+Lookups use multi-index hashing: the hash is stored as four 16-bit segments,
+each indexed. Two hashes within Hamming distance 3 must agree exactly on at
+least one segment, so an OR of four indexed equality lookups finds every
+candidate and only those are compared bit by bit.
+
+Hashing runs in the background after a new photo is saved (see signals.py).
+Byte-identical uploads share a sha256, and a citizen reposting their own
+photo on a new complaint gets that complaint flagged as spam for review.
+Stored files are never touched here: rows held in memory elsewhere would
+write their old photo name back. `python manage.py reclaim_photo_storage`
+deletes photo files that no row references, offline.
+"""
+from datetime import timedelta
+import hashlib
+import io
+from itertools import islice
+import posixpath
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Complaint, ComplaintLog, FacilityRating, ImageHash
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8
+SEGMENTS = 4
+SEGMENT_BITS = 64 // SEGMENTS
+# Pigeonhole limit: with 4 segments only distances up to 3 are found exactly
+MAX_DISTANCE = SEGMENTS - 1
+
+# source -> (model, file field)
+SOURCES = {
+    "complaint": (Complaint, "image"),
+    "facility_rating": (FacilityRating, "photo"),
+}
+
+
+# ========================
+# Hashing
+# ========================
+
+def dhash(data):
+    """64-bit difference hash of an image given as bytes"""
+    # Pillow is only needed in the background hashing thread, not to serve requests
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        pixels = list(
+            image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS).getdata()
+        )
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def segments(value):
+    mask = (1 << SEGMENT_BITS) - 1
+    return [(value >> (SEGMENT_BITS * i)) & mask for i in range(SEGMENTS)]
+
+
+def to_signed(value):
+    """Store the unsigned 64-bit hash in a signed BIGINT column"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value):
+    return value & 0xFFFFFFFFFFFFFFFF
+
+
+def hamming(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count("1")
+
+
+# ========================
+# Index lookups
+# ========================
+
+def find_similar(value, max_distance=MAX_DISTANCE, queryset=None):
+    """
+    Hashes within `max_distance` bits of `value`, closest first,
+    as a list of (ImageHash, distance).
+    """
+    if max_distance > MAX_DISTANCE:
+        raise ValueError(f"max_distance can be at most {MAX_DISTANCE}")
+
+    value = to_unsigned(value)
+    lookup = Q()
+    for i, segment in enumerate(segments(value)):
+        lookup |= Q(**{f"seg{i}": segment})
+
+    queryset = ImageHash.objects.all() if queryset is None else queryset
+    matches = []
+    for candidate in queryset.filter(lookup).select_related("uploaded_by"):
+        distance = hamming(value, candidate.dhash)
+        if distance <= max_distance:
+            matches.append((candidate, distance))
+    matches.sort(key=lambda m: (m[1], m[0].created_at))
+    return matches
+
+
+# ========================
+# Background task
+# ========================
+
+def hash_image(source, object_id):
+    """
+    Hash the photo attached to `source` #`object_id` and record it.
+    Skips work if the stored hash is already for the current file.
+    """
+    model, field_name = SOURCES[source]
+    obj = model.objects.filter(pk=object_id).first()
+    if obj is None:
+        return None
+
+    field = getattr(obj, field_name)
+    existing = ImageHash.objects.filter(source=source, object_id=object_id).first()
+    if not field:
+        if existing:
+            existing.delete()
+        return None
+    if existing and existing.file == field.name:
+        return existing
+
+    with field.open("rb") as f:
+        data = f.read()
+    try:
+        value = dhash(data)
+    except Exception as e:
+        logger.warning(f"Image hash: could not read {field.name}: {e}")
+        return None
+    sha256 = hashlib.sha256(data).hexdigest()
+
+    record, _ = ImageHash.objects.update_or_create(
+        source=source,
+        object_id=object_id,
+        defaults={
+            "uploaded_by_id": obj.user_id,
+            "file": field.name,
+            "sha256": sha256,
+            "dhash": to_signed(value),
+            **{f"seg{i}": segment for i, segment in enumerate(segments(value))},
+        },
+    )
+
+    if source == "complaint":
+        _flag_repost(obj, record)
+    return record
+
+
+def _flag_repost(complaint, record):
+    """Flag a complaint whose photo the same citizen already used on another complaint"""
+    if complaint.is_spam or not complaint.user_id:
+        return
+    reposts = [
+        match for match, _ in find_similar(
+            record.dhash,
+            settings.IMAGE_REPOST_MAX_DISTANCE,
+            ImageHash.objects.filter(source="complaint", uploaded_by_id=complaint.user_id).exclude(pk=record.pk),
+        )
+    ]
+    if not reposts:
+        return
+
+    with transaction.atomic():
+        Complaint.objects.filter(pk=complaint.pk).update(is_spam=True)
+        ComplaintLog.objects.create(
+            complaint=complaint,
+            action_by=None,
+            note=f"Flagged as spam: photo matches complaint #{reposts[0].object_id} by the same citizen",
+            old_status=complaint.status,
+            new_status=complaint.status
+        )
+    logger.info(f"Image hash: complaint #{complaint.id} flagged as repost of #{reposts[0].object_id}")
+
+
+# ========================
+# Storage reclaim (offline)
+# ========================
+
+def _stored_files(storage, directory):
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(directory, name)
+    for subdirectory in directories:
+        yield from _stored_files(storage, posixpath.join(directory, subdirectory))
+
+
+def unreferenced_files(min_age_hours=24, batch_size=500):
+    """
+    (storage, name) of photo files no row points at. Files younger than
+    `min_age_hours` are skipped: their row may not be committed yet.
+    """
+    cutoff = timezone.now() - timedelta(hours=min_age_hours)
+    for model, field_name in SOURCES.values():
+        field = model._meta.get_field(field_name)
+        names = (
+            name for name in _stored_files(field.storage, field.upload_to.rstrip("/"))
+            if field.storage.get_modified_time(name) < cutoff
+        )
+        while True:
+            batch = list(islice(names, batch_size))
+            if not batch:
+                break
+            referenced = set(model.objects.filter(**{f"{field_name}__in": batch}).values_list(field_name, flat=True))
+            for name in batch:
+                if name not in referenced:
+                    yield field.storage, name
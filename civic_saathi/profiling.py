@@ -0,0 +1,157 @@
+"""
+On-demand request profiling.
+
+A staff user adds `X-Profile: 1` (or `?_profile=1`) to a request, and that
+request runs under cProfile with tracemalloc tracking allocations. The
+report is stored as a ProfileReport for download from the admin. Use
+`X-Profile: cpu` to skip tracemalloc, which slows the request down a lot.
+
+Requests can also be profiled at random for chosen URL names
+(PROFILING_SAMPLE_RATES, e.g. "my_complaints=0.01"). Sampled requests get
+cProfile only.
+
+Off by default: set PROFILING_ENABLED to turn it on. When it is off,
+ProfilingMiddleware is removed from the chain at startup.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+from .models import ProfileReport
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+QUERY_PARAM = "_profile"
+
+# tracemalloc is process-wide; only one request at a time may use it
+_tracemalloc_lock = threading.Lock()
+
+
+def parse_sample_rates(value):
+    """"my_complaints=0.01,municipal_admin:index=0.05" -> {"my_complaints": 0.01, ...}"""
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.strip().rpartition("=")
+        if name:
+            try:
+                rates[name] = max(0.0, min(1.0, float(rate)))
+            except ValueError:
+                logger.warning(f"Profiling: ignoring bad sample rate {item!r}")
+    return rates
+
+
+def requested_mode(request):
+    """'all', 'cpu' or None, from the header / query parameter"""
+    value = request.headers.get(HEADER) or request.GET.get(QUERY_PARAM)
+    if not value or value.lower() in ("0", "false", "off"):
+        return None
+    return "cpu" if value.lower() == "cpu" else "all"
+
+
+def staff_user(request):
+    """
+    The staff user making the request, or None.
+    API clients authenticate with a DRF token, which AuthenticationMiddleware
+    doesn't know about, so check that too (only for requests asking to be profiled).
+    """
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        user = None
+        auth = request.headers.get("Authorization", "").split()
+        if len(auth) == 2 and auth[0] == "Token":
+            from rest_framework.authtoken.models import Token
+            token = Token.objects.select_related("user").filter(key=auth[1]).first()
+            user = token.user if token else None
+    if user is not None and user.is_active and user.is_staff:
+        return user
+    return None
+
+
+def sampled(request, rates):
+    if not rates:
+        return False
+    try:
+        view_name = resolve(request.path_info).view_name
+    except Resolver404:
+        return False
+    rate = rates.get(view_name)
+    return bool(rate) and random.random() < rate
+
+
+def profile(get_response, request, user, trigger, allocations):
+    """Run the request under the profiler(s) and store a ProfileReport"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active on this thread; like a busy tracemalloc, not an error
+        logger.warning(f"Profiling: another profiler is active, serving {request.path} unprofiled")
+        return get_response(request)
+
+    trace_allocations = allocations and _tracemalloc_lock.acquire(blocking=False)
+    try:
+        if trace_allocations:
+            tracemalloc.start(settings.PROFILING_TRACEMALLOC_FRAMES)
+        start = time.perf_counter()
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot() if trace_allocations else None
+    finally:
+        if trace_allocations:
+            tracemalloc.stop()
+            _tracemalloc_lock.release()
+
+    try:
+        report = _save_report(request, response, user, trigger, duration, profiler, snapshot)
+        response[f"{HEADER}-Report"] = str(report.pk)
+    except Exception as e:
+        logger.error(f"Profiling: failed to save report for {request.path}: {e}")
+    return response
+
+
+def _save_report(request, response, user, trigger, duration, profiler, snapshot):
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(settings.PROFILING_REPORT_LINES)
+
+    alloc_report = ""
+    if snapshot is not None:
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        top = snapshot.statistics("lineno")[:settings.PROFILING_REPORT_LINES]
+        alloc_report = "\n".join(str(stat) for stat in top)
+
+    match = getattr(request, "resolver_match", None)
+    report = ProfileReport.objects.create(
+        user=user,
+        trigger=trigger,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view_name=match.view_name if match else "",
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        cpu_report=stream.getvalue(),
+        alloc_report=alloc_report,
+        raw_profile=marshal.dumps(stats.stats),
+    )
+
+    # Keep the table bounded
+    stale = ProfileReport.objects.order_by("-created_at").values_list("pk", flat=True)[settings.PROFILING_MAX_REPORTS:]
+    ProfileReport.objects.filter(pk__in=list(stale)).delete()
+    return report
@@ -0,0 +1,72 @@
+"""
+Reference data that nearly every client fetches and that rarely changes:
+the complaint category and department lists, serialized as the public
+list endpoints return them.
+
+They are cached for REFERENCE_CACHE_SECONDS in the default cache and
+dropped when a category or department is saved or deleted (see
+signals.py). With a per-process cache (no REDIS_URL) only the worker that
+saved the change drops its entry, so the TTL defaults to 30 seconds
+instead of an hour: other workers show a rename at most that late.
+warmup.py fills them when a worker starts.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+CATEGORIES_KEY = "reference:categories"
+DEPARTMENTS_KEY = "reference:departments"
+
+
+def categories():
+    """CategorySerializer data for all complaint categories"""
+    data = cache.get(CATEGORIES_KEY)
+    if data is None:
+        from .models import ComplaintCategory
+        from .serializers import CategorySerializer
+
+        data = CategorySerializer(ComplaintCategory.objects.select_related("department"), many=True).data
+        cache.set(CATEGORIES_KEY, data, settings.REFERENCE_CACHE_SECONDS)
+    return data
+
+
+def departments():
+    """DepartmentSerializer data for all departments"""
+    data = cache.get(DEPARTMENTS_KEY)
+    if data is None:
+        from .models import Department
+        from .serializers import DepartmentSerializer
+
+        data = DepartmentSerializer(Department.objects.all(), many=True).data
+        cache.set(DEPARTMENTS_KEY, data, settings.REFERENCE_CACHE_SECONDS)
+    return data
+
+
+async def acategories():
+    """categories() for async views"""
+    data = await cache.aget(CATEGORIES_KEY)
+    if data is None:
+        from .models import ComplaintCategory
+        from .serializers import CategorySerializer
+
+        rows = [category async for category in ComplaintCategory.objects.select_related("department")]
+        data = CategorySerializer(rows, many=True).data
+        await cache.aset(CATEGORIES_KEY, data, settings.REFERENCE_CACHE_SECONDS)
+    return data
+
+
+async def adepartments():
+    """departments() for async views"""
+    data = await cache.aget(DEPARTMENTS_KEY)
+    if data is None:
+        from .models import Department
+        from .serializers import DepartmentSerializer
+
+        rows = [department async for department in Department.objects.all()]
+        data = DepartmentSerializer(rows, many=True).data
+        await cache.aset(DEPARTMENTS_KEY, data, settings.REFERENCE_CACHE_SECONDS)
+    return data
+
+
+def invalidate():
+    # Category data embeds the department, so both go together
+    cache.delete_many([CATEGORIES_KEY, DEPARTMENTS_KEY])
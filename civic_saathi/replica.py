@@ -0,0 +1,173 @@
+"""
+Read replica routing. Set REPLICA_DATABASE_URL to add a "replica" database;
+settings.py then installs ReplicaRouter and ReplicaRoutingMiddleware sends:
+
+- reads of GET/HEAD/OPTIONS requests (home page counts, facility and
+  category lists, the admin dashboard and changelists) to the replica,
+- everything else, every write, and reads inside a transaction on the
+  primary to the primary.
+
+Read-your-writes: once a request writes, the rest of it reads from the
+primary, and the client is pinned to the primary for REPLICA_PIN_SECONDS
+(keyed by its token, session or address in the default cache, plus a
+cookie for browsers). A complaint created with ComplaintCreateView shows
+up in the next MyComplaintsView call. The pins must reach every worker, so
+settings.py refuses a replica when gunicorn runs more than one worker
+without a shared cache (REDIS_URL). Tokens and sessions are always read
+from the primary, so a fresh login is never missing on the replica.
+
+The replica's lag is checked at most every REPLICA_LAG_CHECK_SECONDS per
+process. When it is behind by more than REPLICA_MAX_LAG_SECONDS, or
+can't be reached, reads fall back to the primary.
+
+Outside requests (management commands, background tasks) reads go to the
+primary unless wrapped in `with replica.reads():`, e.g. reporting exports.
+
+Locally: copy db.sqlite3 to replica.sqlite3 and run with
+USE_SQLITE=True REPLICA_DATABASE_URL=sqlite:///replica.sqlite3.
+ReplicaRoutingTests add a replica that mirrors the test database.
+"""
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "primary_pin"
+CACHE_PREFIX = "replica_pin:"
+
+# Auth lookups must see logins/logouts immediately: always read from the primary
+PRIMARY_ONLY_MODELS = {"authtoken.token", "sessions.session"}
+
+LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+
+
+class Scope:
+    """Routing state of one request (or `reads()` block)"""
+    __slots__ = ("allowed", "wrote")
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.wrote = False
+
+
+_scope = ContextVar("replica_scope", default=None)
+
+# Per process: (monotonic time of the last check, lag in seconds or None if unreachable)
+_lag = [float("-inf"), None]
+
+
+def configured():
+    return settings.REPLICA_DATABASE_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def scope(allowed):
+    """Route the reads inside to the replica (if `allowed`) until something writes"""
+    current = Scope(allowed)
+    token = _scope.set(current)
+    try:
+        yield current
+    finally:
+        _scope.reset(token)
+
+
+def reads():
+    """Replica reads for reporting code that runs outside a request"""
+    return scope(True)
+
+
+# ========================
+# Replica health
+# ========================
+
+def replica_lag():
+    """Seconds the replica is behind (0 when caught up), or None if it can't be reached. Cached briefly."""
+    now = time.monotonic()
+    if now - _lag[0] < settings.REPLICA_LAG_CHECK_SECONDS:
+        return _lag[1]
+    connection = connections[settings.REPLICA_DATABASE_ALIAS]
+    try:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_SQL)
+                lag = float(cursor.fetchone()[0] or 0)
+        else:
+            connection.ensure_connection()
+            lag = 0.0
+    except Exception as e:
+        logger.warning(f"Replica: unreachable, reading from the primary: {e}")
+        lag = None
+    _lag[:] = [now, lag]
+    return lag
+
+
+def healthy():
+    lag = replica_lag()
+    return lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+# ========================
+# Read-your-writes pins
+# ========================
+
+def client_key(request):
+    """Who the request comes from: API token, session cookie or address"""
+    identity = (
+        request.META.get("HTTP_AUTHORIZATION")
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        or request.META.get("REMOTE_ADDR", "")
+    )
+    return CACHE_PREFIX + hashlib.sha256(identity.encode()).hexdigest()[:32]
+
+
+def pinned(request):
+    return PIN_COOKIE in request.COOKIES or cache.get(client_key(request)) is not None
+
+
+def pin(request, response):
+    cache.set(client_key(request), 1, settings.REPLICA_PIN_SECONDS)
+    response.set_cookie(PIN_COOKIE, "1", max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+
+
+# ========================
+# Router
+# ========================
+
+class ReplicaRouter:
+    """DATABASE_ROUTERS entry; see the module docstring"""
+
+    def db_for_read(self, model, **hints):
+        current = _scope.get()
+        if (
+            current is None or not current.allowed or current.wrote
+            or model._meta.label_lower in PRIMARY_ONLY_MODELS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+            or not healthy()
+        ):
+            return DEFAULT_DB_ALIAS
+        return settings.REPLICA_DATABASE_ALIAS
+
+    def db_for_write(self, model, **hints):
+        current = _scope.get()
+        if current is not None and model._meta.label_lower not in PRIMARY_ONLY_MODELS:
+            current.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica follows the primary's schema through replication
+        return db != settings.REPLICA_DATABASE_ALIAS
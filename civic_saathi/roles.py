@@ -0,0 +1,98 @@
+"""
+The requesting user's place in the municipal staff: officer, worker or
+citizen, with their department.
+
+CivicRoleMiddleware puts it on every request as `request.civic_role`, so
+admin classes and views don't each probe `user.officer` / `user.worker`
+(a query per probe). It is resolved on first use with one joined query.
+The role decides which department's complaints, workers and attendance a
+user sees, so it is only cached across requests (CIVIC_ROLE_CACHE_SECONDS)
+when the default cache is shared by all workers (CACHE_SHARED, i.e.
+REDIS_URL). Saving or deleting an Officer, Worker or Department drops the
+affected entries (see signals.py). A per-process cache would only drop them
+in the worker that handled the save.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = "civic_role:"
+
+
+class CivicRole:
+    """
+    kind is "officer", "worker", "citizen" or "anonymous". The ids, the
+    department name and title (Officer.role / Worker.role) are None when
+    they don't apply. Superusers are still checked with user.is_superuser.
+    """
+    __slots__ = ("kind", "officer_id", "worker_id", "department_id", "department_name", "title")
+
+    def __init__(self, kind, officer_id=None, worker_id=None, department_id=None, department_name=None, title=None):
+        self.kind = kind
+        self.officer_id = officer_id
+        self.worker_id = worker_id
+        self.department_id = department_id
+        self.department_name = department_name
+        self.title = title
+
+    @property
+    def is_officer(self):
+        return self.kind == "officer"
+
+    @property
+    def is_worker(self):
+        return self.kind == "worker"
+
+    def as_tuple(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"<CivicRole {self.kind} department={self.department_id}>"
+
+
+ANONYMOUS = CivicRole("anonymous")
+
+
+def cache_key(user_id):
+    return f"{CACHE_PREFIX}{user_id}"
+
+
+def lookup(user_id):
+    """The user's officer or worker row and department, in one query (officer wins if both exist)"""
+    from django.contrib.auth.models import User
+
+    row = User.objects.filter(pk=user_id).values(
+        "officer__id", "officer__role", "officer__department_id", "officer__department__name",
+        "worker__id", "worker__role", "worker__department_id", "worker__department__name",
+    ).first()
+    if row is None:
+        return ANONYMOUS
+    if row["officer__id"] is not None:
+        return CivicRole(
+            "officer", officer_id=row["officer__id"], department_id=row["officer__department_id"],
+            department_name=row["officer__department__name"], title=row["officer__role"],
+        )
+    if row["worker__id"] is not None:
+        return CivicRole(
+            "worker", worker_id=row["worker__id"], department_id=row["worker__department_id"],
+            department_name=row["worker__department__name"], title=row["worker__role"],
+        )
+    return CivicRole("citizen")
+
+
+def resolve(user):
+    """CivicRole of `user`, from the shared cache when possible"""
+    if user is None or not user.is_authenticated:
+        return ANONYMOUS
+    if not settings.CACHE_SHARED:
+        return lookup(user.pk)
+    key = cache_key(user.pk)
+    cached = cache.get(key)
+    if cached is not None:
+        return CivicRole(*cached)
+    role = lookup(user.pk)
+    cache.set(key, role.as_tuple(), settings.CIVIC_ROLE_CACHE_SECONDS)
+    return role
+
+
+def invalidate(*user_ids):
+    cache.delete_many([cache_key(user_id) for user_id in user_ids])
@@ -0,0 +1,342 @@
+"""
+Schema drift detection and repair for the production database.
+
+The Railway PostgreSQL database predates some of the migrations: auth_user
+is a view over a legacy custom_user table, some facility/streetlight
+columns had other names, and tables and columns were created by hand.
+This replaces the scripts that used to patch it one cursor at a time
+(fix_custom_user.py, sync_db_schema.py, create_missing_tables.py,
+fix_constraints.py, fix_db.py, compare_schema.py, check_*.py).
+
+1. catalog() reads every table, view and column in one query.
+2. drift() compares that with the Django model state: missing tables and
+   columns, legacy column names, columns that are NOT NULL in the database
+   but that Django leaves empty, the auth_user view.
+3. plan() turns the drift into SQL. ALTERs on the same table are merged
+   into one statement; CREATE TABLE/ADD COLUMN come from the schema editor.
+4. apply() sends the whole plan in one transaction (PostgreSQL DDL is
+   transactional), so a failure leaves the schema as it was.
+
+`python manage.py repair_schema` prints the plan (--apply applies it).
+`python manage.py boot` fingerprints the catalog and only repairs when the
+fingerprint changed since the last boot.
+
+Tables and columns of apps with pending migrations are left to `migrate`.
+SQL is only generated for PostgreSQL; elsewhere drift is just reported.
+"""
+import hashlib
+import logging
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+logger = logging.getLogger(__name__)
+
+# Bump when the repair rules below change, so every database is checked once more
+REPAIR_VERSION = 2
+
+# pg_advisory_lock key, so two containers starting together don't repair at once
+BOOT_LOCK_KEY = 0x636976696373  # "civics"
+
+# Repairs give up on a table lock after this instead of queueing behind long queries (and blocking everyone else)
+REPAIR_LOCK_TIMEOUT = "5s"
+
+CATALOG_SQL = {
+    "postgresql": """
+        SELECT c.table_name, t.table_type, c.column_name, c.data_type, c.is_nullable, COALESCE(c.column_default, '')
+        FROM information_schema.columns c
+        JOIN information_schema.tables t ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+        WHERE c.table_schema = current_schema()
+        ORDER BY c.table_name, c.column_name
+    """,
+    "sqlite": """
+        SELECT m.name, m.type, p.name, p.type, NOT p."notnull", COALESCE(p.dflt_value, '')
+        FROM sqlite_master m JOIN pragma_table_info(m.name) p
+        WHERE m.type IN ('table', 'view') AND m.name NOT LIKE 'sqlite_%'
+        ORDER BY m.name, p.name
+    """,
+}
+
+# (old name, model column): renamed only while the model has the new name and not the old one
+LEGACY_RENAMES = {
+    "civic_saathi_facility": [("latitude", "location_lat"), ("longitude", "location_lng")],
+    "civic_saathi_facilityrating": [("rating", "cleanliness_rating")],
+    "civic_saathi_streetlight": [
+        ("pole_number", "pole_id"), ("location", "zone"), ("latitude", "location_lat"), ("longitude", "location_lng"),
+    ],
+}
+
+# Columns of hand-made tables that are dropped, unless the model has (re)gained them
+LEGACY_DROPS = {
+    "civic_saathi_facility": [
+        "contact_number", "email", "opening_time", "closing_time", "is_open_24x7",
+        "image", "rating", "total_ratings", "updated_at",
+    ],
+    "civic_saathi_facilityrating": ["comment"],
+    "civic_saathi_streetlight": ["wattage"],
+}
+
+# Model tables that are a view over a legacy table on old databases
+VIEW_BASE_TABLES = {"auth_user": "custom_user"}
+
+# User's many-to-many tables; they reference custom_user when auth_user is a view (a FK can't point at a view)
+AUTH_USER_M2M_TABLES = {
+    "auth_user_groups": ("group_id", "auth_group"),
+    "auth_user_user_permissions": ("permission_id", "auth_permission"),
+}
+
+
+class SchemaError(Exception):
+    pass
+
+
+class Drift(NamedTuple):
+    kind: str  # missing_table, missing_column, rename, drop_column, drop_not_null, view, extra_column
+    table: str
+    column: str = ""
+    detail: str = ""
+
+    def __str__(self):
+        target = f"{self.table}.{self.column}" if self.column else self.table
+        return f"{self.kind:<15} {target}" + (f" ({self.detail})" if self.detail else "")
+
+
+class Relation(NamedTuple):
+    is_view: bool
+    columns: dict  # column -> (nullable, has_default)
+
+
+# ========================
+# Introspection
+# ========================
+
+def catalog(using="default"):
+    """(relation, kind, column, type, nullable, default) for every column of every table and view"""
+    connection = connections[using]
+    if connection.vendor not in CATALOG_SQL:
+        table_names = connection.introspection.table_names(include_views=True)
+        with connection.cursor() as cursor:
+            return [
+                (table, "", column.name, column.type_code, column.null_ok, "")
+                for table in sorted(table_names)
+                for column in connection.introspection.get_table_description(cursor, table)
+            ]
+    with connection.cursor() as cursor:
+        cursor.execute(CATALOG_SQL[connection.vendor])
+        return cursor.fetchall()
+
+
+def relations(rows):
+    """{relation: Relation} from catalog() rows"""
+    result = {}
+    for name, kind, column, _type, nullable, default in rows:
+        relation = result.setdefault(name, Relation(str(kind).upper() == "VIEW", {}))
+        relation.columns[column] = (nullable in (True, "YES", 1), default not in ("", None))
+    return result
+
+
+def fingerprint(rows):
+    """Hash of catalog() rows and REPAIR_VERSION"""
+    digest = hashlib.sha256(f"repair-v{REPAIR_VERSION}\n".encode())
+    for row in rows:
+        digest.update(("\t".join(str(value) for value in row) + "\n").encode())
+    return digest.hexdigest()
+
+
+def stored_fingerprint(rows, using="default"):
+    """The fingerprint recorded by the last boot, or None (also before SchemaState's table exists)"""
+    from .models import SchemaState
+
+    if not any(row[0] == SchemaState._meta.db_table for row in rows):
+        return None
+    return SchemaState.objects.using(using).filter(database=using).values_list("fingerprint", flat=True).first()
+
+
+def record_fingerprint(value, using="default"):
+    from .models import SchemaState
+
+    SchemaState.objects.using(using).update_or_create(database=using, defaults={"fingerprint": value})
+
+
+def pending_migrations(using="default"):
+    executor = MigrationExecutor(connections[using])
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def pending_apps(using="default"):
+    return {migration.app_label for migration, _backwards in pending_migrations(using)}
+
+
+@contextmanager
+def boot_lock(using="default"):
+    """Session-level advisory lock on PostgreSQL; a no-op elsewhere"""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [BOOT_LOCK_KEY])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [BOOT_LOCK_KEY])
+
+
+# ========================
+# Drift against the model state
+# ========================
+
+def model_tables(skip_apps=()):
+    """{db_table: model} for every managed model, including auto-created many-to-many tables"""
+    return {
+        model._meta.db_table: model
+        for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy and model._meta.app_label not in skip_apps
+    }
+
+
+def drift(rows, skip_apps=()):
+    """Differences between the database described by catalog() rows and the models, as Drift records"""
+    database = relations(rows)
+    auth_user = database.get("auth_user")
+    auth_user_is_view = auth_user.is_view if auth_user else VIEW_BASE_TABLES["auth_user"] in database
+    found = []
+
+    for table, model in sorted(model_tables(skip_apps).items()):
+        fields = {field.column: field for field in model._meta.local_concrete_fields}
+        relation = database.get(table)
+        base = VIEW_BASE_TABLES.get(table)
+
+        if relation is None:
+            if base in database:
+                found.append(Drift("view", table, detail=f"over {base}"))
+            elif table in AUTH_USER_M2M_TABLES and auth_user_is_view:
+                found.append(Drift("missing_table", table, detail=f"references {VIEW_BASE_TABLES['auth_user']}"))
+            else:
+                found.append(Drift("missing_table", table, detail=model._meta.label))
+            continue
+
+        if relation.is_view:
+            missing = sorted(set(fields) - set(relation.columns))
+            if missing:
+                found.append(Drift("view", table, detail=f"lacks {', '.join(missing)}"))
+            if base in database:
+                # Inserts land in the base table: it must not require what the model leaves empty
+                found += _nullability(base, database[base].columns, fields)
+            continue
+
+        renamed = set()
+        columns = set(relation.columns)
+        for old, new in LEGACY_RENAMES.get(table, ()):
+            if old in columns and new not in columns and new in fields and old not in fields:
+                found.append(Drift("rename", table, old, f"to {new}"))
+                columns = (columns - {old}) | {new}
+                renamed.add(old)
+        for column in sorted(set(fields) - columns):
+            found.append(Drift("missing_column", table, column, fields[column].name))
+        found += _nullability(table, {c: v for c, v in relation.columns.items() if c not in renamed}, fields)
+    return found
+
+
+def _nullability(table, columns, fields):
+    found = []
+    for column, (nullable, has_default) in sorted(columns.items()):
+        field = fields.get(column)
+        if field is None:
+            if column in LEGACY_DROPS.get(table, ()):
+                found.append(Drift("drop_column", table, column, "legacy"))
+            elif not nullable and not has_default:
+                found.append(Drift("drop_not_null", table, column, "not in model, no default"))
+            else:
+                found.append(Drift("extra_column", table, column))
+        elif field.null and not nullable:
+            found.append(Drift("drop_not_null", table, column, "null=True in model"))
+    return found
+
+
+# ========================
+# Plan and apply
+# ========================
+
+def plan(found, using="default"):
+    """
+    SQL statements that repair the Drift records, in execution order:
+    renames, new tables and columns, one ALTER TABLE per table, views.
+    extra_column drift is only reported.
+    """
+    connection = connections[using]
+    if all(item.kind == "extra_column" for item in found):
+        return []
+    if connection.vendor != "postgresql":
+        raise SchemaError(f"Schema repairs are only supported on PostgreSQL, not {connection.vendor}")
+
+    quote = connection.ops.quote_name
+    tables = model_tables()
+    renames, creates, views = [], [], []
+    clauses = {}  # table -> ALTER TABLE clauses, sent as one statement per table
+    with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+        for item in found:
+            if item.kind == "missing_table" and item.table in AUTH_USER_M2M_TABLES and item.detail.startswith("references"):
+                creates.append(_auth_user_m2m_sql(item.table, quote))
+            elif item.kind == "missing_table":
+                editor.create_model(tables[item.table])
+            elif item.kind == "missing_column":
+                model = tables[item.table]
+                editor.add_field(model, model._meta.get_field(item.detail))
+            elif item.kind == "rename":
+                new = item.detail.split()[-1]
+                renames.append(f"ALTER TABLE {quote(item.table)} RENAME COLUMN {quote(item.column)} TO {quote(new)}")
+            elif item.kind == "drop_column":
+                clauses.setdefault(item.table, []).append(f"DROP COLUMN {quote(item.column)}")
+            elif item.kind == "drop_not_null":
+                clauses.setdefault(item.table, []).append(f"ALTER COLUMN {quote(item.column)} DROP NOT NULL")
+            elif item.kind == "view":
+                columns = ", ".join(quote(f.column) for f in tables[item.table]._meta.local_concrete_fields)
+                views.append(
+                    f"CREATE OR REPLACE VIEW {quote(item.table)} AS "
+                    f"SELECT {columns} FROM {quote(VIEW_BASE_TABLES[item.table])}"
+                )
+    # Includes the FKs and indexes the editor deferred until after all CREATE TABLEs
+    creates += [sql.rstrip(";") for sql in editor.collected_sql]
+    altered = [f"ALTER TABLE {quote(table)} " + ", ".join(parts) for table, parts in clauses.items()]
+    return renames + creates + altered + views
+
+
+def apply(statements, using="default"):
+    """Run the plan in one transaction; raises SchemaError (having changed nothing) if any statement fails"""
+    if not statements:
+        return
+    connection = connections[using]
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(f"SET LOCAL lock_timeout = '{REPAIR_LOCK_TIMEOUT}'")
+            # The whole batch in one round trip
+            cursor.execute(";\n".join(statements))
+    except Exception as e:
+        raise SchemaError(f"Schema repair rolled back: {e}") from e
+    logger.info(f"Schema repair: applied {len(statements)} statements")
+
+
+def repair(rows, using="default", skip_apps=None):
+    """Plan and apply the repairs for catalog() rows; returns the statements that ran"""
+    if skip_apps is None:
+        skip_apps = pending_apps(using)
+    statements = plan(drift(rows, skip_apps), using)
+    apply(statements, using)
+    return statements
+
+
+def _auth_user_m2m_sql(table, quote):
+    column, target = AUTH_USER_M2M_TABLES[table]
+    return (
+        f"CREATE TABLE IF NOT EXISTS {quote(table)} ("
+        f"id BIGSERIAL PRIMARY KEY, "
+        f"user_id BIGINT NOT NULL REFERENCES {quote(VIEW_BASE_TABLES['auth_user'])}(id) ON DELETE CASCADE, "
+        f"{column} INTEGER NOT NULL REFERENCES {quote(target)}(id) ON DELETE CASCADE, "
+        f"UNIQUE (user_id, {column}))"
+    )
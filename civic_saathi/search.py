@@ -0,0 +1,199 @@
+"""
+Full-text search over complaints.
+
+Each complaint has a search document kept up to date by the database
+itself, so there is nothing to maintain from Python:
+
+- PostgreSQL: a generated `search_document` tsvector column (title,
+  location and description, weighted A/B/C) with a GIN index, plus
+  pg_trgm indexes for the admin's substring searches on workers and
+  streetlights.
+- SQLite (local runs): an external-content FTS5 table kept in sync by
+  triggers.
+
+Anything else falls back to plain icontains filters.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+COMPLAINT_TABLE = "civic_saathi_complaint"
+FTS_TABLE = "civic_saathi_complaint_fts"
+
+MAX_TERMS = 8
+
+TRACKING_ID_RE = re.compile(r"^\s*(?:cmp-\d{4}-)?0*(\d+)\s*$", re.IGNORECASE)
+
+
+# ========================
+# Schema (used by migrations and rebuild_search_index)
+# ========================
+
+POSTGRES_INSTALL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""
+    ALTER TABLE {COMPLAINT_TABLE} ADD COLUMN IF NOT EXISTS search_document tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(location, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS complaint_search_gin ON {COMPLAINT_TABLE} USING GIN (search_document)",
+    # Admin / Jazzmin substring searches (ILIKE '%term%') on the other searchable models
+    # (auth_user is a view over custom_user on some legacy databases; only index a real table)
+    """
+    DO $$ BEGIN
+        IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'auth_user' AND relkind = 'r') THEN
+            CREATE INDEX IF NOT EXISTS auth_user_username_trgm ON auth_user USING GIN (username gin_trgm_ops);
+        END IF;
+    END $$
+    """,
+    "CREATE INDEX IF NOT EXISTS streetlight_pole_id_trgm ON civic_saathi_streetlight USING GIN (pole_id gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS streetlight_location_trgm ON civic_saathi_streetlight USING GIN (location gin_trgm_ops)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS streetlight_location_trgm",
+    "DROP INDEX IF EXISTS streetlight_pole_id_trgm",
+    "DROP INDEX IF EXISTS auth_user_username_trgm",
+    "DROP INDEX IF EXISTS complaint_search_gin",
+    f"ALTER TABLE {COMPLAINT_TABLE} DROP COLUMN IF EXISTS search_document",
+]
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, location, description,
+        content='{COMPLAINT_TABLE}', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {COMPLAINT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, location, description)
+        VALUES (new.id, new.title, new.location, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {COMPLAINT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, location, description)
+        VALUES ('delete', old.id, old.title, old.location, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, location, description
+    ON {COMPLAINT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, location, description)
+        VALUES ('delete', old.id, old.title, old.location, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, location, description)
+        VALUES (new.id, new.title, new.location, new.description);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def install(connection):
+    """Create the search document and indexes for this database"""
+    if connection.vendor == "postgresql":
+        statements = POSTGRES_INSTALL
+    elif connection.vendor == "sqlite" and sqlite_has_fts5(connection):
+        statements = SQLITE_INSTALL
+    else:
+        return
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def uninstall(connection):
+    statements = {"postgresql": POSTGRES_UNINSTALL, "sqlite": SQLITE_UNINSTALL}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def backend(connection):
+    """Which search implementation this database supports"""
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            if cursor.fetchone():
+                return "fts5"
+    return "basic"
+
+
+# ========================
+# Querying
+# ========================
+
+def _terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def search_complaints(queryset, query, rank=True):
+    """
+    Filter `queryset` down to complaints matching `query`.
+
+    Every term must match (prefix matching, so partial words work while
+    typing). A tracking id such as "CMP-2025-00042" or a bare number
+    matches that complaint directly. With `rank=True` the result is
+    annotated with `search_rank` and ordered best match first.
+    """
+    tracking = TRACKING_ID_RE.match(query)
+    if tracking:
+        return queryset.filter(pk=int(tracking.group(1)))
+
+    terms = _terms(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = backend(connections[queryset.db])
+
+    if vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        document = f'"{COMPLAINT_TABLE}"."search_document"'
+        queryset = queryset.filter(RawSQL(
+            f"{document} @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField()
+        ))
+        rank_sql = RawSQL(f"ts_rank_cd({document}, to_tsquery('simple', %s))", [tsquery], output_field=FloatField())
+
+    elif vendor == "fts5":
+        match = " ".join(f'"{term}"*' for term in terms)
+        queryset = queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+        ))
+        # bm25() is lower-is-better; column weights mirror the A/B/C weights on PostgreSQL
+        rank_sql = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}, 10.0, 5.0, 1.0) FROM {FTS_TABLE} "
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = "{COMPLAINT_TABLE}"."id"',
+            [match], output_field=FloatField()
+        )
+
+    else:
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term) | Q(location__icontains=term) | Q(description__icontains=term)
+            )
+        rank_sql = Value(0.0, output_field=FloatField())
+
+    if not rank:
+        return queryset
+    return queryset.annotate(search_rank=rank_sql).order_by("-search_rank", "-created_at")
@@ -1,9 +1,12 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
 from .models import (
     Department, ComplaintCategory, Complaint, ComplaintLog,
-    Officer, Worker, Facility, FacilityRating
+    Officer, Worker, Facility, FacilityRating, UploadSession
 )
+from . import uploads
 
 
 # ========================
@@ -172,10 +175,10 @@ class ComplaintSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'tracking_id', 'title', 'description',
             'category', 'department',
-            'location', 'latitude', 'longitude',
+            'location',
             'image', 'priority', 'priority_display',
             'status', 'status_display',
-            'current_officer', 'current_worker',
+            'current_officer', 'current_worker', 'duplicate_of',
             'user_name', 'created_at', 'created_at_display', 'updated_at'
         ]
     
@@ -209,13 +212,14 @@ class ComplaintCreateSerializer(serializers.ModelSerializer):
         required=False,
         allow_null=True
     )
+    upload_id = serializers.UUIDField(write_only=True, required=False)
     
     class Meta:
         model = Complaint
         fields = [
             'title', 'description', 'category',
-            'location', 'latitude', 'longitude',
-            'image', 'priority'
+            'location',
+            'image', 'upload_id', 'priority'
         ]
     
     def validate_title(self, value):
@@ -227,6 +231,72 @@ class ComplaintCreateSerializer(serializers.ModelSerializer):
         if len(value) < 20:
             raise serializers.ValidationError("Description must be at least 20 characters")
         return value
+    
+    def validate_upload_id(self, value):
+        request = self.context.get('request')
+        try:
+            session = UploadSession.objects.get(pk=value, user=request.user, status='complete')
+        except UploadSession.DoesNotExist:
+            raise serializers.ValidationError("Upload not found or not complete")
+        # Direct uploads get this check from ImageField
+        try:
+            uploads.verify_image(session)
+        except uploads.UploadError as e:
+            raise serializers.ValidationError(e.message)
+        return session
+    
+    def validate(self, data):
+        if data.get('image') and data.get('upload_id'):
+            raise serializers.ValidationError("Send either image or upload_id, not both")
+        return data
+    
+    def create(self, validated_data):
+        # Attach a completed chunked upload as the complaint image
+        upload = validated_data.pop('upload_id', None)
+        if upload is None:
+            return super().create(validated_data)
+        
+        with transaction.atomic():
+            # Lock the session so two requests can't both attach the same upload
+            upload = UploadSession.objects.select_for_update().filter(pk=upload.pk, status='complete').first()
+            if upload is None:
+                raise serializers.ValidationError({'upload_id': ["Upload was already used"]})
+            image = uploads.open_upload(upload)
+            validated_data['image'] = image
+            try:
+                complaint = super().create(validated_data)
+            finally:
+                image.close()
+            uploads.consume(upload)
+        return complaint
+
+
+class ComplaintBatchItemSerializer(ComplaintCreateSerializer):
+    """
+    Validate one complaint of a batch import.
+    Categories and citizens are resolved once per batch and passed in context.
+    """
+    
+    category = serializers.IntegerField(required=False, allow_null=True)
+    user_id = serializers.IntegerField(required=False)
+    
+    class Meta(ComplaintCreateSerializer.Meta):
+        fields = ['title', 'description', 'category', 'location', 'priority', 'user_id']
+    
+    def validate_category(self, value):
+        if value is None:
+            return None
+        category = self.context['categories'].get(value)
+        if category is None:
+            raise serializers.ValidationError("Invalid category")
+        return category
+    
+    def validate_user_id(self, value):
+        if not self.context.get('can_file_for_others'):
+            raise serializers.ValidationError("Only staff accounts can file on behalf of citizens")
+        if value not in self.context['users']:
+            raise serializers.ValidationError("Citizen not found")
+        return value
 
 
 class ComplaintLogSerializer(serializers.ModelSerializer):
@@ -260,6 +330,8 @@ class FacilitySerializer(serializers.ModelSerializer):
     """Serialize facility data"""
     
     facility_type_display = serializers.CharField(source='get_facility_type_display', read_only=True)
+    latitude = serializers.DecimalField(source='location_lat', max_digits=9, decimal_places=6, read_only=True)
+    longitude = serializers.DecimalField(source='location_lng', max_digits=9, decimal_places=6, read_only=True)
     average_rating = serializers.FloatField(read_only=True)
     total_ratings = serializers.IntegerField(read_only=True)
     department_name = serializers.CharField(source='department.name', read_only=True)
@@ -274,6 +346,21 @@ class FacilitySerializer(serializers.ModelSerializer):
         ]
 
 
+class FacilityRatingCreateSerializer(serializers.ModelSerializer):
+    """Validate a public facility rating (the photo gets ImageField's Pillow check)"""
+    
+    class Meta:
+        model = FacilityRating
+        fields = ['cleanliness_rating', 'comment', 'photo', 'is_anonymous']
+    
+    def validate_photo(self, value):
+        if value and value.size > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Photo must be at most {settings.UPLOAD_MAX_SIZE // (1024 * 1024)} MB"
+            )
+        return value
+
+
 class FacilityRatingSerializer(serializers.ModelSerializer):
     """Serialize facility rating data"""
     
@@ -1,10 +1,15 @@
 """
 Django Signals for Civic Saathi
-Handles automatic email notifications on model events.
+Handles automatic email notifications on model events,
+queues perceptual hashing of uploaded photos and drops cached
+staff roles (roles.py) and reference lists (reference.py) when officers,
+workers, departments or categories change.
 """
-from django.db.models.signals import post_save
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
-from .models import Complaint, ComplaintEscalation
+from .models import Complaint, ComplaintCategory, ComplaintEscalation, Department, FacilityRating, Officer, Worker
+from . import reference, roles, tasks
 import logging
 
 logger = logging.getLogger(__name__)
@@ -45,3 +50,76 @@ def escalation_post_save(sender, instance, created, **kwargs):
             logger.info(f"Signal: Escalation email sent for complaint #{instance.complaint_id}")
         except Exception as e:
             logger.error(f"Signal: Failed to send escalation email: {e}")
+
+
+PHOTO_FIELDS = {Complaint: ("complaint", "image"), FacilityRating: ("facility_rating", "photo")}
+
+
+def _photo_name(instance, field_name):
+    """Stored name of the photo, without loading a deferred field"""
+    value = instance.__dict__.get(field_name)
+    return getattr(value, "name", value) or ""
+
+
+@receiver(post_init, sender=Complaint)
+@receiver(post_init, sender=FacilityRating)
+def photo_post_init(sender, instance, **kwargs):
+    """Remember the photo each instance was loaded with (None if deferred)"""
+    field_name = PHOTO_FIELDS[sender][1]
+    instance._hashed_photo = _photo_name(instance, field_name) if field_name in instance.__dict__ else None
+
+
+@receiver(post_save, sender=Complaint)
+@receiver(post_save, sender=FacilityRating)
+def photo_post_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Hash uploaded photos in the background (repost / duplicate detection),
+    only when the photo changed, not on every status update.
+    """
+    from .photo_hashes import hash_image
+
+    source, field_name = PHOTO_FIELDS[sender]
+    if update_fields is not None and field_name not in update_fields:
+        return
+    name = _photo_name(instance, field_name)
+    if name == instance._hashed_photo:
+        return
+    instance._hashed_photo = name
+    if name:
+        tasks.defer(hash_image, source, instance.pk)
+
+
+@receiver(post_save, sender=Officer)
+@receiver(post_delete, sender=Officer)
+@receiver(post_save, sender=Worker)
+@receiver(post_delete, sender=Worker)
+def staff_role_changed(sender, instance, **kwargs):
+    """Officer/worker added, moved or removed: their cached role is stale"""
+    roles.invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Department)
+def department_changed(sender, instance, created, **kwargs):
+    """Cached roles carry the department name"""
+    if created:
+        return
+    roles.invalidate(
+        *Officer.objects.filter(department=instance).values_list('user_id', flat=True),
+        *Worker.objects.filter(department=instance).values_list('user_id', flat=True),
+    )
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=ComplaintCategory)
+@receiver(post_delete, sender=ComplaintCategory)
+def reference_data_changed(sender, **kwargs):
+    """The cached category/department lists are stale"""
+    reference.invalidate()
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    """A new account may reuse the id of a deleted one with a cached role"""
+    if created:
+        roles.invalidate(instance.pk)
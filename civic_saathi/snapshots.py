@@ -0,0 +1,246 @@
+"""
+Database snapshots, so that large seeded datasets are generated once and
+then restored in seconds for benchmarks and tests.
+
+- SQLite: the sqlite3 online backup API copies the whole database file,
+  including the FTS5 search table and its triggers, in either direction.
+  This also works for the in-memory test database.
+- PostgreSQL: `pg_dump --format=custom` and a parallel
+  `pg_restore --clean`. The client tools must be on PATH.
+
+A snapshot is stored as DB_SNAPSHOT_DIR/<tag>.<ext>, next to a <tag>.json
+file recording the database vendor and the migrations applied when it was
+taken. A snapshot from an older schema is refused instead of being restored
+over a newer one.
+
+SnapshotTestCase restores a generated dataset (see synthetic.py) before a
+test class runs and puts the test database back afterwards. The dataset is
+generated only the first time; after that the snapshot is reused.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test import TestCase
+from django.utils import timezone
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"sqlite": "sqlite3", "postgresql": "dump"}
+
+
+class SnapshotError(Exception):
+    pass
+
+
+# ========================
+# Naming and metadata
+# ========================
+
+def dataset_tag(seed, **scale):
+    """Tag for a generated dataset, e.g. dataset-seed42-complaints20000-days365"""
+    parts = [f"seed{seed}"] + [f"{key}{value}" for key, value in sorted(scale.items()) if value is not None]
+    return "dataset-" + "-".join(str(part).replace("-", "") for part in parts)
+
+
+def schema_fingerprint(using="default"):
+    """Hash of the migrations applied to the database"""
+    loader = MigrationLoader(connections[using], ignore_no_migrations=True)
+    applied = sorted(f"{app}.{name}" for app, name in loader.applied_migrations)
+    return hashlib.sha256("\n".join(applied).encode()).hexdigest()[:16]
+
+
+def _directory():
+    path = Path(settings.DB_SNAPSHOT_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _paths(tag, vendor):
+    if vendor not in EXTENSIONS:
+        raise SnapshotError(f"Snapshots are not supported on {vendor}")
+    directory = _directory()
+    return directory / f"{tag}.{EXTENSIONS[vendor]}", directory / f"{tag}.json"
+
+
+def metadata(tag, using="default"):
+    """The snapshot's metadata, or None if there is no such snapshot"""
+    data_path, meta_path = _paths(tag, connections[using].vendor)
+    if not (data_path.exists() and meta_path.exists()):
+        return None
+    return json.loads(meta_path.read_text())
+
+
+def exists(tag, using="default"):
+    """True if a snapshot for `tag` exists and matches the current schema"""
+    meta = metadata(tag, using)
+    return meta is not None and meta["schema"] == schema_fingerprint(using)
+
+
+def list_snapshots():
+    return [json.loads(path.read_text()) for path in sorted(_directory().glob("*.json"))]
+
+
+def delete(tag):
+    removed = False
+    for path in _directory().glob(f"{tag}.*"):
+        path.unlink()
+        removed = True
+    return removed
+
+
+# ========================
+# Create / restore
+# ========================
+
+def create(tag, using="default", extra=None):
+    """Snapshot the database under `tag` (replacing an older one). Returns the metadata."""
+    connection = connections[using]
+    data_path, meta_path = _paths(tag, connection.vendor)
+    partial = data_path.with_suffix(data_path.suffix + ".partial")
+    dump(partial, using)
+    os.replace(partial, data_path)
+
+    meta = {
+        "tag": tag,
+        "vendor": connection.vendor,
+        "schema": schema_fingerprint(using),
+        "created_at": timezone.now().isoformat(),
+        "size": data_path.stat().st_size,
+        **(extra or {}),
+    }
+    meta_path.write_text(json.dumps(meta, indent=2))
+    logger.info(f"Snapshot: saved {tag} ({meta['size']} bytes)")
+    return meta
+
+
+def restore(tag, using="default", jobs=None):
+    """Replace the database contents with snapshot `tag`"""
+    connection = connections[using]
+    meta = metadata(tag, using)
+    if meta is None:
+        raise SnapshotError(f"No snapshot named {tag}")
+    if meta["vendor"] != connection.vendor:
+        raise SnapshotError(f"Snapshot {tag} was taken on {meta['vendor']}, not {connection.vendor}")
+    if meta["schema"] != schema_fingerprint(using):
+        raise SnapshotError(f"Snapshot {tag} was taken with different migrations applied; regenerate it")
+
+    load(_paths(tag, connection.vendor)[0], using, jobs)
+    logger.info(f"Snapshot: restored {tag}")
+    return meta
+
+
+def dump(path, using="default"):
+    """Write the whole database to `path`"""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            connection.connection.backup(target)
+        finally:
+            target.close()
+    elif connection.vendor == "postgresql":
+        _run_pg(connection, ["pg_dump", "--format=custom", "--no-owner", "--file", str(path)])
+    else:
+        raise SnapshotError(f"Snapshots are not supported on {connection.vendor}")
+
+
+def load(path, using="default", jobs=None):
+    """Replace the database contents with the dump at `path`"""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        connection.ensure_connection()
+        source = sqlite3.connect(path)
+        try:
+            source.backup(connection.connection)
+        finally:
+            source.close()
+    elif connection.vendor == "postgresql":
+        # pg_restore --clean drops the tables; our session must not hold locks on them
+        connection.close()
+        _run_pg(connection, [
+            "pg_restore", "--clean", "--if-exists", "--no-owner",
+            f"--jobs={jobs or os.cpu_count() or 1}", str(path),
+        ])
+    else:
+        raise SnapshotError(f"Snapshots are not supported on {connection.vendor}")
+    # Primary keys of content types may have changed under the cache
+    ContentType.objects.clear_cache()
+
+
+def _run_pg(connection, command):
+    params = connection.settings_dict
+    if shutil.which(command[0]) is None:
+        raise SnapshotError(f"{command[0]} not found on PATH")
+    env = {**os.environ, "PGDATABASE": params["NAME"]}
+    for key, variable in [("HOST", "PGHOST"), ("PORT", "PGPORT"), ("USER", "PGUSER"), ("PASSWORD", "PGPASSWORD")]:
+        if params.get(key):
+            env[variable] = str(params[key])
+    if command[0] == "pg_restore":
+        command = command[:-1] + ["--dbname", params["NAME"], command[-1]]
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SnapshotError(f"{command[0]} failed: {result.stderr.strip()}")
+
+
+# ========================
+# Test integration
+# ========================
+
+class SnapshotTestCase(TestCase):
+    """
+    TestCase whose database starts with a generated dataset.
+
+    Set `dataset` to keyword arguments for synthetic.generate(). The first
+    run generates the dataset and snapshots it; later runs (and other
+    classes with the same dataset) restore the snapshot instead. Each test
+    still runs in a transaction that is rolled back, and the database is
+    put back as it was once the class is done.
+    """
+    dataset = {}
+
+    @classmethod
+    def setUpClass(cls):
+        cls._pristine = Path(tempfile.mkdtemp()) / "pristine"
+        dump(cls._pristine)
+        try:
+            cls.dataset_meta = cls._load_dataset()
+        except Exception:
+            cls._put_back()
+            raise
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._put_back()
+
+    @classmethod
+    def _load_dataset(cls):
+        from . import synthetic
+
+        options = {"seed": 42, **cls.dataset}
+        # Prefixed so a test never restores a snapshot of a development database
+        # Several processes insert in a different order each run, so their rows only match themselves
+        tag = "test-" + dataset_tag(**{k: v for k, v in options.items() if not (k == "processes" and v <= 1)})
+        if exists(tag):
+            return restore(tag)
+        created = synthetic.generate(**options)
+        return create(tag, extra={"rows": created})
+
+    @classmethod
+    def _put_back(cls):
+        load(cls._pristine)
+        shutil.rmtree(cls._pristine.parent, ignore_errors=True)
@@ -0,0 +1,77 @@
+"""
+The "Department Staff" group: the model permissions every (non-superuser)
+staff account gets in the admin. Data isolation is done via get_queryset()
+in the admin classes, not by permissions.
+
+The group is created by migration 0014 (from a frozen copy of GRANTS) and
+can be re-synced with `python manage.py sync_staff_group` after adding a
+model to GRANTS.
+AutoStaffPermissionsMiddleware adds staff users to the group the first
+time they open the admin in a session.
+"""
+from django.db.models import Q
+
+GROUP_NAME = "Department Staff"
+
+ALL_ACTIONS = ("add", "change", "delete", "view")
+
+# (app label, model name, actions)
+GRANTS = [
+    ("civic_saathi", "complaint", ALL_ACTIONS),
+    ("civic_saathi", "complaintcategory", ALL_ACTIONS),
+    ("civic_saathi", "complaintlog", ALL_ACTIONS),
+    ("civic_saathi", "complaintescalation", ALL_ACTIONS),
+    ("civic_saathi", "assignment", ALL_ACTIONS),
+    ("civic_saathi", "worker", ALL_ACTIONS),
+    ("civic_saathi", "workerattendance", ALL_ACTIONS),
+    ("civic_saathi", "facility", ALL_ACTIONS),
+    ("civic_saathi", "facilityinspection", ALL_ACTIONS),
+    ("civic_saathi", "streetlight", ALL_ACTIONS),
+    ("civic_saathi", "facilityrating", ALL_ACTIONS),
+    ("civic_saathi", "department", ("view",)),
+    ("civic_saathi", "officer", ("view",)),
+    ("civic_saathi", "slaconfig", ("view",)),
+    ("auth", "user", ("view",)),
+]
+
+
+def granted_permissions(Permission):
+    """All permissions in GRANTS, in one query"""
+    query = Q()
+    for app_label, model_name, actions in GRANTS:
+        query |= Q(
+            content_type__app_label=app_label,
+            content_type__model=model_name,
+            codename__in=[f"{action}_{model_name}" for action in actions],
+        )
+    return Permission.objects.filter(query)
+
+
+def sync_group(Group, Permission):
+    """
+    Create the group if needed and set its permissions to exactly GRANTS.
+    Takes the model classes so that migrations can pass historical models.
+    """
+    group, _ = Group.objects.get_or_create(name=GROUP_NAME)
+    group.permissions.set(granted_permissions(Permission))
+    return group
+
+
+def add_existing_staff(Group, User):
+    """Put every non-superuser staff account in the group (one insert). Returns how many were added."""
+    group = Group.objects.get(name=GROUP_NAME)
+    Membership = User.groups.through
+    staff = User.objects.filter(is_staff=True, is_superuser=False).exclude(groups=group).values_list("id", flat=True)
+    created = Membership.objects.bulk_create(
+        [Membership(user_id=user_id, group_id=group.id) for user_id in staff],
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+def provision(user):
+    """Add a staff user to the group (creating the group if a migration hasn't)"""
+    from django.contrib.auth.models import Group, Permission
+
+    group = Group.objects.filter(name=GROUP_NAME).first() or sync_group(Group, Permission)
+    user.groups.add(group)
@@ -0,0 +1,576 @@
+"""
+Synthetic datasets at production scale, for benchmarks and index tests.
+
+Used by `python manage.py generate_dataset`. Reference data
+(departments, categories, SLAs) is fixed, and every chunk of rows is
+generated from its own RNG seeded with (seed, table, chunk number). With
+processes=1 the same arguments (including chunk_size) therefore give the
+same rows, ids included. With more processes each chunk still draws the
+same values, but chunks insert in whatever order the workers finish, so
+primary keys, and the foreign keys later tables pick from them, differ
+from run to run.
+
+Faker is only used up front, to build pools of names, streets and
+localities. Each row is then a few random.choice calls over those pools,
+which is what makes millions of rows feasible. Rows are inserted with
+bulk_create in large chunks. auto_now / auto_now_add are switched off
+during the inserts so created_at / updated_at keep the generated history.
+
+Distributions:
+- Complaint volume grows towards the present.
+- The chance a complaint is resolved grows with its age relative to its
+  category's SLA. Old complaints are mostly closed, recent ones mostly
+  open, and a thin tail of open complaints is past its SLA.
+- Wards have Zipf-like weights, so a few busy wards dominate.
+
+Synthetic accounts are named syn_<kind><n>, so a dataset can be flushed
+without touching real accounts.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+import math
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, connections, reset_queries, transaction
+from django.utils import timezone
+
+from .models import (
+    Complaint, ComplaintCategory, ComplaintLog, Department, Facility,
+    FacilityRating, Officer, SLAConfig, Worker, WorkerAttendance
+)
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "syn_"
+
+# Roughly Pune; ward centres are scattered around it
+CITY_CENTER = (18.5204, 73.8567)
+CITY_RADIUS = 0.12
+
+DEPARTMENTS = [
+    ("Sanitation", "Garbage, Sweeping, Public Cleanliness"),
+    ("Roads", "Potholes, Road Maintenance, Footpaths"),
+    ("Electricity", "Streetlights, Electrical Faults"),
+    ("Water Supply", "Water Leakage, Pipeline Repair"),
+    ("Sewage", "Drainage Blockage, Overflow"),
+    ("Public Health", "Dead Animals, Mosquito Fogging"),
+]
+
+# (category, department, resolution hours, escalation hours, share of complaints, issue text)
+CATEGORIES = [
+    ("Garbage Collection", "Sanitation", 24, 48, 14, "Garbage not collected"),
+    ("Street Sweeping", "Sanitation", 24, 48, 6, "Road not swept"),
+    ("Overflowing Dustbin", "Sanitation", 12, 24, 8, "Dustbin overflowing"),
+    ("Pothole Repair", "Roads", 72, 120, 10, "Large pothole"),
+    ("Road Damage", "Roads", 48, 96, 5, "Road surface broken"),
+    ("Footpath Repair", "Roads", 72, 120, 3, "Footpath tiles broken"),
+    ("Streetlight Not Working", "Electricity", 24, 48, 9, "Streetlight not working"),
+    ("Electrical Fault", "Electricity", 12, 24, 3, "Sparking electric pole"),
+    ("Flickering Light", "Electricity", 24, 48, 3, "Streetlight flickering"),
+    ("Water Leakage", "Water Supply", 12, 24, 7, "Water leaking from pipe"),
+    ("No Water Supply", "Water Supply", 6, 12, 6, "No water supply"),
+    ("Pipeline Burst", "Water Supply", 6, 12, 2, "Water pipeline burst"),
+    ("Drain Blockage", "Sewage", 24, 48, 8, "Drain blocked"),
+    ("Sewage Overflow", "Sewage", 12, 24, 5, "Sewage overflowing"),
+    ("Manhole Issue", "Sewage", 24, 48, 2, "Open manhole"),
+    ("Dead Animal Removal", "Public Health", 12, 24, 2, "Dead animal lying"),
+    ("Mosquito Fogging", "Public Health", 48, 96, 4, "Mosquito breeding, fogging needed"),
+    ("Stray Animal", "Public Health", 24, 48, 3, "Aggressive stray dogs"),
+]
+
+OFFICER_ROLES = ["Department Head", "Zonal Officer", "Ward Supervisor"]
+WORKER_ROLES = ["Sweeper", "Technician", "Supervisor", "Driver", "Helper"]
+
+LANDMARKS = [
+    "bus stop", "school", "temple", "vegetable market", "hospital", "park",
+    "metro station", "water tank", "community hall", "petrol pump", "post office",
+]
+TITLE_TEMPLATES = ["{issue} near {landmark}", "{issue} on {street}", "{issue} in {locality}"]
+DESCRIPTION_TEMPLATES = [
+    "{issue} near the {landmark} on {street} for the last {days} days. {impact}",
+    "{issue} in {locality}, opposite the {landmark}. {impact}",
+    "There is a problem on {street}: {issue_lower}. {impact}",
+]
+IMPACTS = [
+    "Residents are facing a lot of trouble.",
+    "Children pass this way to school every day.",
+    "Please send someone urgently.",
+    "I complained earlier but nothing was done.",
+    "It is getting worse every day.",
+    "Shopkeepers and people walking by are affected.",
+]
+
+PRIORITIES = ([1, 2, 3], [70, 22, 8])
+OPEN_STATUSES = (["pending", "assigned", "in_progress"], [45, 30, 25])
+ATTENDANCE = (["present", "absent", "half_day", "on_leave"], [86, 5, 4, 5])
+RATINGS = ([1, 2, 3, 4, 5], [10, 15, 30, 30, 15])
+FACILITY_TYPES = [
+    # (type, department, weight)
+    ("public_toilet", "Sanitation", 40),
+    ("bus_stop", "Roads", 20),
+    ("park", "Public Health", 15),
+    ("streetlight_zone", "Electricity", 15),
+    ("govt_building", "Sanitation", 7),
+    ("other", "Sanitation", 3),
+]
+
+# Set in each process before it generates chunks (see run_chunks)
+_context = None
+
+
+# ========================
+# Setup (runs in the parent process)
+# ========================
+
+def ensure_reference_data():
+    """Departments, categories and SLAs the dataset is built on. Returns their ids."""
+    departments = {}
+    for name, description in DEPARTMENTS:
+        department, _ = Department.objects.get_or_create(name=name, defaults={"description": description})
+        departments[name] = department.id
+
+    categories = []
+    for name, department, resolution, escalation, weight, issue in CATEGORIES:
+        category, _ = ComplaintCategory.objects.get_or_create(name=name, department_id=departments[department])
+        sla, _ = SLAConfig.objects.get_or_create(
+            category=category,
+            defaults={"resolution_hours": resolution, "escalation_hours": escalation}
+        )
+        categories.append((category.id, category.department_id, sla.resolution_hours, sla.escalation_hours, weight, issue))
+    return departments, categories
+
+
+def build_pools(seed, wards):
+    """Names, streets, localities and ward centres, drawn once from a seeded Faker"""
+    from faker import Faker
+
+    fake = Faker(["en_IN"])
+    fake.seed_instance(seed)
+    rng = random.Random(f"{seed}:pools")
+    localities = list(dict.fromkeys(fake.city() for _ in range(wards * 3)))
+    return {
+        "first_names": [fake.first_name() for _ in range(400)],
+        "last_names": [fake.last_name() for _ in range(400)],
+        "streets": [fake.street_name() for _ in range(1000)],
+        "ips": [fake.ipv4_public() for _ in range(2000)],
+        "ward_localities": [localities[i % len(localities)] for i in range(wards)],
+        "ward_centres": [
+            (CITY_CENTER[0] + rng.uniform(-CITY_RADIUS, CITY_RADIUS),
+             CITY_CENTER[1] + rng.uniform(-CITY_RADIUS, CITY_RADIUS))
+            for _ in range(wards)
+        ],
+        # A few busy wards get most complaints (cumulative, so each pick is a bisect)
+        "ward_cum_weights": list(accumulate(1 / (rank + 1) ** 0.8 for rank in range(wards))),
+    }
+
+
+def synthetic_data_exists():
+    return User.objects.filter(username__startswith=PREFIX).exists()
+
+
+def flush(batch_size=500):
+    """Delete a previously generated dataset (everything hangs off syn_ users)"""
+    Facility.objects.filter(assigned_worker__user__username__startswith=PREFIX).delete()
+    user_ids = list(User.objects.filter(username__startswith=PREFIX).values_list("id", flat=True))
+    for start in range(0, len(user_ids), batch_size):
+        # Small batches keep the cascade collector's memory bounded
+        User.objects.filter(id__in=user_ids[start:start + batch_size]).delete()
+    return len(user_ids)
+
+
+def create_officers(departments, per_department=3):
+    """A small officer hierarchy per department (officer accounts are few; no need to parallelise)"""
+    password = make_password(None)
+    users = User.objects.bulk_create([
+        User(username=f"{PREFIX}officer{i * per_department + j}", email=f"{PREFIX}officer{i * per_department + j}@gov.in",
+             password=password, is_staff=True)
+        for i in range(len(departments)) for j in range(per_department)
+    ])
+    officers = Officer.objects.bulk_create([
+        Officer(user=users[i * per_department + j], department_id=department_id,
+                role=OFFICER_ROLES[j % len(OFFICER_ROLES)])
+        for i, department_id in enumerate(departments.values()) for j in range(per_department)
+    ])
+    by_department = {}
+    for officer in officers:
+        by_department.setdefault(officer.department_id, []).append((officer.id, officer.user_id))
+    return by_department
+
+
+def load_people():
+    """Ids of the generated citizens and of workers per department"""
+    citizens = list(
+        User.objects.filter(username__startswith=f"{PREFIX}citizen").order_by("id").values_list("id", flat=True)
+    )
+    workers = {}
+    for worker_id, department_id in Worker.objects.filter(
+        user__username__startswith=f"{PREFIX}worker"
+    ).order_by("id").values_list("id", "department_id"):
+        workers.setdefault(department_id, []).append(worker_id)
+    return citizens, workers
+
+
+def analyze():
+    """Refresh planner statistics so EXPLAIN-based tests see the new row counts"""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+# ========================
+# Chunked, parallel generation
+# ========================
+
+def chunks(total, size):
+    """(chunk number, first row index, row count) covering `total` rows"""
+    return [(n, start, min(size, total - start)) for n, start in enumerate(range(0, total, size))]
+
+
+def _init_process(context):
+    global _context
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+    _context = context
+
+
+def _run_chunk(func, chunk):
+    number, start, count = chunk
+    rng = random.Random(f"{_context['seed']}:{func.__name__}:{number}")
+    with transaction.atomic(), _historical_timestamps():
+        result = func(rng, start, count)
+    # With DEBUG on, Django keeps every query's SQL; chunks are large
+    reset_queries()
+    return result
+
+
+def run_chunks(func, total, context, chunk_size, processes=1, progress=None):
+    """
+    Generate `total` rows with `func(rng, start, count)` in chunks, in
+    `processes` worker processes. Returns the per-chunk results in order.
+    Only processes=1 inserts the chunks in a fixed order (see the module
+    docstring).
+    """
+    global _context
+    work = chunks(total, chunk_size)
+    results = []
+    if processes <= 1 or len(work) <= 1:
+        _context = context
+        for chunk in work:
+            results.append(_run_chunk(func, chunk))
+            if progress:
+                progress(chunk[1] + chunk[2], total)
+        return results
+
+    # Children must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(processes, initializer=_init_process, initargs=(context,)) as pool:
+        done = 0
+        for chunk, result in zip(work, pool.map(_run_chunk, [func] * len(work), work)):
+            results.append(result)
+            done += chunk[2]
+            if progress:
+                progress(done, total)
+    return results
+
+
+@contextmanager
+def _historical_timestamps():
+    """Let bulk_create keep generated created_at / updated_at / timestamp values"""
+    fields = [
+        field
+        for model in (Complaint, ComplaintLog, Facility, FacilityRating)
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _ago(rng, days, skew=1.0):
+    """A moment in the window; skew > 1 favours recent moments"""
+    return _context["until"] - timedelta(hours=days * 24 * rng.random() ** skew)
+
+
+def _ward(rng):
+    pools = _context["pools"]
+    return rng.choices(range(len(pools["ward_cum_weights"])), cum_weights=pools["ward_cum_weights"])[0]
+
+
+def _coordinate(value, rng):
+    return Decimal(f"{value + rng.uniform(-0.004, 0.004):.6f}")
+
+
+def citizens_chunk(rng, start, count):
+    pools = _context["pools"]
+    User.objects.bulk_create([
+        User(
+            username=f"{PREFIX}citizen{n}",
+            email=f"{PREFIX}citizen{n}@mail.com",
+            first_name=rng.choice(pools["first_names"]),
+            last_name=rng.choice(pools["last_names"]),
+            password=_context["password"],
+            date_joined=_ago(rng, _context["days"]),
+        )
+        for n in range(start, start + count)
+    ])
+    return count
+
+
+def workers_chunk(rng, start, count):
+    pools = _context["pools"]
+    departments = _context["department_ids"]
+    users = User.objects.bulk_create([
+        User(
+            username=f"{PREFIX}worker{n}",
+            email=f"{PREFIX}worker{n}@gov.in",
+            first_name=rng.choice(pools["first_names"]),
+            last_name=rng.choice(pools["last_names"]),
+            password=_context["password"],
+        )
+        for n in range(start, start + count)
+    ])
+    until = _context["until"].date()
+    Worker.objects.bulk_create([
+        Worker(
+            user=user,
+            department_id=departments[(start + i) % len(departments)],
+            role=rng.choice(WORKER_ROLES),
+            address=f"{rng.choice(pools['streets'])}, {rng.choice(pools['ward_localities'])}",
+            # Tenure up to five years; a few recent joiners inside the window
+            joining_date=until - timedelta(days=rng.randint(0, 5 * 365)),
+            is_active=rng.random() > 0.03,
+        )
+        for i, user in enumerate(users)
+    ])
+    return count
+
+
+def complaints_chunk(rng, start, count):
+    pools = _context["pools"]
+    categories = _context["categories"]
+    category_weights = list(accumulate(c[4] for c in categories))
+    citizens = _context["citizens"]
+    workers = _context["workers"]
+    officers = _context["officers"]
+    until = _context["until"]
+
+    complaints = []
+    events = []
+    for _ in range(count):
+        category_id, department_id, resolution, escalation, _, issue = rng.choices(categories, cum_weights=category_weights)[0]
+        ward = _ward(rng)
+        street = rng.choice(pools["streets"])
+        locality = pools["ward_localities"][ward]
+        text = {
+            "issue": issue,
+            "issue_lower": issue.lower(),
+            "landmark": rng.choice(LANDMARKS),
+            "street": street,
+            "locality": locality,
+            "days": rng.randint(2, 15),
+            "impact": rng.choice(IMPACTS),
+        }
+
+        # Volume grows towards the present
+        created_at = _ago(rng, _context["days"], skew=1.6)
+        age = (until - created_at).total_seconds() / 3600
+        status, handled_after = _complaint_state(rng, age, resolution, escalation)
+        department_workers = workers.get(department_id) or [None]
+        department_officers = officers.get(department_id) or [(None, None)]
+        officer_id, officer_user_id = rng.choice(department_officers)
+
+        complaints.append(Complaint(
+            user_id=rng.choice(citizens),
+            category_id=category_id,
+            department_id=department_id,
+            title=rng.choice(TITLE_TEMPLATES).format(**text),
+            description=rng.choice(DESCRIPTION_TEMPLATES).format(**text),
+            location=f"{street}, {locality}, Ward {ward + 1}",
+            priority=rng.choices(*PRIORITIES)[0],
+            status=status,
+            current_officer_id=officer_id if status != "pending" else None,
+            current_worker_id=rng.choice(department_workers) if status != "pending" else None,
+            is_spam=rng.random() < 0.01,
+            is_deleted=rng.random() < 0.005,
+            created_at=created_at,
+            updated_at=created_at + timedelta(hours=handled_after),
+        ))
+        events.append(officer_user_id)
+
+    complaints = Complaint.objects.bulk_create(complaints)
+
+    logs = []
+    for complaint, officer_user_id in zip(complaints, events):
+        logs.append(ComplaintLog(
+            complaint_id=complaint.id, action_by_id=complaint.user_id, note="Complaint registered via mobile app",
+            old_status="", new_status="pending", new_dept_id=complaint.department_id, timestamp=complaint.created_at,
+        ))
+        if complaint.status != "pending":
+            logs.append(ComplaintLog(
+                complaint_id=complaint.id, action_by_id=officer_user_id,
+                note=f"Status changed to {complaint.status}",
+                old_status="pending", new_status=complaint.status, timestamp=complaint.updated_at,
+            ))
+    ComplaintLog.objects.bulk_create(logs)
+    return count
+
+
+def _complaint_state(rng, age, resolution, escalation):
+    """(status, hours after creation of the last update) for a complaint `age` hours old"""
+    if rng.random() < min(0.985, 1 - math.exp(-age / resolution)):
+        status = "resolved" if rng.random() < 0.7 else "closed"
+        return status, min(age, resolution * rng.uniform(0.2, 1.6))
+    if age > escalation and rng.random() < 0.4:
+        return "escalated", rng.uniform(escalation, age)
+    status = rng.choices(*OPEN_STATUSES)[0]
+    return status, 0 if status == "pending" else age * rng.random()
+
+
+def attendance_chunk(rng, start, count):
+    """Daily attendance for workers [start, start + count) over the window"""
+    worker_ids = _context["worker_ids"][start:start + count]
+    joined = dict(Worker.objects.filter(id__in=worker_ids).values_list("id", "joining_date"))
+    last_day = _context["until"].date()
+    first_day = last_day - timedelta(days=_context["days"] - 1)
+
+    rows = []
+    for worker_id in worker_ids:
+        day = max(first_day, joined[worker_id])
+        while day <= last_day:
+            status = rng.choices(*ATTENDANCE)[0]
+            present = status in ("present", "half_day")
+            rows.append(WorkerAttendance(
+                worker_id=worker_id,
+                date=day,
+                status=status,
+                check_in=time(8, rng.randint(0, 59)) if present else None,
+                check_out=time(13 if status == "half_day" else 17, rng.randint(0, 59)) if present else None,
+            ))
+            day += timedelta(days=1)
+    WorkerAttendance.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+def facilities_chunk(rng, start, count):
+    pools = _context["pools"]
+    departments = _context["departments"]
+    workers = _context["workers"]
+    types = [(t, departments[d]) for t, d, _ in FACILITY_TYPES]
+    weights = [w for _, _, w in FACILITY_TYPES]
+    labels = dict(Facility.FACILITY_TYPES)
+
+    facilities = []
+    for n in range(start, start + count):
+        facility_type, department_id = rng.choices(types, weights)[0]
+        ward = _ward(rng)
+        locality = pools["ward_localities"][ward]
+        lat, lng = pools["ward_centres"][ward]
+        facilities.append(Facility(
+            name=f"{locality} {labels[facility_type]} {n + 1}",
+            facility_type=facility_type,
+            address=f"{rng.choice(pools['streets'])}, {locality}, Ward {ward + 1}",
+            location_lat=_coordinate(lat, rng),
+            location_lng=_coordinate(lng, rng),
+            department_id=department_id,
+            # Every synthetic facility has a synthetic caretaker; flush() relies on it
+            assigned_worker_id=rng.choice(workers[department_id]),
+            is_active=rng.random() > 0.02,
+            created_at=_context["until"] - timedelta(days=_context["days"]),
+        ))
+    return [f.id for f in Facility.objects.bulk_create(facilities)]
+
+
+def ratings_chunk(rng, start, count):
+    pools = _context["pools"]
+    citizens = _context["citizens"]
+    facility_ids = _context["facility_ids"]
+    ratings = []
+    for _ in range(count):
+        anonymous = rng.random() < 0.4
+        ratings.append(FacilityRating(
+            facility_id=rng.choice(facility_ids),
+            user_id=None if anonymous else rng.choice(citizens),
+            is_anonymous=anonymous,
+            cleanliness_rating=rng.choices(*RATINGS)[0],
+            comment=rng.choice(IMPACTS) if rng.random() < 0.3 else "",
+            ip_address=rng.choice(pools["ips"]),
+            is_verified=rng.random() < 0.1,
+            created_at=_ago(rng, _context["days"], skew=1.3),
+        ))
+    FacilityRating.objects.bulk_create(ratings)
+    return count
+
+
+# ========================
+# Entry point
+# ========================
+
+def generate(*, complaints, citizens, workers, facilities, ratings, days, seed=42, until=None,
+             wards=150, processes=1, chunk_size=10000, progress=None):
+    """
+    Generate a full dataset. `progress(label, done, total)` is called after each chunk.
+    Returns {table label: rows created}.
+    """
+    until = until or timezone.localdate()
+    context = {
+        "seed": seed,
+        "days": days,
+        # End of the last day, so the dataset doesn't depend on the time of day it was made
+        "until": timezone.make_aware(datetime.combine(until, time(23, 59, 59))),
+        "password": make_password(None),
+        "pools": build_pools(seed, wards),
+    }
+
+    departments, categories = ensure_reference_data()
+    context["departments"] = departments
+    context["department_ids"] = list(departments.values())
+    context["categories"] = categories
+    context["officers"] = create_officers(departments)
+
+    def step(label, func, total):
+        report = (lambda done, total_: progress(label, done, total_)) if progress else None
+        return run_chunks(func, total, context, chunk_size, processes, report)
+
+    step("citizens", citizens_chunk, citizens)
+    step("workers", workers_chunk, max(workers, len(departments)))
+    context["citizens"], context["workers"] = load_people()
+    context["worker_ids"] = sorted(w for ids in context["workers"].values() for w in ids)
+
+    facility_ids = step("facilities", facilities_chunk, facilities)
+    context["facility_ids"] = [i for ids in facility_ids for i in ids]
+    if context["facility_ids"]:
+        step("ratings", ratings_chunk, ratings)
+    step("complaints", complaints_chunk, complaints)
+
+    # One attendance chunk covers enough workers to make about chunk_size rows
+    workers_per_chunk = max(1, chunk_size // max(days, 1))
+    attendance = run_chunks(
+        attendance_chunk, len(context["worker_ids"]), context, workers_per_chunk, processes,
+        (lambda done, total: progress("attendance (workers)", done, total)) if progress else None
+    )
+
+    analyze()
+    return {
+        "officers": sum(len(o) for o in context["officers"].values()),
+        "citizens": len(context["citizens"]),
+        "workers": len(context["worker_ids"]),
+        "facilities": len(context["facility_ids"]),
+        "ratings": ratings if context["facility_ids"] else 0,
+        "complaints": complaints,
+        "attendance": sum(attendance),
+    }
@@ -0,0 +1,55 @@
+"""
+Deferred background work for Civic Saathi.
+Things that should not hold up a request (notification emails, image
+processing) are queued here once the current transaction commits and run
+on a small in-process thread pool.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BACKGROUND_TASK_WORKERS,
+                    thread_name_prefix="civic-saathi-bg",
+                )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background task {func.__name__} failed")
+    finally:
+        # Worker threads get their own DB connections; don't leak them
+        if not settings.BACKGROUND_TASKS_EAGER:
+            connections.close_all()
+
+
+def defer(func, *args, **kwargs):
+    """
+    Run `func(*args, **kwargs)` after the current transaction commits.
+    With BACKGROUND_TASKS_EAGER (tests, management commands) it runs inline on commit.
+    """
+    def submit():
+        if settings.BACKGROUND_TASKS_EAGER:
+            _run(func, args, kwargs)
+        else:
+            _get_executor().submit(_run, func, args, kwargs)
+
+    transaction.on_commit(submit)
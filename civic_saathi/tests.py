@@ -1,3 +1,2005 @@
-from django.test import TestCase
+from collections import Counter
+import csv
+from datetime import date, datetime, time, timedelta
+import hashlib
+from io import BytesIO, StringIO
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.http import HttpResponse, QueryDict
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, resolve, reverse
+from django.utils import timezone
+from prometheus_client import REGISTRY, multiprocess
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+
+from . import (
+    dedup, exports, ingest, loadtest, metrics, photo_hashes, profiling, reference, replica, roles, schema, search,
+    snapshots, traffic, uploads, warmup
+)
+from .admin_site import municipal_admin
+from .middleware import RequestInstrumentationMiddleware
+from .models import (
+    Complaint, ComplaintCategory, ComplaintEscalation, ComplaintLog, Department,
+    Facility, FacilityInspection, FacilityRating, ImageHash, Officer, SchemaState,
+    ProfileReport, SLAConfig, Streetlight, UploadSession, Worker, WorkerAttendance
+)
+from .paginators import EstimatedCountPaginator, estimate_count
+from .serializers import ComplaintCreateSerializer
+from .snapshots import SnapshotTestCase
+from .views import otp_storage
+
+
+# ========================
+# Attendance marking
+# ========================
+
+class MarkAttendanceTests(TestCase):
+    """A submission is one upsert and the page one joined query, however big the department"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Sanitation")
+        cls.other = Department.objects.create(name="Roads")
+        officer_user = User.objects.create_user("attendance_officer", password="password", is_staff=True)
+        Officer.objects.create(user=officer_user, department=cls.department)
+        cls.officer = officer_user
+        cls.outsider = cls.add_worker(cls.other, "roads_worker")
+        cls.today = timezone.now().date()
+
+    @classmethod
+    def add_worker(cls, department, username):
+        user = User.objects.create_user(username, password="password")
+        return Worker.objects.create(user=user, department=department, role="Sweeper", joining_date=date(2024, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.officer)
+
+    def submit(self, statuses):
+        data = {f"status_{worker.id}": status for worker, status in statuses.items()}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("mark_attendance"), data)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_upserts_department_attendance(self):
+        first, second = (self.add_worker(self.department, f"sweeper{n}") for n in range(2))
+        WorkerAttendance.objects.create(worker=first, date=self.today, status="absent", notes="Called in sick")
+
+        response, _ = self.submit({first: "present", second: "on_leave", self.outsider: "present"})
+        self.assertEqual(
+            dict(WorkerAttendance.objects.filter(date=self.today).values_list("worker__user__username", "status")),
+            {"sweeper0": "present", "sweeper1": "on_leave"},
+        )
+        record = WorkerAttendance.objects.get(worker=first, date=self.today)
+        self.assertEqual((record.notes, record.marked_by), ("Called in sick", self.officer))
+        # The page shows what was just saved
+        self.assertEqual(response.context["attendance_map"][second.id]["status"], "on_leave")
+
+    def test_query_count_independent_of_department_size(self):
+        workers = [self.add_worker(self.department, f"sweeper{n}") for n in range(3)]
+        self.submit({worker: "absent" for worker in workers})  # warm-up: one-off lookups of the first request
+        _, small = self.submit({worker: "present" for worker in workers})
+        small_page = self.page_queries()
+        workers += [self.add_worker(self.department, f"sweeper{n}") for n in range(3, 12)]
+        _, large = self.submit({worker: "absent" for worker in workers})
+        self.assertEqual(small, large)
+        self.assertEqual(small_page, self.page_queries())
+        self.assertEqual(WorkerAttendance.objects.filter(date=self.today, status="absent").count(), 12)
+
+    def page_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("mark_attendance"))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+
+# ========================
+# Read replica routing
+# ========================
+
+class ReplicaRouterTests(TestCase):
+    """Routing decisions that don't need a replica"""
+
+    def setUp(self):
+        cache.clear()
+        self.router = replica.ReplicaRouter()
+
+    def test_outside_requests_everything_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(Complaint), "default")
+        self.assertEqual(self.router.db_for_write(Complaint), "default")
+        self.assertFalse(self.router.allow_migrate(settings.REPLICA_DATABASE_ALIAS, "civic_saathi"))
+        self.assertTrue(self.router.allow_migrate("default", "civic_saathi"))
+
+    def test_writes_end_replica_reads(self):
+        with replica.scope(False):
+            self.assertEqual(self.router.db_for_read(Complaint), "default")
+        with replica.scope(True) as scope:
+            self.router.db_for_write(Token)
+            self.assertFalse(scope.wrote)  # tokens and sessions don't pin
+            self.router.db_for_write(Complaint)
+            self.assertTrue(scope.wrote)
+            self.assertEqual(self.router.db_for_read(Complaint), "default")
+
+    def test_refused_without_shared_cache_for_several_workers(self):
+        code = "import django; django.setup()"
+        env = {
+            **os.environ, "DJANGO_SETTINGS_MODULE": "municipal.settings", "USE_SQLITE": "True",
+            "REPLICA_DATABASE_URL": "sqlite:///replica.sqlite3", "GUNICORN_WORKERS": "2",
+        }
+        env.pop("REDIS_URL", None)
+        result = subprocess.run([sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("needs a shared cache (REDIS_URL)", result.stderr)
+
+        for extra in ({"GUNICORN_WORKERS": "1"}, {"REDIS_URL": "redis://localhost:6379/0"}):
+            result = subprocess.run(
+                [sys.executable, "-c", code], cwd=settings.BASE_DIR, env={**env, **extra}, capture_output=True, text=True
+            )
+            self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_pins_follow_the_client(self):
+        factory = RequestFactory()
+        request = factory.get("/", HTTP_AUTHORIZATION="Token abc")
+        self.assertFalse(replica.pinned(request))
+        replica.pin(request, HttpResponse())
+        self.assertTrue(replica.pinned(factory.get("/api/complaints/", HTTP_AUTHORIZATION="Token abc")))
+        self.assertFalse(replica.pinned(factory.get("/", HTTP_AUTHORIZATION="Token other")))
+        self.assertTrue(replica.pinned(factory.get("/", HTTP_COOKIE=f"{replica.PIN_COOKIE}=1")))
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Which requests read from the replica (a second connection to the test database)"""
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        alias = settings.REPLICA_DATABASE_ALIAS
+        if alias not in settings.DATABASES:
+            # connections.settings is settings.DATABASES; as a mirror it is neither created nor flushed
+            settings.DATABASES[alias] = {**connections[DEFAULT_DB_ALIAS].settings_dict, "TEST": {"MIRROR": DEFAULT_DB_ALIAS}}
+            cls.addClassCleanup(cls.remove_replica, alias)
+        cls.enterClassContext(override_settings(DATABASE_ROUTERS=["civic_saathi.replica.ReplicaRouter"]))
+        super().setUpClass()
+
+    @staticmethod
+    def remove_replica(alias):
+        connections[alias].close()
+        del connections[alias]
+        del settings.DATABASES[alias]
+
+    def setUp(self):
+        cache.clear()
+        replica._lag[0] = float("-inf")
+        self.department = Department.objects.create(name="Sanitation")
+        self.category = ComplaintCategory.objects.create(name="Garbage Collection", department=self.department)
+        self.citizen = User.objects.create_user(username="replica_citizen", password="password")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=self.citizen).key}"}
+
+    def get_my_complaints(self):
+        with CaptureQueriesContext(connections[settings.REPLICA_DATABASE_ALIAS]) as replica_queries:
+            response = self.client.get(reverse("my_complaints"), **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["data"]["complaints"], len(replica_queries)
+
+    def test_safe_requests_read_from_replica(self):
+        Complaint.objects.create(title="Bin", description="Full", category=self.category, user=self.citizen)
+        complaints, replica_queries = self.get_my_complaints()
+        self.assertEqual(len(complaints), 1)
+        self.assertGreater(replica_queries, 0)
+
+    def test_read_your_writes(self):
+        response = self.client.post(reverse("create_complaint"), {
+            "title": "Overflowing garbage bin", "description": "The bin near the school has overflowed for days",
+            "category": self.category.id, "location": "Ward 7",
+        }, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(replica.PIN_COOKIE, response.cookies)
+
+        complaints, replica_queries = self.get_my_complaints()
+        self.assertEqual(len(complaints), 1)
+        self.assertEqual(replica_queries, 0)
+
+        # Once the pin expires reads go back to the replica
+        cache.clear()
+        self.client.cookies.clear()
+        self.assertGreater(self.get_my_complaints()[1], 0)
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with override_settings(REPLICA_MAX_LAG_SECONDS=-1):
+            replica._lag[0] = float("-inf")
+            self.assertEqual(self.get_my_complaints()[1], 0)
+
+
+# ========================
+# Startup: deferred imports and warm-up
+# ========================
+
+class WarmupTests(TestCase):
+    """Rarely used modules stay out of worker startup; warm_up() fills what the first requests need"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Sanitation")
+        cls.category = ComplaintCategory.objects.create(name="Garbage Collection", department=cls.department)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rare_path_modules_not_imported_at_startup(self):
+        code = (
+            "import sys, municipal.wsgi; from django.urls import get_resolver; get_resolver().url_patterns; "
+            "print(' '.join(m for m in ('PIL', 'civic_saathi.email_service', 'django_extensions') if m in sys.modules))"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "municipal.settings", "DEV_APPS_ENABLED": "False"}
+        result = subprocess.run([sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_reference_lists_cached_until_changed(self):
+        self.assertEqual([c["name"] for c in reference.categories()], ["Garbage Collection"])
+        with self.assertNumQueries(0):
+            reference.categories()
+
+        self.department.name = "Solid Waste"
+        self.department.save()
+        self.assertEqual(reference.categories()[0]["department"]["name"], "Solid Waste")
+        ComplaintCategory.objects.create(name="Dead Animal", department=self.department)
+        self.assertEqual(len(reference.categories()), 2)
+
+    def test_warm_up(self):
+        timings = warmup.warm_up()
+        self.assertEqual(set(timings), {name for name, _ in warmup.STEPS})
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("departments"))
+        self.assertEqual(response.json()["data"][0]["name"], "Sanitation")
+
+        with override_settings(WARMUP_ENABLED=False):
+            self.assertEqual(warmup.warm_up(), {})
+
+
+# ========================
+# Schema drift detection
+# ========================
+
+class SchemaDriftTests(TestCase):
+    """repair_schema: catalog vs model state, and the repair plan"""
+
+    def legacy_rows(self, edit):
+        """catalog() rows of the test database, with edit(relation, column, row) applied to each"""
+        rows = []
+        for row in schema.catalog():
+            row = edit(row[0], row[2], list(row))
+            if row:
+                rows.append(tuple(row))
+        return rows
+
+    def kinds(self, found):
+        return {(item.kind, item.table, item.column) for item in found}
+
+    def test_migrated_database_has_no_drift(self):
+        found = schema.drift(schema.catalog())
+        self.assertEqual([item for item in found if item.kind != "extra_column"], [])
+        self.assertEqual(schema.plan(found), [])
+
+    def test_legacy_columns(self):
+        def edit(relation, column, row):
+            if relation == "civic_saathi_streetlight" and column == "pole_id":
+                row[2] = "pole_number"
+            if relation == "civic_saathi_streetlight" and column == "ward":
+                return None
+            if relation == "civic_saathi_facility" and column == "location_lat":
+                row[4] = 0
+            return row
+
+        rows = self.legacy_rows(edit) + [
+            ("civic_saathi_streetlight", "table", "wattage", "integer", 1, ""),
+            ("civic_saathi_complaint", "table", "legacy_city", "text", 0, ""),
+            ("civic_saathi_complaint", "table", "legacy_votes", "integer", 0, "0"),
+        ]
+        found = self.kinds(schema.drift(rows))
+        self.assertLessEqual({
+            ("rename", "civic_saathi_streetlight", "pole_number"),
+            ("missing_column", "civic_saathi_streetlight", "ward"),
+            ("drop_column", "civic_saathi_streetlight", "wattage"),
+            ("drop_not_null", "civic_saathi_complaint", "legacy_city"),
+            ("drop_not_null", "civic_saathi_facility", "location_lat"),
+            ("extra_column", "civic_saathi_complaint", "legacy_votes"),
+        }, found)
+        self.assertNotIn(("missing_column", "civic_saathi_streetlight", "pole_id"), found)
+        # Streetlight.location is a model column again, so the old rename to zone doesn't apply
+        self.assertFalse(any(kind == "rename" and column == "location" for kind, _, column in found))
+        # Apps with pending migrations are left to migrate
+        self.assertFalse(any(table.startswith("civic_saathi_") for _, table, _ in self.kinds(schema.drift(rows, {"civic_saathi"}))))
+
+    def test_auth_user_view_over_custom_user(self):
+        def edit(relation, column, row):
+            if relation == "auth_user_groups":
+                return None
+            if relation == "auth_user":
+                row[1] = "VIEW"
+            return row
+
+        rows = self.legacy_rows(edit) + [
+            ("custom_user", "BASE TABLE", "id", "bigint", "NO", ""),
+            ("custom_user", "BASE TABLE", "last_login", "timestamp", "NO", ""),
+            ("custom_user", "BASE TABLE", "user_type", "varchar", "NO", ""),
+        ]
+        found = schema.drift(rows)
+        self.assertIn(schema.Drift("missing_table", "auth_user_groups", detail="references custom_user"), found)
+        self.assertIn(("drop_not_null", "custom_user", "user_type"), self.kinds(found))
+        self.assertIn(("drop_not_null", "custom_user", "last_login"), self.kinds(found))
+
+        if connection.vendor != "postgresql":
+            with self.assertRaises(schema.SchemaError):
+                schema.plan(found)
+
+    @skipUnless(connection.vendor == "postgresql", "repair SQL is PostgreSQL-only")
+    def test_plan_batches_alters_per_table(self):
+        found = [
+            schema.Drift("drop_not_null", "civic_saathi_complaint", "a"),
+            schema.Drift("drop_not_null", "civic_saathi_complaint", "b"),
+            schema.Drift("rename", "civic_saathi_streetlight", "pole_number", "to pole_id"),
+        ]
+        statements = schema.plan(found)
+        self.assertTrue(statements[0].startswith('ALTER TABLE "civic_saathi_streetlight" RENAME'))
+        self.assertEqual(
+            statements[1],
+            'ALTER TABLE "civic_saathi_complaint" ALTER COLUMN "a" DROP NOT NULL, ALTER COLUMN "b" DROP NOT NULL',
+        )
+
+
+# ========================
+# Boot schema fingerprint
+# ========================
+
+class BootTests(TransactionTestCase):
+    """`manage.py boot` repairs/migrates only when the schema fingerprint changed"""
+
+    def boot(self, *args):
+        out = StringIO()
+        call_command("boot", *args, stdout=out)
+        return out.getvalue()
+
+    def test_fingerprint_follows_the_schema(self):
+        before = schema.fingerprint(schema.catalog())
+        self.assertEqual(schema.fingerprint(schema.catalog()), before)
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TABLE boot_probe (id integer)")
+        try:
+            self.assertNotEqual(schema.fingerprint(schema.catalog()), before)
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("DROP TABLE boot_probe")
+        self.assertEqual(schema.fingerprint(schema.catalog()), before)
+
+    def test_second_boot_skips_repairs(self):
+        first = self.boot()
+        self.assertNotIn("fingerprint unchanged", first)
+        self.assertEqual(SchemaState.objects.get(database="default").fingerprint, schema.fingerprint(schema.catalog()))
+
+        second = self.boot()
+        self.assertIn("fingerprint unchanged", second)
+        self.assertIn("no pending migrations", second)
+        self.boot("--check")
+
+
+# ========================
+# Query plan regression tests
+# ========================
+
+class QueryPlanTests(TestCase):
+    """
+    The hot queries (citizen feed, dashboard queues, escalation scans,
+    attendance and rating lookups) must be served by their indexes.
+    Runs EXPLAIN on a seeded dataset; on PostgreSQL sequential scans are
+    disabled so the check doesn't depend on table size.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.departments = Department.objects.bulk_create(
+            [Department(name=f"Department {i}") for i in range(5)]
+        )
+        categories = ComplaintCategory.objects.bulk_create(
+            [ComplaintCategory(name=f"Category {i}", department=d) for i, d in enumerate(cls.departments)]
+        )
+        cls.users = User.objects.bulk_create(
+            [User(username=f"citizen{i}") for i in range(40)]
+        )
+        statuses = ["pending", "assigned", "in_progress", "escalated", "resolved", "closed"]
+        Complaint.objects.bulk_create([
+            Complaint(
+                user=cls.users[i % len(cls.users)],
+                category=categories[i % len(categories)],
+                department=cls.departments[i % len(cls.departments)],
+                title=f"Seeded complaint {i}",
+                description="Seeded for query plan tests",
+                location=f"Ward {i % 30}",
+                priority=1 + i % 3,
+                status=statuses[i % len(statuses)],
+                is_deleted=i % 50 == 0,
+                is_spam=i % 70 == 0,
+            )
+            for i in range(1200)
+        ])
+
+        worker_users = User.objects.bulk_create([User(username=f"worker{i}") for i in range(20)])
+        workers = Worker.objects.bulk_create([
+            Worker(user=u, department=cls.departments[i % 5], role="Sweeper", joining_date=date(2024, 1, 1))
+            for i, u in enumerate(worker_users)
+        ])
+        WorkerAttendance.objects.bulk_create([
+            WorkerAttendance(worker=w, date=date(2025, 1, 1) + timedelta(days=d), status="present" if (d + i) % 4 else "absent")
+            for d in range(60) for i, w in enumerate(workers)
+        ])
+
+        cls.facilities = Facility.objects.bulk_create([
+            Facility(name=f"Toilet {i}", facility_type="public_toilet", address="Seeded", department=cls.departments[i % 5])
+            for i in range(30)
+        ])
+        FacilityRating.objects.bulk_create([
+            FacilityRating(facility=cls.facilities[i % 30], cleanliness_rating=1 + i % 5)
+            for i in range(900)
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{index_name} not used:\n{plan}")
+
+    def test_citizen_feed_uses_user_feed_index(self):
+        # MyComplaintsView
+        queryset = Complaint.objects.filter(user=self.users[3], is_deleted=False).order_by("-created_at")
+        self.assertUsesIndex(queryset, "complaint_user_feed_idx")
+
+    def test_department_queue_uses_queue_index(self):
+        # Admin dashboard department flows
+        queryset = Complaint.objects.filter(
+            department=self.departments[1], status="pending", current_worker__isnull=True
+        ).order_by("-priority", "-created_at")[:5]
+        self.assertUsesIndex(queryset, "complaint_dept_queue_idx")
+
+    def test_resolved_today_uses_status_updated_index(self):
+        # home_view / admin dashboard counters
+        start = timezone.make_aware(datetime.combine(timezone.now().date(), time.min))
+        queryset = Complaint.objects.filter(
+            status="resolved", updated_at__gte=start, updated_at__lt=start + timedelta(days=1)
+        )
+        self.assertUsesIndex(queryset, "complaint_status_updated_idx")
+
+    @skipUnless(connection.vendor == "postgresql", "SQLite can't use partial indexes with bound parameters")
+    def test_escalation_scan_uses_partial_open_index(self):
+        # auto_escalate
+        queryset = Complaint.objects.filter(
+            status__in=["pending", "in_progress"], is_deleted=False, is_spam=False
+        ).order_by("created_at")
+        self.assertUsesIndex(queryset, "complaint_sla_open_idx")
+
+    def test_attendance_by_date_uses_date_status_index(self):
+        queryset = WorkerAttendance.objects.filter(date=date(2025, 1, 15), status="absent")
+        self.assertUsesIndex(queryset, "attendance_date_status_idx")
+
+    def test_latest_ratings_use_facility_recent_index(self):
+        # FacilityDetailView
+        queryset = FacilityRating.objects.filter(facility=self.facilities[2]).order_by("-created_at")[:10]
+        self.assertUsesIndex(queryset, "rating_facility_recent_idx")
+
+
+# ========================
+# Request roles
+# ========================
+
+@override_settings(CACHE_SHARED=True)
+class CivicRoleTests(TestCase):
+    """request.civic_role is cached per user (with a shared cache) and dropped when the officer/worker row changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.roads = Department.objects.create(name="Roads")
+        cls.water = Department.objects.create(name="Water Supply")
+        cls.user = User.objects.create_user("role_officer", password="password", is_staff=True)
+        cls.officer = Officer.objects.create(user=cls.user, department=cls.roads, role="Ward Supervisor")
+
+    def setUp(self):
+        # Rolling back a test's changes doesn't send signals
+        cache.clear()
+
+    def profile(self):
+        token = Token.objects.get_or_create(user=self.user)[0]
+        return self.client.get(reverse("profile"), HTTP_AUTHORIZATION=f"Token {token.key}").json()["data"]
+
+    def test_cached_after_first_lookup(self):
+        roles.resolve(self.user)
+        with self.assertNumQueries(0):
+            role = roles.resolve(self.user)
+        self.assertEqual((role.kind, role.officer_id, role.department_name), ("officer", self.officer.id, "Roads"))
+
+    @override_settings(CACHE_SHARED=False)
+    def test_not_cached_in_a_per_process_cache(self):
+        roles.resolve(self.user)
+        with self.assertNumQueries(1):
+            role = roles.resolve(self.user)
+        self.assertEqual(role.department_id, self.roads.id)
+        self.assertEqual(cache.get(roles.cache_key(self.user.pk)), None)
+
+    def test_token_requests_see_the_token_user(self):
+        data = self.profile()
+        self.assertEqual((data["user_type"], data["department"], data["role"]), ("officer", "Roads", "Ward Supervisor"))
+
+    def test_changes_invalidate_the_cache(self):
+        self.profile()
+        self.officer.department = self.water
+        self.officer.save()
+        self.assertEqual(self.profile()["department"], "Water Supply")
+
+        self.water.name = "Water Works"
+        self.water.save()
+        self.assertEqual(self.profile()["department"], "Water Works")
+
+        self.officer.delete()
+        self.assertEqual(self.profile()["user_type"], "citizen")
+
+
+# ========================
+# Connection pooling
+# ========================
+
+class ConnectionPoolTests(TransactionTestCase):
+    """Pool stats reach /metrics; with DB_POOL_ENABLED on PostgreSQL, connections are reused"""
+
+    def sample(self, name, alias="default"):
+        return REGISTRY.get_sample_value(name, {"alias": alias}) or 0
+
+    def test_pool_stats_exported(self):
+        before = self.sample("civic_db_pool_wait_seconds_total", "stand-in")
+        metrics.record_pool_stats("stand-in", {
+            "pool_size": 4, "pool_available": 1, "requests_waiting": 2,
+            "requests_num": 10, "requests_wait_ms": 1500, "returns_bad": 1, "connections_lost": 1,
+        })
+        self.assertEqual(self.sample("civic_db_pool_connections_in_use", "stand-in"), 3)
+        self.assertEqual(self.sample("civic_db_pool_requests_waiting", "stand-in"), 2)
+        self.assertEqual(self.sample("civic_db_pool_wait_seconds_total", "stand-in") - before, 1.5)
+        # No pool on this database: nothing to export, nothing raised
+        metrics.observe_db_pools()
+
+    @skipUnless(getattr(connection, "pool", None) is not None, "needs PostgreSQL with DB_POOL_ENABLED")
+    def test_connections_come_from_the_pool(self):
+        metrics.observe_db_pools()
+        checkouts = self.sample("civic_db_pool_checkouts_total")
+        for _ in range(5):
+            connection.close()  # back to the pool
+            Department.objects.exists()
+        metrics.observe_db_pools()
+
+        self.assertGreaterEqual(self.sample("civic_db_pool_checkouts_total") - checkouts, 5)
+        self.assertLessEqual(self.sample("civic_db_pool_connections"), connection.pool.max_size)
+
+
+# ========================
+# Async public views (ASGI)
+# ========================
+
+@override_settings(ROOT_URLCONF="municipal.asgi_urls")
+class AsyncPublicViewTests(TestCase):
+    """The ASGI urlconf serves the public read endpoints with async views that answer exactly like the DRF ones"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Sanitation")
+        ComplaintCategory.objects.create(name="Garbage Collection", department=department)
+        cls.facility = Facility.objects.create(
+            name="Ward Toilet", facility_type="public_toilet", address="Ward 1",
+            location_lat=18.52, location_lng=73.85, department=department
+        )
+        user = User.objects.create_user("async_rater", password="password")
+        FacilityRating.objects.create(facility=cls.facility, user=user, cleanliness_rating=4, comment="Clean")
+
+    def setUp(self):
+        # Reference lists cached by an earlier test (rollbacks don't send signals)
+        cache.clear()
+
+    async def test_same_responses_as_sync_views(self):
+        for path in [
+            reverse("categories"), reverse("departments"), reverse("facilities"),
+            reverse("facilities") + "?type=public_toilet",
+            reverse("facility_detail", args=[self.facility.id]),
+            reverse("facility_detail", args=[self.facility.id + 100]),
+            reverse("nearby_facilities") + "?lat=18.5&lng=73.8",
+            reverse("nearby_facilities") + "?lat=north&lng=73.8",
+            reverse("nearby_facilities"),
+        ]:
+            with self.subTest(path=path):
+                response = await self.async_client.get(path)
+                with self.settings(ROOT_URLCONF="municipal.urls"):
+                    expected = await sync_to_async(self.client.get)(path)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+
+    async def test_home_page(self):
+        response = await self.async_client.get(reverse("home"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_facilities"], 1)
+
+    @override_settings(ROOT_URLCONF="municipal.urls")
+    async def test_asgi_requests_use_asgi_urlconf(self):
+        response = await self.async_client.get(reverse("categories"))
+        self.assertEqual(response.resolver_match.func.__module__, "civic_saathi.async_views")
+        response = await sync_to_async(self.client.get)(reverse("categories"))
+        self.assertEqual(response.resolver_match.func.__module__, "civic_saathi.views")
+
+    async def test_sync_routes_still_served(self):
+        response = await self.async_client.post(reverse("facilities"))
+        self.assertEqual(response.status_code, 405)
+        response = await self.async_client.get(reverse("my_complaints"))
+        self.assertEqual(response.status_code, 401)
+
+
+# ========================
+# Database snapshots
+# ========================
+
+class SnapshotRoundTripTests(TransactionTestCase):
+    """create() / restore() put the database back exactly, and refuse stale snapshots"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.enterContext(override_settings(DB_SNAPSHOT_DIR=self.directory))
+
+    def test_restore_undoes_later_changes(self):
+        department = Department.objects.create(name="Snapshot Dept")
+        snapshots.create("round-trip")
+
+        department.delete()
+        Department.objects.create(name="Created after the snapshot")
+        snapshots.restore("round-trip")
+
+        self.assertEqual(list(Department.objects.values_list("name", flat=True)), ["Snapshot Dept"])
+
+    def test_snapshot_from_other_schema_is_refused(self):
+        snapshots.create("stale")
+        meta_path = f"{self.directory}/stale.json"
+        with open(meta_path) as f:
+            meta = json.load(f)
+        meta["schema"] = "0" * 16
+        with open(meta_path, "w") as f:
+            json.dump(meta, f)
+
+        self.assertFalse(snapshots.exists("stale"))
+        with self.assertRaises(snapshots.SnapshotError):
+            snapshots.restore("stale")
+
+
+class GeneratedDatasetTests(SnapshotTestCase):
+    """
+    Runs against a generated dataset. Only the first run pays for
+    generating it; later runs restore the snapshot from DB_SNAPSHOT_DIR.
+    """
+    dataset = dict(
+        complaints=3000, citizens=200, workers=30, facilities=6, ratings=120,
+        days=90, until=date(2025, 6, 30),
+    )
+
+    def test_dataset_is_loaded(self):
+        rows = self.dataset_meta["rows"]
+        self.assertEqual(Complaint.objects.count(), rows["complaints"])
+        self.assertEqual(WorkerAttendance.objects.count(), rows["attendance"])
+        self.assertEqual(FacilityRating.objects.count(), rows["ratings"])
+
+    def test_older_complaints_are_mostly_closed(self):
+        until = timezone.make_aware(datetime.combine(self.dataset["until"], time.max))
+        closed = ["resolved", "closed"]
+        old = Complaint.objects.filter(created_at__lt=until - timedelta(days=30))
+        recent = Complaint.objects.filter(created_at__gte=until - timedelta(days=2))
+
+        self.assertGreater(old.filter(status__in=closed).count() / old.count(), 0.9)
+        self.assertGreater(recent.exclude(status__in=closed).count() / recent.count(), 0.3)
+
+    # Tests run in name order: the second sees the dataset despite the first
+    def test_rollback_1_delete_everything(self):
+        Complaint.objects.all().delete()
+        self.assertEqual(Complaint.objects.count(), 0)
+
+    def test_rollback_2_dataset_is_intact(self):
+        self.assertEqual(Complaint.objects.count(), self.dataset_meta["rows"]["complaints"])
+
+
+# ========================
+# Performance budgets (query counts and response times)
+# ========================
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class PerformanceBudgetTests(TestCase):
+    """
+    Every route in civic_saathi/urls.py and the main admin pages are
+    requested, the data they read is doubled, and they are requested again.
+
+    - The query count must not change. A query per row (N+1) shows up as growth.
+    - The query count must stay within the page's budget.
+    - The response must come back within TIME_BUDGET_MS.
+
+    When a budget fails because a page legitimately needs another query,
+    raise the budget in the same change.
+    """
+    TIME_BUDGET_MS = 1000
+
+    # url name -> max queries. Routes that check request.civic_role include its lookup: without a
+    # shared cache (REDIS_URL) it is resolved on every request
+    ROUTE_BUDGETS = {
+        "home": 4,
+        "register": 8,
+        "login": 3,
+        "logout": 2,
+        "profile": 5,
+        "change_password": 4,
+        "forgot_password": 1,
+        "verify_otp": 0,
+        "reset_password": 3,
+        "my_complaints": 3,
+        "create_complaint": 15,
+        "batch_create_complaints": 6,
+        "search_complaints": 4,
+        "complaint_detail": 2,
+        "complaint_logs": 3,
+        "upload_create": 2,
+        "upload_session": 2,
+        "similar_images": 5,
+        "categories": 1,
+        "departments": 1,
+        "facilities": 1,
+        "nearby_facilities": 1,
+        "facility_detail": 2,
+        "rate_facility": 3,
+        "mark_attendance": 6,
+        "metrics": 3,
+    }
+
+    # admin url name -> max queries (superuser; the index is also checked as an officer)
+    ADMIN_BUDGETS = {
+        "admin:index": 18,
+        "admin:civic_saathi_complaint_changelist": 10,
+        "admin:civic_saathi_department_changelist": 7,
+        "admin:civic_saathi_complaintcategory_changelist": 8,
+        "admin:civic_saathi_officer_changelist": 9,
+        "admin:civic_saathi_worker_changelist": 9,
+        "admin:civic_saathi_workerattendance_changelist": 10,
+        "admin:civic_saathi_complaintescalation_changelist": 7,
+        "admin:civic_saathi_facility_changelist": 8,
+        "admin:civic_saathi_facilityrating_changelist": 9,
+        "admin:civic_saathi_facilityinspection_changelist": 9,
+        "admin:civic_saathi_slaconfig_changelist": 8,
+        "admin:civic_saathi_streetlight_changelist": 13,
+        "admin:civic_saathi_complaintlog_changelist": 7,
+        "admin:civic_saathi_imagehash_changelist": 9,
+        "admin:civic_saathi_profilereport_changelist": 11,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name="Sanitation")
+        cls.category = ComplaintCategory.objects.create(name="Garbage Collection", department=cls.department)
+        SLAConfig.objects.create(category=cls.category, resolution_hours=24, escalation_hours=48)
+
+        cls.superuser = User.objects.create_superuser("budget_admin", "admin@example.com", "password")
+        cls.citizen = cls.make_user("budget_citizen")
+        cls.citizen_token = Token.objects.create(user=cls.citizen)
+        officer_user = cls.make_user("budget_officer", is_staff=True)
+        cls.officer = Officer.objects.create(user=officer_user, department=cls.department, role="Ward Supervisor")
+        cls.officer_token = Token.objects.create(user=officer_user)
+
+        cls.complaint = cls.make_complaint(0)
+        cls.facility = Facility.objects.create(
+            name="Budget Toilet", facility_type="public_toilet", address="Ward 1",
+            location_lat=18.52, location_lng=73.85, department=cls.department
+        )
+        cls.image_hash = cls.make_image_hash(cls.complaint, 0x0123456789ABCDEF)
+        cls.upload = UploadSession.objects.create(
+            user=cls.citizen, filename="photo.jpg", total_size=10, checksum="0" * 64
+        )
+        cls.counter = 0
+        cls.grow()
+
+    def setUp(self):
+        self.clients = {}
+
+    # ------------------------
+    # Data
+    # ------------------------
+
+    @classmethod
+    def make_user(cls, username, **extra):
+        user = User.objects.create_user(username, f"{username}@example.com", "password", **extra)
+        return user
+
+    @classmethod
+    def make_complaint(cls, n, **extra):
+        return Complaint.objects.create(
+            user=cls.citizen, category=cls.category, department=cls.department,
+            title=f"Garbage not collected {n}", description="Garbage has not been collected for days",
+            location=f"Ward {n}", **extra
+        )
+
+    @classmethod
+    def make_image_hash(cls, complaint, value):
+        return ImageHash.objects.create(
+            source="complaint", object_id=complaint.id, uploaded_by=cls.citizen,
+            file=f"complaints/{complaint.id}.jpg", sha256=f"{complaint.id:064d}",
+            dhash=photo_hashes.to_signed(value),
+            **{f"seg{i}": seg for i, seg in enumerate(photo_hashes.segments(value))}
+        )
+
+    @classmethod
+    def grow(cls, rows=4):
+        """Add `rows` more of everything the pages list"""
+        for _ in range(rows):
+            cls.counter += 1
+            n = cls.counter
+            worker_user = cls.make_user(f"budget_worker{n}", first_name="Worker", last_name=str(n))
+            worker = Worker.objects.create(
+                user=worker_user, department=cls.department, role="Sweeper", joining_date=date(2024, 1, 1)
+            )
+            officer = Officer.objects.create(
+                user=cls.make_user(f"budget_officer{n}", is_staff=True), department=cls.department
+            )
+            WorkerAttendance.objects.create(worker=worker, date=timezone.now().date(), status="present")
+
+            for status in ("pending", "in_progress", "escalated"):
+                complaint = cls.make_complaint(n, status=status, current_officer=officer, current_worker=worker)
+                ComplaintLog.objects.create(
+                    complaint=complaint, action_by=worker_user, note="Picked up", old_status="pending", new_status=status
+                )
+                ComplaintEscalation.objects.create(complaint=complaint, escalated_from=cls.officer, escalated_to=officer, reason="SLA")
+            # Same photo, one bit flipped: a near-duplicate of the probe image
+            cls.make_image_hash(complaint, 0x0123456789ABCDEF ^ (1 << n % 64))
+
+            facility = Facility.objects.create(
+                name=f"Budget Park {n}", facility_type="park", address=f"Ward {n}",
+                location_lat=18.52, location_lng=73.85, department=cls.department, assigned_worker=worker
+            )
+            for rating in (3, 5):
+                FacilityRating.objects.create(facility=facility, user=cls.citizen, cleanliness_rating=rating)
+                FacilityRating.objects.create(facility=cls.facility, user=cls.citizen, cleanliness_rating=rating)
+            FacilityInspection.objects.create(facility=facility, inspected_by=worker)
+            Streetlight.objects.create(
+                pole_id=f"P-{n}", location=f"Ward {n}", ward=str(n), department=cls.department, assigned_worker=worker
+            )
+
+    # ------------------------
+    # Requests
+    # ------------------------
+
+    def token(self, user):
+        return {"HTTP_AUTHORIZATION": f"Token {Token.objects.get_or_create(user=user)[0].key}"}
+
+    def route_request(self, name):
+        """(client method, path, kwargs, expected status, logged-in user) for one request to `name`"""
+        citizen = {"HTTP_AUTHORIZATION": f"Token {self.citizen_token.key}"}
+        officer = {"HTTP_AUTHORIZATION": f"Token {self.officer_token.key}"}
+        fresh = self.make_user(f"fresh{User.objects.count()}")
+        as_json = {"content_type": "application/json"}
+        complaint = {
+            "title": "Overflowing garbage bin", "description": "The bin near the school has overflowed for days",
+            "category": self.category.id, "location": "Ward 7",
+        }
+        requests = {
+            "home": lambda: ("get", reverse("home"), {}, 200, None),
+            "register": lambda: ("post", reverse("register"), {"data": {
+                "username": f"new{fresh.id}", "email": f"new{fresh.id}@example.com",
+                "password": "secret123", "confirm_password": "secret123",
+            }, **as_json}, 201, None),
+            "login": lambda: ("post", reverse("login"), {
+                "data": {"username": "budget_citizen", "password": "password"}, **as_json
+            }, 200, None),
+            "logout": lambda: ("post", reverse("logout"), self.token(fresh), 200, None),
+            "profile": lambda: ("get", reverse("profile"), officer, 200, None),
+            "change_password": lambda: ("post", reverse("change_password"), {"data": {
+                "old_password": "password", "new_password": "secret123", "confirm_password": "secret123",
+            }, **as_json, **self.token(fresh)}, 200, None),
+            "forgot_password": lambda: ("post", reverse("forgot_password"), {
+                "data": {"email": fresh.email}, **as_json
+            }, 200, None),
+            "verify_otp": lambda: (
+                otp_storage.__setitem__(fresh.email, {"otp": "123456", "created_at": timezone.now(), "user_id": fresh.id}),
+                ("post", reverse("verify_otp"), {"data": {"email": fresh.email, "otp": "123456"}, **as_json}, 200, None),
+            )[1],
+            "reset_password": lambda: (
+                otp_storage.__setitem__(fresh.email, {
+                    "otp": "123456", "created_at": timezone.now(), "user_id": fresh.id, "verified": True
+                }),
+                ("post", reverse("reset_password"), {"data": {
+                    "email": fresh.email, "otp": "123456", "new_password": "secret123", "confirm_password": "secret123",
+                }, **as_json}, 200, None),
+            )[1],
+            "my_complaints": lambda: ("get", reverse("my_complaints"), citizen, 200, None),
+            "create_complaint": lambda: ("post", reverse("create_complaint"), {"data": complaint, **as_json, **citizen}, 201, None),
+            "batch_create_complaints": lambda: ("post", reverse("batch_create_complaints"), {
+                "data": {"complaints": [complaint] * 3}, **as_json, **citizen
+            }, 201, None),
+            "search_complaints": lambda: ("get", reverse("search_complaints") + "?q=garbage", citizen, 200, None),
+            "complaint_detail": lambda: ("get", reverse("complaint_detail", args=[self.complaint.id]), citizen, 200, None),
+            "complaint_logs": lambda: ("get", reverse("complaint_logs", args=[self.complaint.id]), citizen, 200, None),
+            "upload_create": lambda: ("post", reverse("upload_create"), {
+                "data": {"filename": "photo.jpg", "size": 1000, "checksum": "a" * 64}, **as_json, **citizen
+            }, 201, None),
+            "upload_session": lambda: ("get", reverse("upload_session", args=[self.upload.id]), citizen, 200, None),
+            "similar_images": lambda: (
+                "get", reverse("similar_images") + f"?source=complaint&id={self.complaint.id}", officer, 200, None
+            ),
+            "categories": lambda: ("get", reverse("categories"), {}, 200, None),
+            "departments": lambda: ("get", reverse("departments"), {}, 200, None),
+            "facilities": lambda: ("get", reverse("facilities"), {}, 200, None),
+            "nearby_facilities": lambda: ("get", reverse("nearby_facilities") + "?lat=18.52&lng=73.85", {}, 200, None),
+            "facility_detail": lambda: ("get", reverse("facility_detail", args=[self.facility.id]), {}, 200, None),
+            "rate_facility": lambda: ("post", reverse("rate_facility", args=[self.facility.id]), {
+                "data": {"cleanliness_rating": 4}, **as_json, **citizen
+            }, 201, None),
+            "mark_attendance": lambda: ("get", reverse("mark_attendance"), {}, 200, self.superuser),
+            "metrics": lambda: ("get", reverse("metrics"), {}, 200, None),
+        }
+        return requests[name]()
+
+    def admin_request(self, name):
+        return ("get", reverse(name), {}, 200, self.superuser)
+
+    def measure(self, spec):
+        method, path, kwargs, expected_status, user = spec
+        # One session per user, like a browser: per-session work (staff
+        # provisioning) happens during warm-up, not in the measured request
+        if user not in self.clients:
+            self.clients[user] = Client()
+            if user is not None:
+                self.clients[user].force_login(user)
+        client = self.clients[user]
+        with CaptureQueriesContext(connection) as queries:
+            start = timezone.now()
+            response = getattr(client, method)(path, **kwargs)
+            elapsed_ms = (timezone.now() - start).total_seconds() * 1000
+        self.assertEqual(response.status_code, expected_status, f"{method.upper()} {path}: {response.content[:500]}")
+        return [q["sql"] for q in queries.captured_queries], elapsed_ms
+
+    def assertWithinBudgets(self, budgets, make_request):
+        for name in budgets:
+            self.measure(make_request(name))  # warm caches (content types, permissions, templates)
+        before = {name: self.measure(make_request(name))[0] for name in budgets}
+
+        self.grow()
+
+        for name, budget in budgets.items():
+            with self.subTest(page=name):
+                queries, elapsed_ms = self.measure(make_request(name))
+                self.assertEqual(
+                    len(queries), len(before[name]),
+                    f"{name}: {len(before[name])} queries before the data grew, {len(queries)} after. "
+                    f"Repeated per row:\n" + self.repeated(queries)
+                )
+                self.assertLessEqual(len(queries), budget, f"{name} over its query budget:\n" + "\n".join(queries))
+                self.assertLess(elapsed_ms, self.TIME_BUDGET_MS, f"{name} took {elapsed_ms:.0f} ms")
+
+    @staticmethod
+    def repeated(queries):
+        shapes = Counter(re.sub(r"\b\d+\b|'[^']*'", "?", sql) for sql in queries)
+        return "\n".join(f"{n}x {sql}" for sql, n in shapes.most_common() if n > 1)
+
+    # ------------------------
+    # Tests
+    # ------------------------
+
+    def test_every_route_has_a_budget(self):
+        resolver = get_resolver("civic_saathi.urls")
+        names = {pattern.name for pattern in resolver.url_patterns if pattern.name}
+        self.assertEqual(names - set(self.ROUTE_BUDGETS), set(), "Routes without a performance budget")
+
+    def test_every_admin_changelist_has_a_budget(self):
+        changelists = {
+            f"admin:{model._meta.app_label}_{model._meta.model_name}_changelist"
+            for model in municipal_admin._registry if model._meta.app_label == "civic_saathi"
+        }
+        self.assertEqual(changelists - set(self.ADMIN_BUDGETS), set(), "Admin changelists without a budget")
+
+    def test_routes_within_budget(self):
+        self.assertWithinBudgets(self.ROUTE_BUDGETS, self.route_request)
+
+    def test_admin_pages_within_budget(self):
+        self.assertWithinBudgets(self.ADMIN_BUDGETS, self.admin_request)
+
+    def test_officer_dashboard_within_budget(self):
+        officer_index = {"admin:index": self.ADMIN_BUDGETS["admin:index"]}
+        self.assertWithinBudgets(officer_index, lambda name: ("get", reverse(name), {}, 200, self.officer.user))
+
+    def test_staff_provisioned_once_per_session(self):
+        client = Client()
+        client.force_login(self.officer.user)
+        client.get(reverse("admin:index"))
+        officer = User.objects.get(pk=self.officer.user.pk)
+        self.assertTrue(officer.has_perm("civic_saathi.change_complaint"))
+        self.assertFalse(officer.has_perm("civic_saathi.change_department"))
+
+        with CaptureQueriesContext(connection) as queries:
+            client.get(reverse("admin:index"))
+        provisioning = [sql for sql in (q["sql"] for q in queries.captured_queries) if '"auth_group"."name"' in sql]
+        self.assertEqual(provisioning, [], "Staff group looked up again on a provisioned session")
+
+
+class NearbyFacilitiesTests(TestCase):
+    """The longitude window narrows with latitude: a degree of longitude at 60°N is ~55.5 km"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Sanitation")
+        for name, lng in [("East 3.9 km", 25.07), ("East 6.7 km", 25.12), ("West 3.9 km", 24.93)]:
+            Facility.objects.create(
+                name=name, facility_type="public_toilet", address=name,
+                location_lat=60.0, location_lng=lng, department=department
+            )
+
+    def test_longitude_window_at_high_latitude(self):
+        response = self.client.get(reverse("nearby_facilities") + "?lat=60&lng=25&radius=5")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            sorted(facility["name"] for facility in response.json()["data"]),
+            ["East 3.9 km", "West 3.9 km"]
+        )
+
+
+# ========================
+# Load testing and traffic capture
+# ========================
+
+class LoadTestAccountTests(TestCase):
+    """Load-test accounts (one is a superuser) need an explicit password and a local database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Department.objects.create(name="Sanitation")
+
+    def test_password_required(self):
+        for password in (None, ""):
+            with self.assertRaisesMessage(loadtest.LoadTestError, "--password is required"):
+                loadtest.prepare(2, password)
+        self.assertFalse(User.objects.filter(username__startswith=loadtest.PREFIX).exists())
+
+    def test_prepare_and_cleanup(self):
+        fixture = loadtest.prepare(2, "a-long-random-password")
+        admin = User.objects.get(username=fixture["admin"])
+        self.assertTrue(admin.is_superuser and admin.check_password("a-long-random-password"))
+        self.assertEqual(loadtest.cleanup(), 4)
+
+    def test_only_local_databases(self):
+        postgres = {"ENGINE": "django.db.backends.postgresql", "HOST": "localhost"}
+        self.assertTrue(loadtest.is_local_database(postgres))
+        self.assertTrue(loadtest.is_local_database({"ENGINE": "django.db.backends.sqlite3", "HOST": ""}))
+        self.assertFalse(loadtest.is_local_database({**postgres, "HOST": "containers-us-west-1.railway.app"}))
+        loadtest.check_local_database()
+
+
+class LoadTestReportTests(SimpleTestCase):
+    """Scenario mixes, percentiles and baseline comparisons"""
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadtest.parse_mix("my_complaints=3, nearby_facilities"),
+            {"my_complaints": 3.0, "nearby_facilities": 1.0},
+        )
+        for value, message in (
+            ("no_such_scenario=1", "Unknown scenario"),
+            ("my_complaints=lots", "Bad weight"),
+            ("my_complaints=-1", "Negative weight"),
+            ("my_complaints=0", "no scenario with a positive weight"),
+        ):
+            with self.assertRaisesMessage(loadtest.LoadTestError, message):
+                loadtest.parse_mix(value)
+
+    def test_percentile(self):
+        self.assertEqual(loadtest.percentile([], 95), 0.0)
+        self.assertEqual(loadtest.percentile([7], 99), 7)
+        ordered = [1, 2, 3, 4]
+        self.assertEqual(loadtest.percentile(ordered, 0), 1)
+        self.assertEqual(loadtest.percentile(ordered, 50), 2.5)
+        self.assertAlmostEqual(loadtest.percentile(ordered, 95), 3.85)
+        self.assertEqual(loadtest.percentile(ordered, 100), 4)
+
+    def test_compare(self):
+        def stats(rps, p95):
+            return {"rps": rps, "p50_ms": 10.0, "p95_ms": p95, "p99_ms": p95 * 2}
+
+        baseline = {
+            "endpoints": {"login": stats(100, 50), "my_complaints": stats(50, 100), "gone": stats(5, 5)},
+            "total": stats(155, 80),
+        }
+        current = {
+            "endpoints": {"login": stats(100, 60), "my_complaints": stats(40, 105), "new": stats(5, 5)},
+            "total": stats(145, 85),
+        }
+        rows = {row["label"]: row for row in loadtest.compare(baseline, current, threshold=10)}
+
+        self.assertEqual(list(rows), ["gone", "login", "my_complaints", "new", "total"])
+        self.assertEqual(rows["login"]["change"]["p95_ms"], 20.0)
+        self.assertTrue(rows["login"]["regressed"])  # p95 up 20%
+        self.assertEqual(rows["my_complaints"]["change"]["rps"], -20.0)
+        self.assertTrue(rows["my_complaints"]["regressed"])  # throughput down 20%
+        self.assertFalse(rows["total"]["regressed"])  # p95 +6.2%, rps -6.5%
+        # Endpoints in only one run are listed but never count as regressions
+        self.assertEqual((rows["gone"]["current"], rows["gone"]["change"], rows["gone"]["regressed"]), (None, {}, False))
+        self.assertIsNone(rows["new"]["baseline"])
+
+
+class TrafficCaptureTests(SimpleTestCase):
+    """Captured request shapes keep sizes and numbers, never text a user typed"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_json_body_shape(self):
+        request = self.factory.post(
+            reverse("create_complaint"),
+            json.dumps({"title": "Leak at 12 MG Road", "category": 3, "tags": ["urgent"], "photo": None}),
+            content_type="application/json",
+        )
+        self.assertEqual(traffic.body_shape(request), ("json", {"$obj": {
+            "title": {"$str": 18}, "category": 3, "tags": {"$list": 1, "$item": {"$str": 6}}, "photo": None,
+        }}))
+        self.assertEqual(traffic.body_shape(self.factory.get(reverse("my_complaints"))), (None, None))
+
+        with override_settings(TRAFFIC_CAPTURE_MAX_BODY=10):
+            self.assertEqual(traffic.body_shape(request), ("json", None))
+        broken = self.factory.post(reverse("create_complaint"), "{not json", content_type="application/json")
+        self.assertEqual(traffic.body_shape(broken), (None, None))
+
+    def test_multipart_body_shape(self):
+        photo = SimpleUploadedFile("me.jpg", b"x" * 50, content_type="image/jpeg")
+        request = self.factory.post(reverse("rate_facility", args=[1]), {"cleanliness_rating": "4", "comment": "Dirty", "photo": photo})
+        self.assertEqual(traffic.body_shape(request), ("multipart", {"$obj": {
+            "cleanliness_rating": "4", "comment": {"$str": 5}, "photo": {"$file": 50, "$type": "image/jpeg"},
+        }}))
+
+    def test_query_shape(self):
+        query = QueryDict("q=Ramesh Kumar&page=2&status=pending")
+        self.assertEqual(
+            traffic.query_shape(query, keep={"status"}),
+            {"q": {"$str": 12}, "page": "2", "status": "pending"},
+        )
+
+    def test_record(self):
+        body = json.dumps({"title": "Leak near Ramesh's house", "category": 3})
+        request = self.factory.post(
+            reverse("create_complaint") + "?source=app&page=2&email=ramesh@example.com",
+            body, content_type="application/json",
+        )
+        request.user = AnonymousUser()
+        request.resolver_match = resolve(reverse("create_complaint"))
+        entry = traffic.record(request, HttpResponse(status=201), 1700000000.12345, 0.0421, traffic.body_shape(request))
+        self.assertEqual(entry["v"], "create_complaint")
+        self.assertEqual((entry["m"], entry["s"], entry["d"], entry["role"], entry["ct"]), ("POST", 201, 42.1, "anonymous", "json"))
+        self.assertEqual(entry["q"], {"source": "app", "page": "2", "email": {"$str": 18}})
+        self.assertEqual(entry["b"], len(body))
+        self.assertNotIn("Ramesh", json.dumps(entry))
+        self.assertNotIn("ramesh", json.dumps(entry))
+
+        with override_settings(TRAFFIC_CAPTURE_EXCLUDE=["create_complaint"]):
+            self.assertIsNone(traffic.record(request, HttpResponse(), 0, 0, (None, None)))
+
+
+# ========================
+# Request profiling
+# ========================
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATES="", PROFILING_MAX_REPORTS=3)
+class ProfilingTests(TestCase):
+    """X-Profile from staff (session or DRF token) stores a ProfileReport; anyone else is served normally"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user("profile_citizen", password="password")
+        cls.staff = User.objects.create_user("profile_staff", password="password", is_staff=True)
+
+    def get(self, user, mode="1"):
+        token, _ = Token.objects.get_or_create(user=user)
+        return self.client.get(reverse("my_complaints"), HTTP_AUTHORIZATION=f"Token {token.key}", HTTP_X_PROFILE=mode)
+
+    def test_non_staff_not_profiled(self):
+        response = self.get(self.citizen)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Report", response)
+        self.assertFalse(ProfileReport.objects.exists())
+
+    def test_staff_token_gets_a_report(self):
+        response = self.get(self.staff)
+        self.assertEqual(response.status_code, 200)
+        report = ProfileReport.objects.get(pk=response["X-Profile-Report"])
+        self.assertEqual((report.user, report.trigger, report.view_name), (self.staff, "staff", "my_complaints"))
+        self.assertIn("cumulative", report.cpu_report)
+        self.assertTrue(report.alloc_report)
+
+    def test_cpu_mode_skips_allocations(self):
+        report = ProfileReport.objects.get(pk=self.get(self.staff, "cpu")["X-Profile-Report"])
+        self.assertTrue(report.cpu_report)
+        self.assertEqual(report.alloc_report, "")
+
+    def test_old_reports_pruned(self):
+        ids = [int(self.get(self.staff, "cpu")["X-Profile-Report"]) for _ in range(3)]
+        ProfileReport.objects.filter(pk=ids[0]).update(created_at=timezone.now() - timedelta(days=1))
+        newest = int(self.get(self.staff, "cpu")["X-Profile-Report"])
+        self.assertEqual(set(ProfileReport.objects.values_list("pk", flat=True)), {*ids[1:], newest})
+
+    def test_busy_profiler_serves_request_unprofiled(self):
+        with mock.patch.object(profiling.cProfile.Profile, "enable", side_effect=ValueError("already active")):
+            response = self.get(self.staff)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Report", response)
+        self.assertFalse(ProfileReport.objects.exists())
+
+    def test_parse_sample_rates_skips_bad_entries(self):
+        with self.assertLogs("civic_saathi.profiling", "WARNING"):
+            rates = profiling.parse_sample_rates("my_complaints=0.5, bad, profile=often, =0.3, municipal_admin:index=2")
+        self.assertEqual(rates, {"my_complaints": 0.5, "municipal_admin:index": 1.0})
+
+
+# ========================
+# Metrics across gunicorn workers
+# ========================
+
+class MultiprocessMetricsTests(TestCase):
+    """A scrape of any worker reports the sum over all workers (PROMETHEUS_MULTIPROC_DIR)"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def worker(self, value):
+        """Record samples in a separate process, like one gunicorn worker; returns its pid"""
+        code = (
+            "import os, sys\n"
+            "from civic_saathi import metrics\n"
+            "value = int(sys.argv[1])\n"
+            "metrics.REQUEST_QUERIES.labels('home').observe(value)\n"
+            "metrics.COMMAND_RUNS.labels('auto_escalate', 'success').inc()\n"
+            "metrics.DB_POOL_SIZE.labels('default').set(value)\n"
+            "print(os.getpid())"
+        )
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": self.directory}
+        result = subprocess.run(
+            [sys.executable, "-c", code, str(value)], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return int(result.stdout)
+
+    def scrape(self):
+        with mock.patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": self.directory}):
+            text = metrics.render().decode()
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(text)
+            for sample in family.samples
+        }
+
+    def test_samples_summed_over_workers(self):
+        first = self.worker(3)
+        self.worker(4)
+
+        samples = self.scrape()
+        self.assertEqual(samples[("civic_request_db_queries_count", (("view", "home"),))], 2)
+        self.assertEqual(samples[("civic_request_db_queries_sum", (("view", "home"),))], 7)
+        self.assertEqual(samples[("civic_command_runs_total", (("command", "auto_escalate"), ("result", "success")))], 2)
+        self.assertEqual(samples[("civic_db_pool_connections", (("alias", "default"),))], 7)
+
+        # gunicorn's child_exit: a dead worker's live gauges go, its counters stay
+        multiprocess.mark_process_dead(first, self.directory)
+        samples = self.scrape()
+        self.assertEqual(samples[("civic_db_pool_connections", (("alias", "default"),))], 4)
+        self.assertEqual(samples[("civic_command_runs_total", (("command", "auto_escalate"), ("result", "success")))], 2)
+
+
+# ========================
+# Request instrumentation
+# ========================
+
+@override_settings(REQUEST_INSTRUMENTATION_ENABLED=True, SLOW_REQUEST_MS=60_000, SLOW_REQUEST_QUERIES=1000)
+class RequestInstrumentationTests(TestCase):
+    """Server-Timing on every request, one JSON record per slow request"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user("timing_citizen", password="password")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.citizen).key}"}
+
+    def get(self):
+        return self.client.get(reverse("my_complaints"), **self.auth)
+
+    def test_server_timing_header(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="[1-9]\d* queries", view;dur=[\d.]+, total;dur=[\d.]+$')
+
+    def test_fast_request_not_logged(self):
+        with self.assertNoLogs("civic_saathi.slow_requests"):
+            self.get()
+
+    def test_slow_request_logged_once(self):
+        for threshold in ({"SLOW_REQUEST_MS": 0}, {"SLOW_REQUEST_QUERIES": 1}):
+            with self.subTest(**threshold), override_settings(**threshold):
+                with self.assertLogs("civic_saathi.slow_requests", "WARNING") as logs:
+                    self.get()
+                self.assertEqual(len(logs.records), 1)
+                record = json.loads(logs.records[0].getMessage())
+                self.assertEqual(set(record), {
+                    "method", "path", "view", "status", "user_id", "total_ms", "view_ms",
+                    "db_ms", "queries", "slowest", "repeated",
+                })
+                self.assertEqual(
+                    (record["method"], record["path"], record["view"], record["status"], record["user_id"]),
+                    ("GET", reverse("my_complaints"), "my_complaints", 200, self.citizen.id),
+                )
+                self.assertGreater(record["queries"], 0)
+                self.assertLessEqual(len(record["slowest"]), settings.REQUEST_INSTRUMENTATION_TOP_QUERIES)
+
+    @override_settings(REQUEST_INSTRUMENTATION_ENABLED=False)
+    def test_disabled_middleware_not_used(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            RequestInstrumentationMiddleware(lambda request: HttpResponse())
+        self.assertNotIn("Server-Timing", self.get())
+
+
+# ========================
+# Photo hashes and storage
+# ========================
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class PhotoHashTests(TestCase):
+    """Photos are hashed when they change; stored files are only removed offline"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user("hash_citizen", password="password")
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def complaint(self, name="bin.png"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Complaint.objects.create(
+                user=self.citizen, title="Overflowing bin", description="Bin overflowing", location="Ward 7",
+                image=SimpleUploadedFile(name, ChunkedUploadAttachTests.png(), content_type="image/png"),
+            )
+
+    def test_identical_uploads_keep_their_own_files(self):
+        first, second = self.complaint(), self.complaint()
+        hashes = ImageHash.objects.order_by("object_id")
+        self.assertEqual(len({h.sha256 for h in hashes}), 1)
+        self.assertEqual([h.file for h in hashes], [first.image.name, second.image.name])
+        self.assertNotEqual(first.image.name, second.image.name)
+        for complaint in (first, second):
+            complaint.refresh_from_db()
+            self.assertTrue(complaint.image.storage.exists(complaint.image.name))
+
+    def test_hashed_only_when_the_photo_changes(self):
+        complaint = Complaint.objects.get(pk=self.complaint().pk)
+        with mock.patch("civic_saathi.photo_hashes.hash_image") as hash_image:
+            with self.captureOnCommitCallbacks(execute=True):
+                complaint.status = "in_progress"
+                complaint.save()
+            hash_image.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                complaint.image = SimpleUploadedFile("other.png", ChunkedUploadAttachTests.png(), content_type="image/png")
+                complaint.save()
+            hash_image.assert_called_once_with("complaint", complaint.pk)
+
+    def test_reclaim_deletes_only_old_unreferenced_files(self):
+        kept = self.complaint().image.name
+        directory = os.path.join(self.media, "complaints")
+        old, fresh = os.path.join(directory, "orphan.png"), os.path.join(directory, "fresh.png")
+        for path in (old, fresh):
+            with open(path, "wb") as f:
+                f.write(b"photo")
+        day_ago = (timezone.now() - timedelta(days=1, hours=1)).timestamp()
+        os.utime(old, (day_ago, day_ago))
+        os.utime(os.path.join(self.media, kept), (day_ago, day_ago))
+
+        call_command("reclaim_photo_storage", "--dry-run", stdout=StringIO())
+        self.assertTrue(os.path.exists(old))
+
+        call_command("reclaim_photo_storage", stdout=StringIO())
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(fresh))
+        self.assertTrue(os.path.exists(os.path.join(self.media, kept)))
+
+
+# ========================
+# Facility rating photos
+# ========================
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class FacilityRatingPhotoTests(TestCase):
+    """Rating photos are validated as images before they are stored or hashed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Sanitation")
+        cls.facility = Facility.objects.create(
+            name="Ward Toilet", facility_type="public_toilet", address="Ward 1",
+            location_lat=18.52, location_lng=73.85, department=department
+        )
+        cls.citizen = User.objects.create_user("rating_citizen", password="password")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.citizen).key}"}
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def rate(self, photo=None, rating="4"):
+        data = {"cleanliness_rating": rating, "is_anonymous": "true"}
+        if photo is not None:
+            data["photo"] = photo
+        return self.client.post(reverse("rate_facility", args=[self.facility.id]), data, **self.auth)
+
+    def test_image_photo_stored(self):
+        photo = SimpleUploadedFile("toilet.png", ChunkedUploadAttachTests.png(), content_type="image/png")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.rate(photo)
+        self.assertEqual(response.status_code, 201, response.content)
+        rating = FacilityRating.objects.get()
+        self.assertTrue(rating.photo.name.endswith(".png"))
+        self.assertEqual((rating.user, rating.cleanliness_rating), (None, 4))
+
+    def test_invalid_photos_rejected(self):
+        fake = SimpleUploadedFile("toilet.png", b"<html>not an image</html>", content_type="image/png")
+        response = self.rate(fake)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("photo", response.json()["errors"])
+
+        with override_settings(UPLOAD_MAX_SIZE=10):
+            photo = SimpleUploadedFile("toilet.png", ChunkedUploadAttachTests.png(), content_type="image/png")
+            response = self.rate(photo)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("photo", response.json()["errors"])
+
+        response = self.rate(rating="9")
+        self.assertEqual(response.json()["message"], "Rating must be between 1 and 5")
+        self.assertFalse(FacilityRating.objects.exists())
+
+
+# ========================
+# Near-duplicate complaints
+# ========================
+
+@override_settings(DEDUP_ENABLED=True, DEDUP_WINDOW_HOURS=72, DEDUP_SIMILARITY_THRESHOLD=0.5)
+class ComplaintDedupTests(TestCase):
+    """MinHash/LSH linking of repeat reports of the same open issue"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.sanitation = Department.objects.create(name="Sanitation")
+        cls.roads = Department.objects.create(name="Roads")
+        cls.category = ComplaintCategory.objects.create(name="Garbage Collection", department=cls.sanitation)
+        cls.citizen = User.objects.create_user("dedup_citizen", password="password")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.citizen).key}"}
+
+    def complaint(self, title, department=None, **fields):
+        return Complaint.objects.create(
+            user=self.citizen, title=title, description="Garbage has not been collected near the market",
+            location="Ward 7, Shivaji Nagar", department=department or self.sanitation, **fields
+        )
+
+    def test_similarity_tolerates_typos_not_other_issues(self):
+        original = self.complaint("Overflowing garbage bin")
+        typo = self.complaint("Overflowng garbage bins")
+        other = Complaint(
+            title="Streetlight not working", description="Dark lane behind the bus depot at night",
+            location="Ward 31, Kothrud",
+        )
+        signature = dedup.minhash(dedup.shingles(original))
+        self.assertGreater(dedup.similarity(signature, dedup.minhash(dedup.shingles(typo))), 0.7)
+        self.assertLess(dedup.similarity(signature, dedup.minhash(dedup.shingles(other))), 0.2)
+
+    def test_register_links_to_the_original(self):
+        original = self.complaint("Overflowing garbage bin")
+        self.assertIsNone(dedup.register(original))
+
+        repeat = self.complaint("Overflowing garbage bin!")
+        self.assertEqual(dedup.register(repeat), original.id)
+        repeat.refresh_from_db()
+        self.assertEqual(repeat.duplicate_of_id, original.id)
+        self.assertTrue(ComplaintLog.objects.filter(
+            complaint=repeat, note=f"Linked as duplicate of complaint #{original.id}"
+        ).exists())
+
+        # A duplicate of the duplicate still points at the original
+        third = self.complaint("Overflowing garbage bin")
+        self.assertEqual(dedup.register(third), original.id)
+
+    def test_register_skips_other_departments_closed_and_old_complaints(self):
+        dedup.register(self.complaint("Overflowing garbage bin", department=self.roads))
+        dedup.register(self.complaint("Overflowing garbage bin", status="resolved"))
+        old = self.complaint("Overflowing garbage bin")
+        Complaint.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(hours=100))
+        old.refresh_from_db()
+        dedup.register(old)
+
+        self.assertIsNone(dedup.register(self.complaint("Overflowing garbage bin")))
+
+    def test_create_view_reports_the_link(self):
+        def create():
+            return self.client.post(reverse("create_complaint"), {
+                "title": "Overflowing garbage bin", "description": "Garbage has not been collected near the market",
+                "category": self.category.id, "location": "Ward 7, Shivaji Nagar",
+            }, content_type="application/json", **self.auth)
+
+        first = create()
+        self.assertEqual(first.status_code, 201, first.content)
+        self.assertEqual(first.json()["message"], "Complaint submitted successfully!")
+
+        second = create()
+        self.assertEqual(second.status_code, 201)
+        self.assertIn("linked", second.json()["message"])
+        self.assertEqual(Complaint.objects.get(pk=second.json()["data"]["id"]).duplicate_of_id, first.json()["data"]["id"])
+
+    @override_settings(DEDUP_ENABLED=False)
+    def test_create_view_skips_dedup_when_disabled(self):
+        for _ in range(2):
+            self.client.post(reverse("create_complaint"), {
+                "title": "Overflowing garbage bin", "description": "Garbage has not been collected near the market",
+                "category": self.category.id, "location": "Ward 7, Shivaji Nagar",
+            }, content_type="application/json", **self.auth)
+        self.assertFalse(Complaint.objects.filter(duplicate_of__isnull=False).exists())
+
+
+# ========================
+# Complaint search
+# ========================
+
+class ComplaintSearchTests(TestCase):
+    """The search document (FTS5 / tsvector) matches, ranks, follows edits and is scoped per role"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.roads = Department.objects.create(name="Roads")
+        cls.water = Department.objects.create(name="Water Supply")
+        cls.citizen = User.objects.create_user("fts_citizen", password="password")
+        cls.neighbour = User.objects.create_user("fts_neighbour", password="password")
+        cls.officer = User.objects.create_user("fts_officer", password="password", is_staff=True)
+        Officer.objects.create(user=cls.officer, department=cls.roads)
+        worker_user = User.objects.create_user("fts_worker", password="password")
+        cls.worker = Worker.objects.create(user=worker_user, department=cls.roads, role="Mason", joining_date=date(2024, 1, 1))
+        cls.admin = User.objects.create_superuser("fts_admin", password="password")
+
+        cls.pothole = Complaint.objects.create(
+            user=cls.citizen, department=cls.roads, current_worker=cls.worker,
+            title="Deep pothole near the school", description="Two scooters fell this week", location="Ward 7",
+        )
+        cls.mention = Complaint.objects.create(
+            user=cls.citizen, department=cls.roads,
+            title="Broken footpath", description="Slabs missing next to a pothole", location="Ward 7",
+        )
+        cls.leak = Complaint.objects.create(
+            user=cls.neighbour, department=cls.water,
+            title="Pipeline leak", description="Water wasted near the pothole on MG Road", location="Ward 9",
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, user, query):
+        token, _ = Token.objects.get_or_create(user=user)
+        response = self.client.get(reverse("search_complaints"), {"q": query}, HTTP_AUTHORIZATION=f"Token {token.key}")
+        self.assertEqual(response.status_code, 200, response.content)
+        return [c["id"] for c in response.json()["data"]]
+
+    def test_word_and_prefix_matches(self):
+        self.assertEqual(set(self.search(self.admin, "scooters")), {self.pothole.id})
+        self.assertEqual(set(self.search(self.admin, "pipel")), {self.leak.id})
+        self.assertEqual(set(self.search(self.admin, "foot slab")), {self.mention.id})
+        self.assertEqual(self.search(self.admin, "streetlight"), [])
+
+    def test_title_matches_rank_first(self):
+        if search.backend(connection) == "basic":
+            self.skipTest("needs FTS5 or PostgreSQL full-text search")
+        self.assertEqual(self.search(self.admin, "pothole")[0], self.pothole.id)
+
+    def test_tracking_id(self):
+        tracking_id = f"CMP-{self.leak.created_at.year}-{self.leak.id:05d}"
+        self.assertEqual(self.search(self.admin, tracking_id), [self.leak.id])
+        self.assertEqual(self.search(self.admin, str(self.leak.id)), [self.leak.id])
+
+    def test_index_follows_edits(self):
+        self.mention.title = "Collapsed culvert"
+        self.mention.save()
+        self.assertEqual(self.search(self.admin, "culvert"), [self.mention.id])
+        self.assertEqual(self.search(self.admin, "footpath"), [])
+
+        Complaint.objects.filter(pk=self.leak.pk).update(description="Water wasted on MG Road")
+        self.assertNotIn(self.leak.id, self.search(self.admin, "pothole"))
+
+    def test_results_scoped_by_role(self):
+        self.assertEqual(set(self.search(self.citizen, "pothole")), {self.pothole.id, self.mention.id})
+        self.assertEqual(self.search(self.neighbour, "pothole"), [self.leak.id])
+        self.assertEqual(set(self.search(self.officer, "pothole")), {self.pothole.id, self.mention.id})
+        self.assertEqual(self.search(self.worker.user, "pothole"), [self.pothole.id])
+
+    def test_admin_search_box(self):
+        self.client.force_login(self.admin)
+        url = reverse("admin:civic_saathi_complaint_changelist")
+
+        def results(query):
+            response = self.client.get(url, {"q": query})
+            self.assertEqual(response.status_code, 200)
+            return {c.id for c in response.context["cl"].result_list}
+
+        self.assertEqual(results("pipel"), {self.leak.id})
+        self.assertEqual(results("fts_neighbour"), {self.leak.id})
+        self.assertEqual(results("pothole"), {self.pothole.id, self.mention.id, self.leak.id})
+
+
+class ComplaintSearchLimitTests(TestCase):
+    """?limit is clamped to 1-50"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user("search_citizen", password="password")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.citizen).key}"}
+        for n in range(3):
+            Complaint.objects.create(
+                user=cls.citizen, title=f"Garbage pile {n}", description="Garbage not collected for a week",
+                location=f"Ward {n}",
+            )
+
+    def search(self, limit):
+        response = self.client.get(reverse("search_complaints"), {"q": "garbage", "limit": limit}, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return len(response.json()["data"])
+
+    def test_limit_clamped(self):
+        self.assertEqual(self.search(2), 2)
+        self.assertEqual(self.search(-1), 1)
+        self.assertEqual(self.search(0), 1)
+        self.assertEqual(self.search(500), 3)
+        self.assertEqual(self.search("many"), 3)
+
+
+# ========================
+# Estimated admin counts
+# ========================
+
+@override_settings(ADMIN_EXACT_COUNT_THRESHOLD=100)
+class EstimatedCountPaginatorTests(TestCase):
+    """Planner estimates replace COUNT(*) only for big results"""
+
+    @classmethod
+    def setUpTestData(cls):
+        citizen = User.objects.create_user("paginator_citizen", password="password")
+        Complaint.objects.bulk_create([
+            Complaint(user=citizen, title=f"Pothole {n}", description="Pothole", location=f"Ward {n}")
+            for n in range(5)
+        ])
+
+    def count(self, estimate):
+        queryset = Complaint.objects.order_by("id")
+        with mock.patch("civic_saathi.paginators.estimate_count", return_value=estimate):
+            with CaptureQueriesContext(connection) as queries:
+                count = EstimatedCountPaginator(queryset, 2).count
+        return count, len(queries)
+
+    def test_exact_count_without_estimate(self):
+        self.assertEqual(self.count(None), (5, 1))
+
+    def test_exact_count_below_threshold(self):
+        self.assertEqual(self.count(99), (5, 1))
+
+    def test_estimate_trusted_above_threshold(self):
+        self.assertEqual(self.count(250_000), (250_000, 0))
+
+    def test_estimate_count(self):
+        queryset = Complaint.objects.filter(title__startswith="Pothole")
+        if connection.vendor != "postgresql":
+            self.assertIsNone(estimate_count(queryset))
+            return
+        # Filtered querysets are estimated with EXPLAIN, which always has a row estimate
+        self.assertIsInstance(estimate_count(queryset), int)
+
+
+# ========================
+# Complaint export
+# ========================
+
+class ComplaintCsvExportTests(TestCase):
+    """Citizen text can't turn into spreadsheet formulas"""
+
+    def test_formula_cells_are_prefixed(self):
+        citizen = User.objects.create_user("export_citizen", password="password")
+        Complaint.objects.create(
+            user=citizen, title="=HYPERLINK(\"http://evil.example\")", description="Garbage",
+            location="@SUM(A1:A9)",
+        )
+        Complaint.objects.create(user=citizen, title="Pothole - Ward 4", description="Pothole", location="-1+2")
+
+        rows = list(csv.reader("".join(exports.iter_csv(Complaint.objects.all())).splitlines()))
+        header, first, second = rows
+        title, location = header.index("title"), header.index("location")
+
+        self.assertEqual(first[title], "'=HYPERLINK(\"http://evil.example\")")
+        self.assertEqual(first[location], "'@SUM(A1:A9)")
+        self.assertEqual(second[title], "Pothole - Ward 4")
+        self.assertEqual(second[location], "'-1+2")
+
+
+# ========================
+# Batch complaint ingestion
+# ========================
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ComplaintBatchIngestTests(TestCase):
+    """Bulk inserts with registration emails deferred until the batch commits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Sanitation")
+        cls.category = ComplaintCategory.objects.create(name="Garbage Collection", department=department)
+        cls.citizen = User.objects.create_user("batch_citizen", email="citizen@example.com", password="password")
+        cls.staff = User.objects.create_user("batch_staff", email="staff@example.com", password="password", is_staff=True)
+
+    def item(self, n, **fields):
+        return {
+            "title": f"Overflowing garbage bin {n}", "description": "The bin has not been emptied for days",
+            "category": self.category.id, "location": f"Ward {n}", **fields,
+        }
+
+    def post(self, user, items):
+        return self.client.post(reverse("batch_create_complaints"), {
+            "complaints": items, "source": "call centre",
+        }, content_type="application/json", HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=user).key}")
+
+    def test_valid_items_inserted_and_emails_deferred(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.post(self.citizen, [self.item(1), self.item(2), self.item(3, category=999999)])
+
+        self.assertEqual(response.status_code, 201, response.content)
+        data = response.json()["data"]
+        self.assertEqual((data["created"], data["failed"]), (2, 1))
+        self.assertIn("category", data["results"][2]["errors"])
+        complaints = Complaint.objects.filter(user=self.citizen).order_by("id")
+        self.assertEqual([c.id for c in complaints], [r["id"] for r in data["results"][:2]])
+        self.assertEqual(ComplaintLog.objects.filter(note="Complaint registered via call centre").count(), 2)
+
+        # Nothing is sent until the batch commits, then one task emails the whole batch
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        for complaint in complaints:
+            self.assertTrue(any(
+                f"#{complaint.id}:" in message.subject and "citizen@example.com" in message.to
+                for message in mail.outbox
+            ))
+
+    def test_only_staff_file_for_others(self):
+        response = self.post(self.citizen, [self.item(1, user_id=self.staff.id)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("user_id", response.json()["data"]["results"][0]["errors"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(self.staff, [self.item(1, user_id=self.citizen.id)])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Complaint.objects.get().user, self.citizen)
+
+    def test_no_task_without_notify_or_valid_items(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            ingest.ingest_complaints([self.item(1)], self.citizen, notify=False)
+            ingest.ingest_complaints([self.item(2, category=999999)], self.citizen)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(Complaint.objects.count(), 1)
+
+
+# ========================
+# Chunked uploads
+# ========================
+
+class ChunkedUploadProtocolTests(TestCase):
+    """Offsets, chunk and file checksums, resuming and ownership of upload sessions"""
+
+    content = bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.citizen = User.objects.create_user("chunk_citizen", password="password")
+        cls.other = User.objects.create_user("chunk_other", password="password")
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(UPLOAD_SESSION_ROOT=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.upload_id = self.start(self.citizen, hashlib.sha256(self.content).hexdigest())
+
+    def auth(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+    def start(self, user, checksum):
+        response = self.client.post(reverse("upload_create"), {
+            "filename": "photo.png", "size": len(self.content), "checksum": checksum,
+        }, content_type="application/json", **self.auth(user))
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()["data"]["upload_id"]
+
+    def send(self, offset, data, user=None, upload_id=None, **headers):
+        return self.client.patch(
+            reverse("upload_session", args=[upload_id or self.upload_id]), data,
+            content_type="application/octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+            **headers, **self.auth(user or self.citizen),
+        )
+
+    def session(self, upload_id=None):
+        return UploadSession.objects.get(pk=upload_id or self.upload_id)
+
+    def test_chunks_assemble_the_file(self):
+        self.assertEqual(self.send(0, self.content[:600])["Upload-Offset"], "600")
+        response = self.send(600, self.content[600:])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["data"]["status"], "complete")
+        self.assertEqual(uploads.session_path(self.session()).read_bytes(), self.content)
+
+    def test_offset_mismatch_returns_current_offset(self):
+        self.send(0, self.content[:100])
+        response = self.send(50, self.content[50:150])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Upload-Offset"], "100")
+        self.assertEqual(response.json()["data"]["offset"], 100)
+
+    def test_resume_after_partial_chunk(self):
+        # The connection drops 300 bytes into a 700-byte chunk sent without a checksum
+        session = self.session()
+        self.assertEqual(uploads.write_chunk(session, 0, BytesIO(self.content[:300]), 700), 300)
+
+        response = self.client.get(reverse("upload_session", args=[self.upload_id]), **self.auth(self.citizen))
+        self.assertEqual(response["Upload-Offset"], "300")
+        response = self.send(300, self.content[300:])
+        self.assertEqual(response.json()["data"]["status"], "complete")
+        self.assertEqual(uploads.session_path(session).read_bytes(), self.content)
+
+    def test_chunk_checksum_mismatch_keeps_offset(self):
+        self.send(0, self.content[:100])
+        response = self.send(
+            100, self.content[100:200], HTTP_UPLOAD_CHECKSUM=f"sha256 {hashlib.sha256(b'other').hexdigest()}"
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response["Upload-Offset"], "100")
+        self.assertEqual(self.session().received_bytes, 100)
+        self.assertEqual(uploads.session_path(self.session()).stat().st_size, 100)
+
+        good = f"sha256 {hashlib.sha256(self.content[100:200]).hexdigest()}"
+        self.assertEqual(self.send(100, self.content[100:200], HTTP_UPLOAD_CHECKSUM=good)["Upload-Offset"], "200")
+
+    def test_file_checksum_mismatch_resets_session(self):
+        upload_id = self.start(self.citizen, hashlib.sha256(b"something else").hexdigest())
+        self.send(0, self.content[:600], upload_id=upload_id)
+        response = self.send(600, self.content[600:], upload_id=upload_id)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response["Upload-Offset"], "0")
+        session = self.session(upload_id)
+        self.assertEqual((session.received_bytes, session.status), (0, "uploading"))
+        self.assertFalse(uploads.session_path(session).exists())
+
+    def test_chunk_past_declared_size_rejected(self):
+        response = self.send(0, self.content + b"extra")
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(self.session().received_bytes, 0)
+
+    def test_other_users_session_not_found(self):
+        response = self.send(0, self.content[:100], user=self.other)
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("upload_session", args=[self.upload_id]), **self.auth(self.other))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.session().received_bytes, 0)
+
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ChunkedUploadAttachTests(TestCase):
+    """A completed upload must be an image, and can be attached to one complaint only"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = Department.objects.create(name="Sanitation")
+        cls.category = ComplaintCategory.objects.create(name="Garbage Collection", department=department)
+        cls.citizen = User.objects.create_user("upload_citizen", password="password")
+        cls.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=cls.citizen).key}"}
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=directory, UPLOAD_SESSION_ROOT=os.path.join(directory, "sessions"))
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def make_upload(self, content, filename="photo.png"):
+        session = UploadSession.objects.create(
+            user=self.citizen, filename=filename, total_size=len(content), received_bytes=len(content),
+            checksum=hashlib.sha256(content).hexdigest(), status="complete",
+        )
+        uploads.session_path(session).write_bytes(content)
+        return session
+
+    @staticmethod
+    def png():
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (8, 8), "red").save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def create(self, upload):
+        return self.client.post(reverse("create_complaint"), {
+            "title": "Overflowing garbage bin", "description": "The bin near the school has overflowed for days",
+            "category": self.category.id, "location": "Ward 7", "upload_id": str(upload.id),
+        }, content_type="application/json", **self.auth)
+
+    def test_image_attached_once(self):
+        upload = self.make_upload(self.png())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create(upload)
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Complaint.objects.get().image.name.endswith(".png"))
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "consumed")
+        self.assertFalse(uploads.session_path(upload).exists())
+
+        self.assertEqual(self.create(upload).status_code, 400)
+        self.assertEqual(Complaint.objects.count(), 1)
+
+    def test_concurrent_creates_consume_once(self):
+        upload = self.make_upload(self.png())
+        request = RequestFactory().post("/")
+        request.user = self.citizen
+        data = {
+            "title": "Overflowing garbage bin", "description": "The bin near the school has overflowed for days",
+            "location": "Ward 7", "upload_id": str(upload.id),
+        }
+        first, second = (ComplaintCreateSerializer(data=data, context={"request": request}) for _ in range(2))
+        self.assertTrue(first.is_valid() and second.is_valid())
+        first.save(user=self.citizen)
+        with self.assertRaises(ValidationError):
+            second.save(user=self.citizen)
+        self.assertEqual(Complaint.objects.count(), 1)
+
+    def test_non_image_rejected(self):
+        upload = self.make_upload(b"<?php system($_GET['c']); ?>", filename="photo.png")
+        response = self.create(upload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("upload_id", response.json()["errors"])
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, "complete")
+        self.assertFalse(Complaint.objects.exists())
@@ -0,0 +1,469 @@
+"""
+Traffic capture and replay, for benchmarking against real request shapes.
+
+Capture (TrafficCaptureMiddleware, off unless TRAFFIC_CAPTURE_ENABLED):
+every sampled request that resolves to a view is appended as one JSON line
+to TRAFFIC_CAPTURE_DIR/traffic-<date>-<pid>.ndjson. A record holds the
+method, path, view name and the caller's role (anonymous / citizen /
+staff / superuser), plus the response status and duration. It also holds
+the *shape* of the query string and body:
+- numbers are kept;
+- strings are replaced by their length, except query parameters named in
+  TRAFFIC_CAPTURE_KEEP_PARAMS;
+- uploaded files are replaced by their size and content type.
+Headers, cookies, tokens and user ids are never written.
+
+Replay (replay_traffic command): the captured stream is re-issued in
+order against a local instance, at the captured pace or N times faster.
+Strings are filled with complaint-like words of the same length and files
+with a JPEG of the same size. Requests run as the load-test accounts (see
+loadtest.py) that match the captured role. Ids in paths are remapped to
+rows that exist locally, unless keep_ids is set (e.g. when replaying
+against a restored copy of production). Account-management endpoints and
+admin form posts are not replayed.
+"""
+from collections import Counter, defaultdict
+from pathlib import Path
+import heapq
+import io
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.urls import NoReverseMatch, Resolver404, resolve, reverse
+from django.utils import timezone
+
+from . import loadtest
+from .models import Complaint, ComplaintCategory
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+# Changing passwords, logging out or signing up would break the replay
+# accounts (or send email); admin form posts need real CSRF tokens and forms.
+SKIPPED_VIEWS = {
+    "register", "logout", "change_password", "forgot_password", "verify_otp", "reset_password", "metrics",
+}
+
+FILLER_WORDS = "garbage not collected near the bus stop water leaking drain blocked streetlight broken road pothole".split()
+
+# URL names whose `pk` refers to the requesting citizen's complaint, or to a facility
+COMPLAINT_VIEWS = {"complaint_detail", "complaint_logs"}
+FACILITY_VIEWS = {"facility_detail", "rate_facility"}
+ADMIN_OBJECT_VIEW = re.compile(r"^\w+:(\w+)_(change|history|delete)$")  # <admin site>:<app>_<model>_change
+# Body fields holding ids, remapped like path ids
+ID_FIELDS = {"category": "categories"}
+
+
+# ========================
+# Capture
+# ========================
+
+def role(user):
+    if user is None or not user.is_authenticated:
+        return "anonymous"
+    if user.is_superuser:
+        return "superuser"
+    if user.is_staff:
+        return "staff"
+    return "citizen"
+
+
+def shape(value):
+    """JSON value with strings replaced by their length ({"$str": n})"""
+    if isinstance(value, str):
+        return {"$str": len(value)}
+    if isinstance(value, list):
+        return {"$list": len(value), "$item": shape(value[0]) if value else None}
+    if isinstance(value, dict):
+        return {"$obj": {str(key): shape(item) for key, item in value.items()}}
+    return value  # numbers, booleans, null
+
+
+def body_shape(request):
+    """(content kind, shape) of the request body, read before the view runs. Never raises."""
+    if request.method not in ("POST", "PUT", "PATCH"):
+        return None, None
+    content_type = request.content_type or ""
+    try:
+        if content_type == "application/json":
+            if int(request.META.get("CONTENT_LENGTH") or 0) > settings.TRAFFIC_CAPTURE_MAX_BODY:
+                return "json", None
+            # request.body is cached, so the view can still parse it
+            return "json", shape(json.loads(request.body or b"null"))
+        if content_type in ("multipart/form-data", "application/x-www-form-urlencoded"):
+            # Form values are all strings; keep the numeric ones as numbers, as in JSON
+            fields = {key: value if NUMBER.match(value) else {"$str": len(value)} for key, value in request.POST.items()}
+            for key, file in request.FILES.items():
+                fields[key] = {"$file": file.size, "$type": file.content_type}
+            return ("multipart" if content_type == "multipart/form-data" else "form"), {"$obj": fields}
+    except Exception as e:
+        logger.debug(f"Traffic capture: unreadable body on {request.path}: {e}")
+    return None, None
+
+
+def query_shape(query_dict, keep):
+    query = {}
+    for key, value in query_dict.items():
+        query[key] = value if key in keep or NUMBER.match(value) else {"$str": len(value)}
+    return query
+
+
+def record(request, response, started, duration, body):
+    """The capture record for a finished request, or None if it isn't captured"""
+    match = getattr(request, "resolver_match", None)
+    if match is None or match.view_name in settings.TRAFFIC_CAPTURE_EXCLUDE:
+        return None
+    kind, body_value = body
+    entry = {
+        "ts": round(started, 3),
+        "m": request.method,
+        "p": request.path,
+        "v": match.view_name,
+        "role": role(getattr(request, "user", None)),
+        "s": response.status_code,
+        "d": round(duration * 1000, 1),
+    }
+    if request.GET:
+        entry["q"] = query_shape(request.GET, settings.TRAFFIC_CAPTURE_KEEP_PARAMS)
+    if request.META.get("CONTENT_LENGTH"):
+        entry["b"] = int(request.META["CONTENT_LENGTH"])
+    if kind:
+        entry["ct"] = kind
+        if body_value is not None:
+            entry["body"] = body_value
+    return entry
+
+
+class TrafficLog:
+    """Append-only NDJSON files, one per day per process (gunicorn workers don't share a file)"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._day = None
+        self._file = None
+
+    def write(self, entry):
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        day = timezone.localdate().isoformat()
+        with self._lock:
+            if day != self._day:
+                if self._file is not None:
+                    self._file.close()
+                self._file = open(self.directory / f"traffic-{day}-{os.getpid()}.ndjson", "a", buffering=1)
+                self._day = day
+            self._file.write(line)
+
+
+# ========================
+# Reading captures
+# ========================
+
+def capture_files(paths):
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob("traffic-*.ndjson")) if path.is_dir() else [path])
+    return files
+
+
+def _read_file(path):
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Traffic replay: skipping bad line {path}:{n}")
+
+
+def read(paths):
+    """Records from all capture files, merged by timestamp (each file is already close to ordered)"""
+    return heapq.merge(*(_read_file(path) for path in capture_files(paths)), key=lambda entry: entry["ts"])
+
+
+# ========================
+# Rebuilding requests
+# ========================
+
+def filler(length, offset=0):
+    words = FILLER_WORDS[offset % len(FILLER_WORDS):] + FILLER_WORDS
+    text = " ".join(words)
+    while len(text) < length:
+        text += " " + text
+    return text[:length]
+
+
+def build(value, rng):
+    """Inverse of shape(): a value with the same structure and string lengths"""
+    if isinstance(value, dict):
+        if "$str" in value:
+            return filler(value["$str"], rng.randrange(len(FILLER_WORDS)))
+        if "$list" in value:
+            return [build(value["$item"], rng) for _ in range(value["$list"])]
+        if "$obj" in value:
+            return {key: build(item, rng) for key, item in value["$obj"].items()}
+    return value
+
+
+def upload(size, photo):
+    """A valid JPEG padded to `size` bytes (decoders ignore bytes after the end marker)"""
+    data = photo + b"\0" * max(0, size - len(photo))
+    file = io.BytesIO(data)
+    file.name = "photo.jpg"
+    return file
+
+
+class IdPools:
+    """Local ids to put in place of captured ones"""
+
+    def __init__(self, fixture, sample=1000):
+        self.sample = sample
+        self.facilities = [pk for pk, _, _ in fixture["facilities"]]
+        self.complaints = defaultdict(list)
+        for pk, username in Complaint.objects.filter(user__username__in=fixture["citizens"]).values_list("id", "user__username"):
+            self.complaints[username].append(pk)
+        self.models = {}
+        self.fields = {field: fixture[pool] for field, pool in ID_FIELDS.items()}
+
+    def remap_body(self, body, rng):
+        """Replace captured ids in a rebuilt top-level body with local ones"""
+        if not isinstance(body, dict):
+            return body
+        for field, ids in self.fields.items():
+            if field in body and body[field] not in (None, "") and ids:
+                body[field] = rng.choice(ids)
+        return body
+
+    def remap(self, view_name, kwargs, citizen, rng):
+        """New kwargs for the route, or None if the captured ones should be kept"""
+        if "pk" in kwargs and view_name in COMPLAINT_VIEWS and self.complaints[citizen]:
+            return {**kwargs, "pk": rng.choice(self.complaints[citizen])}
+        if "pk" in kwargs and view_name in FACILITY_VIEWS and self.facilities:
+            return {**kwargs, "pk": rng.choice(self.facilities)}
+        match = ADMIN_OBJECT_VIEW.match(view_name or "")
+        if match and "object_id" in kwargs:
+            ids = self._model_ids(match.group(1))
+            if ids:
+                return {**kwargs, "object_id": str(rng.choice(ids))}
+        return None
+
+    def _model_ids(self, key):
+        """Ids of the model named in an admin URL name, e.g. civic_saathi_complaint"""
+        if key not in self.models:
+            models = {f"{model._meta.app_label}_{model._meta.model_name}": model for model in apps.get_models()}
+            model = models.get(key)
+            self.models[key] = list(model._default_manager.values_list("pk", flat=True)[:self.sample]) if model else []
+        return self.models[key]
+
+
+def prepare(citizens, password, complaints_per_citizen=3):
+    """loadtest.prepare(), plus a few complaints per citizen for the complaint detail routes"""
+    fixture = loadtest.prepare(citizens, password)
+    owned = set(Complaint.objects.filter(user__username__in=fixture["citizens"]).values_list("user__username", flat=True))
+    category = ComplaintCategory.objects.select_related("department").first()
+    Complaint.objects.bulk_create([
+        Complaint(
+            user=user, category=category, department=category.department if category else None,
+            title=filler(40, n), description=filler(160, n), location=f"Ward {n + 1}",
+        )
+        for user in User.objects.filter(username__in=fixture["citizens"]).exclude(username__in=owned)
+        for n in range(complaints_per_citizen)
+    ])
+    return fixture
+
+
+# ========================
+# Replay
+# ========================
+
+class ReplayUser:
+    """
+    One replay worker's clients. API requests carry the token of the account
+    matching the captured role; admin pages use a logged-in browser session.
+    """
+
+    ACCOUNTS = {"citizen": None, "staff": "officer", "superuser": "admin"}
+
+    def __init__(self, transport_factory, fixture, citizen):
+        self.transport_factory = transport_factory
+        self.fixture = fixture
+        self.citizen = citizen
+        self.api = transport_factory()
+        self.browsers = {}
+        self.tokens = {}
+
+    def username(self, role):
+        account = self.ACCOUNTS.get(role)
+        return self.fixture[account] if account else self.citizen
+
+    def token(self, role):
+        if role not in self.tokens:
+            status, body = self.api.request("POST", "/auth/login/", data={
+                "username": self.username(role), "password": self.fixture["password"],
+            })
+            self.tokens[role] = json.loads(body)["data"]["token"] if status == 200 else None
+        return self.tokens[role]
+
+    def browser(self, role):
+        if role not in self.browsers:
+            browser = self.transport_factory()
+            browser.request("GET", "/admin/login/")
+            browser.request("POST", "/admin/login/", data={
+                "username": self.username(role),
+                "password": self.fixture["password"],
+                "csrfmiddlewaretoken": browser.cookie(settings.CSRF_COOKIE_NAME),
+                "next": "/admin/",
+            })
+            self.browsers[role] = browser
+        return self.browsers[role]
+
+    def close(self):
+        for transport in [self.api, *self.browsers.values()]:
+            transport.close()
+
+
+def replay_request(entry, user, pools, rng, photo, keep_ids=False):
+    """(transport, method, path, kwargs) to re-issue a captured request, or None to skip it"""
+    view_name = entry.get("v")
+    method = entry["m"]
+    path = entry["p"]
+    browser_session = path.startswith("/admin/") or view_name == "mark_attendance"
+    if view_name in SKIPPED_VIEWS or method not in ("GET", "POST") or (browser_session and method != "GET"):
+        return None
+
+    if not keep_ids:
+        try:
+            match = resolve(path)
+            kwargs = pools.remap(match.view_name, match.kwargs, user.citizen, rng)
+            if kwargs is not None:
+                path = reverse(match.view_name, kwargs=kwargs)
+        except (Resolver404, NoReverseMatch):
+            pass
+
+    query = {key: build(value, rng) for key, value in (entry.get("q") or {}).items()}
+    kwargs = {"query": query} if method == "GET" else {}
+    role = entry.get("role", "anonymous")
+
+    if browser_session:
+        transport = user.browser("superuser" if role == "superuser" else "staff")
+        return transport, method, path, kwargs
+
+    if view_name == "login":
+        kwargs["data"] = {"username": user.username(role if role != "anonymous" else "citizen"),
+                          "password": user.fixture["password"]}
+        return user.api, method, path, kwargs
+
+    if role != "anonymous":
+        token = user.token(role)
+        kwargs["headers"] = {"Authorization": f"Token {token}"} if token else {}
+    if method == "POST":
+        body = build(entry.get("body"), rng)
+        if not keep_ids:
+            body = pools.remap_body(body, rng)
+        if entry.get("ct") in ("multipart", "form") and isinstance(body, dict):
+            fields = entry["body"]["$obj"]
+            kwargs["files"] = {key: upload(spec["$file"], photo) for key, spec in fields.items()
+                               if isinstance(spec, dict) and "$file" in spec}
+            kwargs["data"] = {key: value for key, value in body.items() if key not in kwargs["files"]}
+        else:
+            kwargs["data"] = body if body is not None else {}
+    return user.api, method, path, kwargs
+
+
+def replay(transport_factory, fixture, entries, *, speed=1.0, concurrency=8, keep_ids=False, seed=42):
+    """
+    Re-issue `entries` (captured records, in order). With speed > 0 each
+    request is sent at its captured offset divided by `speed`; with 0 they
+    go as fast as the workers allow. Returns loadtest.summarize()'s result
+    extended with the captured latencies, skipped views, status mismatches
+    and how far behind schedule requests were sent.
+    """
+    pools = IdPools(fixture)
+    photos = loadtest.photos(seed)
+    recorder = loadtest.Recorder()
+    recorder.recording = True
+    captured = defaultdict(list)
+    skipped = Counter()
+    mismatched = Counter()
+    lags = []
+    lock = threading.Lock()
+    work = queue.Queue(maxsize=concurrency * 4)
+
+    def worker(n):
+        rng = random.Random(f"{seed}:{n}")
+        user = ReplayUser(transport_factory, fixture, fixture["citizens"][n % len(fixture["citizens"])])
+        try:
+            while True:
+                item = work.get()
+                if item is None:
+                    return
+                entry, due = item
+                request = replay_request(entry, user, pools, rng, rng.choice(photos), keep_ids)
+                label = entry.get("v") or "unmatched"
+                if request is None:
+                    with lock:
+                        skipped[label] += 1
+                    continue
+                transport, method, path, kwargs = request
+                lag = time.monotonic() - due
+                start = time.perf_counter()
+                try:
+                    status, _ = transport.request(method, path, **kwargs)
+                except Exception as e:
+                    logger.debug(f"Traffic replay: {method} {path} raised {e}")
+                    status = None
+                recorder.record(label, time.perf_counter() - start, status is not None and status < 500)
+                with lock:
+                    lags.append(lag)
+                    captured[label].append(entry.get("d", 0) / 1000)
+                    if status != entry.get("s"):
+                        mismatched[label] += 1
+        finally:
+            user.close()
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    origin = time.monotonic()
+    first = None
+    for entry in entries:
+        if first is None:
+            first = entry["ts"]
+        due = origin + ((entry["ts"] - first) / speed if speed > 0 else 0)
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        work.put((entry, max(due, origin)))
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    result = loadtest.summarize(recorder, elapsed)
+    result["captured"] = {
+        label: loadtest.latency_stats(latencies, 0, 0) for label, latencies in sorted(captured.items())
+    }
+    result["skipped"] = dict(skipped)
+    result["mismatched"] = dict(mismatched)
+    # Only meaningful when paced: how late requests went out because every worker was busy
+    ordered = sorted(lags)
+    result["lag"] = {
+        "p50_ms": round(loadtest.percentile(ordered, 50) * 1000, 1),
+        "p95_ms": round(loadtest.percentile(ordered, 95) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+    } if speed > 0 else None
+    return result
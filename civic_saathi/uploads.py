@@ -0,0 +1,183 @@
+"""
+Resumable chunked uploads for complaint photos.
+
+Clients on slow connections create an upload session, send the file in
+chunks (each chunk streamed straight to disk at its offset), and resume
+from the last acknowledged offset after a dropped connection. When the
+last byte arrives the whole file is checked against the SHA-256 given at
+session creation. A complete session can then be attached to a complaint
+through `ComplaintCreateSerializer.upload_id`, once it passes the same
+Pillow check ImageField gives direct uploads.
+"""
+import hashlib
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSession
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Size of the blocks read from the request stream / temp file
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised when a chunk cannot be accepted. Carries the HTTP status to return."""
+
+    def __init__(self, message, status_code=400, offset=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.offset = offset
+
+
+def session_path(session):
+    """Path of the partially assembled file for a session"""
+    root = Path(settings.UPLOAD_SESSION_ROOT)
+    root.mkdir(parents=True, exist_ok=True)
+    return root / f"{session.id}.part"
+
+
+def parse_checksum_header(value):
+    """
+    Parse an `Upload-Checksum` header of the form "sha256 <hex digest>".
+    Returns the lowercase hex digest, or None when the header is absent.
+    """
+    if not value:
+        return None
+    algorithm, _, digest = value.strip().partition(" ")
+    if algorithm.lower() != "sha256" or len(digest.strip()) != 64:
+        raise UploadError("Upload-Checksum must be 'sha256 <hex digest>'")
+    return digest.strip().lower()
+
+
+def write_chunk(session, offset, stream, length, chunk_checksum=None):
+    """
+    Stream `length` bytes from `stream` into the session file at `offset`.
+
+    The chunk is written block by block, never buffered whole in memory.
+    If a chunk checksum is given and does not match (or the client
+    disconnects mid-chunk) the file is truncated back to `offset`;
+    without a checksum, whatever arrived is kept so the client can resume
+    from the new offset. Returns the new offset.
+    """
+    if session.status != "uploading":
+        raise UploadError("Upload is already complete", status_code=409, offset=session.received_bytes)
+    if offset != session.received_bytes:
+        raise UploadError("Offset does not match uploaded size", status_code=409, offset=session.received_bytes)
+    if length <= 0:
+        raise UploadError("Empty chunk", offset=session.received_bytes)
+    if offset + length > session.total_size:
+        raise UploadError("Chunk exceeds declared file size", status_code=413, offset=session.received_bytes)
+
+    path = session_path(session)
+    digest = hashlib.sha256()
+    written = 0
+
+    with open(path, "r+b" if path.exists() else "w+b") as fh:
+        fh.seek(offset)
+        fh.truncate()
+        while written < length:
+            block = stream.read(min(READ_BLOCK_SIZE, length - written))
+            if not block:
+                break
+            fh.write(block)
+            digest.update(block)
+            written += len(block)
+
+        if chunk_checksum and (written != length or digest.hexdigest() != chunk_checksum):
+            fh.truncate(offset)
+            raise UploadError("Chunk checksum mismatch", status_code=400, offset=offset)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+    new_offset = offset + written
+    # Guard against two clients racing on the same session
+    updated = UploadSession.objects.filter(
+        pk=session.pk, status="uploading", received_bytes=offset
+    ).update(received_bytes=new_offset, updated_at=timezone.now())
+    if not updated:
+        session.refresh_from_db()
+        raise UploadError("Upload was modified concurrently", status_code=409, offset=session.received_bytes)
+
+    session.received_bytes = new_offset
+    if new_offset == session.total_size:
+        finalize(session)
+    return new_offset
+
+
+def file_checksum(path):
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize(session):
+    """
+    Verify the assembled file against the declared checksum.
+    On mismatch the session is reset to offset 0 so the client can start over.
+    """
+    path = session_path(session)
+    if file_checksum(path) != session.checksum:
+        path.unlink(missing_ok=True)
+        UploadSession.objects.filter(pk=session.pk).update(received_bytes=0, updated_at=timezone.now())
+        session.received_bytes = 0
+        raise UploadError("File checksum mismatch, upload restarted", status_code=422, offset=0)
+
+    session.status = "complete"
+    session.save(update_fields=["status", "updated_at"])
+    logger.info(f"Upload {session.id} complete ({session.total_size} bytes)")
+
+
+def verify_image(session):
+    """Raise UploadError unless the completed upload is an image Pillow can read"""
+    from PIL import Image
+
+    try:
+        with Image.open(session_path(session)) as image:
+            image.verify()
+    except Exception:
+        raise UploadError("Upload is not a valid image", status_code=422)
+
+
+def open_upload(session):
+    """Open a completed upload as a Django File, ready to assign to an ImageField"""
+    fh = open(session_path(session), "rb")
+    return File(fh, name=os.path.basename(session.filename))
+
+
+def consume(session, django_file=None):
+    """
+    Mark a session as used by a complaint. Call inside the transaction that
+    locked the session; its temp file is removed once that commits.
+    """
+    if django_file is not None:
+        django_file.close()
+    session.status = "consumed"
+    session.save(update_fields=["status", "updated_at"])
+    path = session_path(session)
+    transaction.on_commit(lambda: path.unlink(missing_ok=True))
+
+
+def cleanup_stale_sessions(max_age_hours=None):
+    """Delete sessions (and their temp files) not touched for `max_age_hours`"""
+    max_age_hours = max_age_hours or settings.UPLOAD_SESSION_TTL_HOURS
+    cutoff = timezone.now() - timedelta(hours=max_age_hours)
+    stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+    count = 0
+    for session in stale.iterator():
+        session_path(session).unlink(missing_ok=True)
+        count += 1
+    stale.delete()
+    return count
@@ -2,12 +2,17 @@ from django.urls import path
 from .views import (
     # Home Page
     home_view,
+    metrics_view,
     
     # Complaint Views
     ComplaintCreateView,
+    ComplaintBatchCreateView,
     MyComplaintsView,
+    ComplaintSearchView,
     ComplaintDetailView,
     ComplaintLogsView,
+    UploadSessionCreateView,
+    UploadSessionView,
     mark_attendance_view,
     
     # Auth Views
@@ -28,6 +33,7 @@ from .views import (
     FacilityListView,
     FacilityDetailView,
     FacilityRateView,
+    SimilarImagesView,
     NearbyFacilitiesView,
 )
 
@@ -54,9 +60,18 @@ urlpatterns = [
     # ========================
     path("complaints/", MyComplaintsView.as_view(), name="my_complaints"),
     path("complaints/create/", ComplaintCreateView.as_view(), name="create_complaint"),
+    path("complaints/batch/", ComplaintBatchCreateView.as_view(), name="batch_create_complaints"),
+    path("complaints/search/", ComplaintSearchView.as_view(), name="search_complaints"),
     path("complaints/<int:pk>/", ComplaintDetailView.as_view(), name="complaint_detail"),
     path("complaints/<int:pk>/logs/", ComplaintLogsView.as_view(), name="complaint_logs"),
     
+    # ========================
+    # Photos (resumable uploads, similar-image lookup)
+    # ========================
+    path("uploads/", UploadSessionCreateView.as_view(), name="upload_create"),
+    path("uploads/<uuid:upload_id>/", UploadSessionView.as_view(), name="upload_session"),
+    path("images/similar/", SimilarImagesView.as_view(), name="similar_images"),
+    
     # ========================
     # Category & Department Routes
     # ========================
@@ -75,4 +90,9 @@ urlpatterns = [
     # Admin Tools
     # ========================
     path("admin-tools/mark-attendance/", mark_attendance_view, name="mark_attendance"),
+    
+    # ========================
+    # Monitoring (internal)
+    # ========================
+    path("metrics", metrics_view, name="metrics"),
 ]
\ No newline at end of file
@@ -3,8 +3,10 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.core.mail import send_mail
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.db import transaction
+from django.db.models import Count, F, FilteredRelation, Q
 
 from rest_framework import status
 from rest_framework.views import APIView
@@ -13,18 +15,28 @@ from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated, AllowAny
 
 from .models import (
-    Complaint, ComplaintLog, ComplaintCategory, Department,
-    Worker, WorkerAttendance, Facility, FacilityRating
+    Complaint, ComplaintLog,
+    Worker, WorkerAttendance, Facility, UploadSession, ImageHash
 )
 from .serializers import (
     UserSerializer, RegisterSerializer, ProfileSerializer,
     ComplaintSerializer, ComplaintCreateSerializer, ComplaintLogSerializer,
-    CategorySerializer, DepartmentSerializer,
-    FacilitySerializer, FacilityRatingSerializer,
+    FacilitySerializer, FacilityRatingSerializer, FacilityRatingCreateSerializer,
 )
+from . import uploads
+from . import dedup
+from . import facility_queries
+from . import photo_hashes
+from . import reference
+from . import roles
+from .ingest import ingest_complaints
+from .search import search_complaints
 
 import random
 import string
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # ========================
@@ -42,6 +54,25 @@ def home_view(request):
     return render(request, 'home.html', context)
 
 
+# ========================
+# Prometheus Metrics (internal)
+# ========================
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Only reachable from METRICS_ALLOWED_IPS
+    or with "Authorization: Bearer <METRICS_TOKEN>".
+    """
+    from .metrics import CONTENT_TYPE, render
+
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and request.headers.get('Authorization') == f"Bearer {token}"
+    if not (authorized or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS):
+        return HttpResponseForbidden("Forbidden")
+    
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
 # ========================
 # OTP Storage (In production, use Redis or DB)
 # ========================
@@ -119,15 +150,7 @@ class LoginView(APIView):
             token, _ = Token.objects.get_or_create(user=user)
             
             # Check if user is officer or worker
-            user_type = "citizen"
-            department = None
-            
-            if hasattr(user, 'officer'):
-                user_type = "officer"
-                department = user.officer.department.name
-            elif hasattr(user, 'worker'):
-                user_type = "worker"
-                department = user.worker.department.name
+            role = roles.resolve(user)
             
             return Response({
                 "success": True,
@@ -135,8 +158,8 @@ class LoginView(APIView):
                 "data": {
                     "user": UserSerializer(user).data,
                     "token": token.key,
-                    "user_type": user_type,
-                    "department": department
+                    "user_type": role.kind,
+                    "department": role.department_name
                 }
             }, status=status.HTTP_200_OK)
         
@@ -179,26 +202,15 @@ class ProfileView(APIView):
         ).count()
         
         # Check user type
-        user_type = "citizen"
-        department = None
-        role = None
-        
-        if hasattr(user, 'officer'):
-            user_type = "officer"
-            department = user.officer.department.name
-            role = user.officer.role
-        elif hasattr(user, 'worker'):
-            user_type = "worker"
-            department = user.worker.department.name
-            role = user.worker.role
+        role = request.civic_role
         
         return Response({
             "success": True,
             "data": {
                 "user": UserSerializer(user).data,
-                "user_type": user_type,
-                "department": department,
-                "role": role,
+                "user_type": role.kind,
+                "department": role.department_name,
+                "role": role.title,
                 "stats": {
                     "total_complaints": total_complaints,
                     "resolved_complaints": resolved_complaints,
@@ -304,6 +316,7 @@ class ForgotPasswordView(APIView):
         }
         
         # Send OTP email
+        from django.core.mail import send_mail
         try:
             send_mail(
                 subject='🔐 Password Reset OTP - Nagar Nigam Jaipur',
@@ -452,12 +465,9 @@ class CategoryListView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        categories = ComplaintCategory.objects.select_related('department').all()
-        serializer = CategorySerializer(categories, many=True)
-        
         return Response({
             "success": True,
-            "data": serializer.data
+            "data": reference.categories()
         }, status=status.HTTP_200_OK)
 
 
@@ -466,12 +476,9 @@ class DepartmentListView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        departments = Department.objects.all()
-        serializer = DepartmentSerializer(departments, many=True)
-        
         return Response({
             "success": True,
-            "data": serializer.data
+            "data": reference.departments()
         }, status=status.HTTP_200_OK)
 
 
@@ -479,12 +486,20 @@ class DepartmentListView(APIView):
 # Complaint Views
 # ========================
 
+# Everything ComplaintSerializer reads, fetched in the same query
+COMPLAINT_SERIALIZER_RELATED = (
+    'user', 'category__department', 'department',
+    'current_officer__user', 'current_officer__department',
+    'current_worker__user', 'current_worker__department',
+)
+
+
 class ComplaintCreateView(APIView):
     """Create a new complaint."""
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        serializer = ComplaintCreateSerializer(data=request.data)
+        serializer = ComplaintCreateSerializer(data=request.data, context={'request': request})
         
         if serializer.is_valid():
             complaint = serializer.save(user=request.user)
@@ -498,9 +513,17 @@ class ComplaintCreateView(APIView):
                 new_status="pending"
             )
             
+            message = "Complaint submitted successfully!"
+            if settings.DEDUP_ENABLED:
+                try:
+                    if dedup.register(complaint):
+                        message = "Complaint submitted! A similar complaint is already being handled, and yours has been linked to it."
+                except Exception as e:
+                    logger.error(f"Dedup: Failed to check complaint #{complaint.id}: {e}")
+            
             return Response({
                 "success": True,
-                "message": "Complaint submitted successfully!",
+                "message": message,
                 "data": ComplaintSerializer(complaint).data
             }, status=status.HTTP_201_CREATED)
         
@@ -511,6 +534,154 @@ class ComplaintCreateView(APIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ComplaintBatchCreateView(APIView):
+    """
+    Create many complaints in one request (call centre / partner imports).
+    Returns a result per item; invalid items don't block the valid ones.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        items = request.data.get('complaints')
+        source = str(request.data.get('source') or 'batch import')[:50]
+        
+        if not isinstance(items, list) or not items:
+            return Response({
+                "success": False,
+                "message": "complaints must be a non-empty list"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(items) > settings.COMPLAINT_BATCH_MAX_SIZE:
+            return Response({
+                "success": False,
+                "message": f"At most {settings.COMPLAINT_BATCH_MAX_SIZE} complaints per batch"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        results = ingest_complaints(items, request.user, source=source)
+        created = sum(1 for r in results if r["success"])
+        
+        return Response({
+            "success": created > 0,
+            "message": f"{created} of {len(items)} complaints submitted",
+            "data": {
+                "created": created,
+                "failed": len(items) - created,
+                "results": results
+            }
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+
+
+class UploadSessionCreateView(APIView):
+    """Start a resumable chunked upload for a complaint photo."""
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        filename = request.data.get('filename')
+        checksum = (request.data.get('checksum') or '').lower()
+        
+        try:
+            size = int(request.data.get('size'))
+        except (TypeError, ValueError):
+            size = 0
+        
+        if not filename or len(checksum) != 64:
+            return Response({
+                "success": False,
+                "message": "filename, size and a SHA-256 checksum are required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if size <= 0 or size > settings.UPLOAD_MAX_SIZE:
+            return Response({
+                "success": False,
+                "message": f"File size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        session = UploadSession.objects.create(
+            user=request.user,
+            filename=filename[:255],
+            total_size=size,
+            checksum=checksum
+        )
+        
+        return Response({
+            "success": True,
+            "data": {
+                "upload_id": str(session.id),
+                "offset": 0,
+                "chunk_size": settings.UPLOAD_CHUNK_SIZE
+            }
+        }, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    """
+    Resume or continue a chunked upload.
+    GET returns the current offset; PATCH appends raw bytes sent at `Upload-Offset`.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def _get_session(self, request, upload_id):
+        try:
+            return UploadSession.objects.get(pk=upload_id, user=request.user)
+        except UploadSession.DoesNotExist:
+            return None
+    
+    def _session_response(self, session, http_status=status.HTTP_200_OK):
+        response = Response({
+            "success": True,
+            "data": {
+                "upload_id": str(session.id),
+                "offset": session.received_bytes,
+                "size": session.total_size,
+                "status": session.status
+            }
+        }, status=http_status)
+        response['Upload-Offset'] = str(session.received_bytes)
+        return response
+    
+    def get(self, request, upload_id):
+        session = self._get_session(request, upload_id)
+        if not session:
+            return Response({
+                "success": False,
+                "message": "Upload not found"
+            }, status=status.HTTP_404_NOT_FOUND)
+        return self._session_response(session)
+    
+    def patch(self, request, upload_id):
+        session = self._get_session(request, upload_id)
+        if not session:
+            return Response({
+                "success": False,
+                "message": "Upload not found"
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+            length = int(request.headers.get('Content-Length', ''))
+        except ValueError:
+            return Response({
+                "success": False,
+                "message": "Upload-Offset and Content-Length headers are required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            chunk_checksum = uploads.parse_checksum_header(request.headers.get('Upload-Checksum'))
+            # Read straight from the WSGI stream so the chunk is never buffered whole
+            uploads.write_chunk(session, offset, request._request, length, chunk_checksum)
+        except uploads.UploadError as e:
+            response = Response({
+                "success": False,
+                "message": e.message,
+                "data": {"offset": e.offset}
+            }, status=e.status_code)
+            if e.offset is not None:
+                response['Upload-Offset'] = str(e.offset)
+            return response
+        
+        return self._session_response(session)
+
+
 class MyComplaintsView(APIView):
     """List all complaints by the logged-in user."""
     permission_classes = [IsAuthenticated]
@@ -519,7 +690,7 @@ class MyComplaintsView(APIView):
         complaints = Complaint.objects.filter(
             user=request.user,
             is_deleted=False
-        ).select_related('category', 'department', 'current_officer', 'current_worker')
+        ).select_related(*COMPLAINT_SERIALIZER_RELATED)
         
         # Filter by status if provided
         status_filter = request.query_params.get('status')
@@ -529,32 +700,66 @@ class MyComplaintsView(APIView):
         complaints = complaints.order_by('-created_at')
         serializer = ComplaintSerializer(complaints, many=True)
         
-        # Get stats
-        total = Complaint.objects.filter(user=request.user, is_deleted=False).count()
-        pending = Complaint.objects.filter(
-            user=request.user, is_deleted=False, status__in=['pending', 'assigned']
-        ).count()
-        in_progress = Complaint.objects.filter(
-            user=request.user, is_deleted=False, status='in_progress'
-        ).count()
-        resolved = Complaint.objects.filter(
-            user=request.user, is_deleted=False, status='resolved'
-        ).count()
+        # Get stats (one pass over the citizen's complaints)
+        stats = Complaint.objects.filter(user=request.user, is_deleted=False).aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status__in=['pending', 'assigned'])),
+            in_progress=Count('id', filter=Q(status='in_progress')),
+            resolved=Count('id', filter=Q(status='resolved')),
+        )
         
         return Response({
             "success": True,
             "data": {
                 "complaints": serializer.data,
-                "stats": {
-                    "total": total,
-                    "pending": pending,
-                    "in_progress": in_progress,
-                    "resolved": resolved
-                }
+                "stats": stats
             }
         }, status=status.HTTP_200_OK)
 
 
+class ComplaintSearchView(APIView):
+    """
+    Full-text search over complaints, best matches first.
+    Citizens search their own complaints, officers their department's,
+    workers the complaints assigned to them.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                "success": False,
+                "message": "Search query (q) is required"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 50))
+        except ValueError:
+            limit = 20
+        
+        user = request.user
+        complaints = Complaint.objects.filter(is_deleted=False)
+        if user.is_superuser:
+            pass
+        elif request.civic_role.is_officer:
+            complaints = complaints.filter(department_id=request.civic_role.department_id)
+        elif request.civic_role.is_worker:
+            complaints = complaints.filter(current_worker_id=request.civic_role.worker_id)
+        else:
+            complaints = complaints.filter(user=user)
+        
+        complaints = search_complaints(complaints, query).select_related(
+            *COMPLAINT_SERIALIZER_RELATED
+        )[:limit]
+        serializer = ComplaintSerializer(complaints, many=True)
+        
+        return Response({
+            "success": True,
+            "data": serializer.data
+        }, status=status.HTTP_200_OK)
+
+
 class ComplaintDetailView(APIView):
     """Get complaint details."""
     permission_classes = [IsAuthenticated]
@@ -562,7 +767,7 @@ class ComplaintDetailView(APIView):
     def get(self, request, pk):
         try:
             complaint = Complaint.objects.select_related(
-                'category', 'department', 'current_officer__user', 'current_worker__user'
+                *COMPLAINT_SERIALIZER_RELATED
             ).get(pk=pk, user=request.user, is_deleted=False)
         except Complaint.DoesNotExist:
             return Response({
@@ -591,7 +796,7 @@ class ComplaintLogsView(APIView):
                 "message": "Complaint not found"
             }, status=status.HTTP_404_NOT_FOUND)
         
-        logs = ComplaintLog.objects.filter(complaint=complaint).order_by('-timestamp')
+        logs = ComplaintLog.objects.filter(complaint=complaint).select_related('action_by').order_by('-timestamp')
         serializer = ComplaintLogSerializer(logs, many=True)
         
         return Response({
@@ -609,13 +814,7 @@ class FacilityListView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        facilities = Facility.objects.filter(is_active=True)
-        
-        # Filter by type if provided
-        facility_type = request.query_params.get('type')
-        if facility_type:
-            facilities = facilities.filter(facility_type=facility_type)
-        
+        facilities = facility_queries.facility_list(request.query_params)
         serializer = FacilitySerializer(facilities, many=True)
         
         return Response({
@@ -630,15 +829,14 @@ class FacilityDetailView(APIView):
     
     def get(self, request, pk):
         try:
-            facility = Facility.objects.get(pk=pk, is_active=True)
+            facility = facility_queries.active_facilities().get(pk=pk)
         except Facility.DoesNotExist:
             return Response({
                 "success": False,
                 "message": "Facility not found"
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Get recent ratings
-        ratings = FacilityRating.objects.filter(facility=facility).order_by('-created_at')[:10]
+        ratings = facility_queries.recent_ratings(facility)
         
         serializer = FacilitySerializer(facility)
         rating_serializer = FacilityRatingSerializer(ratings, many=True)
@@ -665,14 +863,13 @@ class FacilityRateView(APIView):
                 "message": "Facility not found"
             }, status=status.HTTP_404_NOT_FOUND)
         
-        rating_value = request.data.get('cleanliness_rating')
-        comment = request.data.get('comment', '')
-        is_anonymous = request.data.get('is_anonymous', False)
-        
-        if not rating_value or rating_value not in [1, 2, 3, 4, 5]:
+        rating_serializer = FacilityRatingCreateSerializer(data=request.data)
+        if not rating_serializer.is_valid():
+            errors = rating_serializer.errors
             return Response({
                 "success": False,
-                "message": "Rating must be between 1 and 5"
+                "message": "Rating must be between 1 and 5" if 'cleanliness_rating' in errors else "Invalid rating",
+                "errors": errors
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Get client IP
@@ -682,12 +879,10 @@ class FacilityRateView(APIView):
         else:
             ip = request.META.get('REMOTE_ADDR')
         
-        rating = FacilityRating.objects.create(
+        is_anonymous = rating_serializer.validated_data.get('is_anonymous', False)
+        rating = rating_serializer.save(
             facility=facility,
             user=None if is_anonymous else request.user,
-            cleanliness_rating=rating_value,
-            comment=comment,
-            is_anonymous=is_anonymous,
             ip_address=ip
         )
         
@@ -705,45 +900,84 @@ class NearbyFacilitiesView(APIView):
     permission_classes = [AllowAny]
     
     def get(self, request):
-        lat = request.query_params.get('lat')
-        lng = request.query_params.get('lng')
-        radius = request.query_params.get('radius', 5)  # default 5km
-        
-        if not lat or not lng:
+        try:
+            facilities = facility_queries.nearby_facilities(request.query_params)
+        except facility_queries.LocationError as e:
             return Response({
                 "success": False,
-                "message": "Latitude and longitude are required"
+                "message": str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        serializer = FacilitySerializer(facilities, many=True)
+        
+        return Response({
+            "success": True,
+            "data": serializer.data
+        }, status=status.HTTP_200_OK)
+
+
+class SimilarImagesView(APIView):
+    """
+    Photos visually identical (or nearly) to a complaint image or facility rating photo.
+    Staff only: officers see complaint matches from their own department.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        user = request.user
+        if not (user.is_superuser or request.civic_role.is_officer):
+            return Response({
+                "success": False,
+                "message": "Only officers can look up similar images"
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        source = request.query_params.get('source', 'complaint')
         try:
-            lat = float(lat)
-            lng = float(lng)
-            radius = float(radius)
+            object_id = int(request.query_params.get('id', ''))
+            distance = int(request.query_params.get('distance', photo_hashes.MAX_DISTANCE))
         except ValueError:
             return Response({
                 "success": False,
-                "message": "Invalid coordinates"
+                "message": "id and distance must be integers"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if source not in photo_hashes.SOURCES or not 0 <= distance <= photo_hashes.MAX_DISTANCE:
+            return Response({
+                "success": False,
+                "message": f"source must be one of {', '.join(photo_hashes.SOURCES)}; "
+                           f"distance between 0 and {photo_hashes.MAX_DISTANCE}"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Simple distance filter (for production, use PostGIS)
-        lat_range = radius / 111  # 1 degree ≈ 111 km
-        lng_range = radius / (111 * abs(lat) if lat != 0 else 111)
-        
-        facilities = Facility.objects.filter(
-            is_active=True,
-            latitude__isnull=False,
-            longitude__isnull=False,
-            latitude__gte=lat - lat_range,
-            latitude__lte=lat + lat_range,
-            longitude__gte=lng - lng_range,
-            longitude__lte=lng + lng_range
+        try:
+            image_hash = ImageHash.objects.get(source=source, object_id=object_id)
+        except ImageHash.DoesNotExist:
+            return Response({
+                "success": False,
+                "message": "No photo hash for this item (no photo, or not processed yet)"
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        matches = photo_hashes.find_similar(
+            image_hash.dhash, distance, ImageHash.objects.exclude(pk=image_hash.pk)
         )
         
-        serializer = FacilitySerializer(facilities, many=True)
+        if not user.is_superuser:
+            visible = set(Complaint.objects.filter(
+                department_id=request.civic_role.department_id,
+                id__in=[m.object_id for m, _ in matches if m.source == 'complaint']
+            ).values_list('id', flat=True))
+            matches = [(m, d) for m, d in matches if m.source != 'complaint' or m.object_id in visible]
         
         return Response({
             "success": True,
-            "data": serializer.data
+            "data": [{
+                "source": match.source,
+                "id": match.object_id,
+                "distance": dist,
+                "identical_file": match.sha256 == image_hash.sha256,
+                "uploaded_by": match.uploaded_by.username if match.uploaded_by else None,
+                "url": settings.MEDIA_URL + match.file,
+                "created_at": match.created_at,
+            } for match, dist in matches]
         }, status=status.HTTP_200_OK)
 
 
@@ -751,6 +985,17 @@ class NearbyFacilitiesView(APIView):
 # Admin Tools
 # ========================
 
+def attendance_rows(workers, today):
+    """Workers with their users and today's attendance status/notes, in one joined query"""
+    return list(workers.select_related('user').annotate(
+        today_attendance=FilteredRelation(
+            'attendance_records', condition=Q(attendance_records__date=today)
+        ),
+        today_status=F('today_attendance__status'),
+        today_notes=F('today_attendance__notes'),
+    ).order_by('user__username'))
+
+
 @login_required
 def mark_attendance_view(request):
     """Admin view for marking worker attendance"""
@@ -759,40 +1004,44 @@ def mark_attendance_view(request):
     # Get officer's department
     workers = Worker.objects.none()
     
-    if hasattr(user, 'officer'):
-        officer = user.officer
-        workers = Worker.objects.filter(department=officer.department, is_active=True)
+    if request.civic_role.is_officer:
+        workers = Worker.objects.filter(
+            department_id=request.civic_role.department_id, is_active=True
+        )
     elif user.is_superuser:
         workers = Worker.objects.filter(is_active=True)
     
     today = timezone.now().date()
+    success = False
     
     if request.method == 'POST':
-        for worker in workers:
-            status_value = request.POST.get(f'status_{worker.id}')
-            if status_value:
-                WorkerAttendance.objects.update_or_create(
-                    worker=worker,
-                    date=today,
-                    defaults={
-                        'status': status_value,
-                        'marked_by': user
-                    }
-                )
-        return render(request, 'admin/mark_attendance.html', {
-            'workers': workers,
-            'today': today,
-            'success': True
-        })
-    
-    # Get today's attendance
-    attendance_dict = {}
-    for att in WorkerAttendance.objects.filter(worker__in=workers, date=today):
-        attendance_dict[att.worker_id] = att.status
+        # One upsert for the whole department instead of a SELECT + INSERT/UPDATE per worker
+        statuses = dict(WorkerAttendance.ATTENDANCE_STATUS)
+        records = [
+            WorkerAttendance(worker_id=worker_id, date=today, status=request.POST[f'status_{worker_id}'], marked_by=user)
+            for worker_id in workers.values_list('id', flat=True)
+            if request.POST.get(f'status_{worker_id}') in statuses
+        ]
+        with transaction.atomic():
+            WorkerAttendance.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['worker', 'date'],
+                update_fields=['status', 'marked_by'],
+            )
+        success = True
+    
+    rows = attendance_rows(workers, today)
+    # The template looks records up by worker id
+    attendance_map = {
+        worker.id: {'status': worker.today_status, 'notes': worker.today_notes}
+        for worker in rows if worker.today_status is not None
+    }
     
     return render(request, 'admin/mark_attendance.html', {
-        'workers': workers,
+        'workers': rows,
         'today': today,
-        'attendance': attendance_dict
+        'attendance_map': attendance_map,
+        'success': success,
     })
 
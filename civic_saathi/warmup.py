@@ -0,0 +1,87 @@
+"""
+Warm-up for a freshly started worker, so the first requests after a deploy
+don't pay for what every later request finds ready:
+
+- the URLconf, and through it the views, serializers and DRF (Django only
+  imports them on the first request),
+- the templates of the busiest pages (compiled once per process when the
+  cached template loader is on, i.e. DEBUG off),
+- the ContentType cache the admin and permission checks read,
+- the category/department lists (reference.py),
+- the database connection (or the connection pool).
+
+gunicorn.conf.py calls warm_up() from post_worker_init, after the worker
+loaded the app and before it accepts requests. Turn it off with
+WARMUP_ENABLED=False. A failing step is logged and skipped; it never
+stops the worker from starting.
+"""
+import time
+
+from django.apps import apps
+from django.conf import settings
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES = ["home.html", "admin/index.html", "admin/login.html", "admin/change_list.html"]
+
+
+def import_urls():
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    # Resolving the pattern list imports every view module it references
+    return len(resolver.url_patterns)
+
+
+def load_templates():
+    from django.template.loader import get_template
+
+    for name in TEMPLATES:
+        get_template(name)
+    return len(TEMPLATES)
+
+
+def fill_content_types():
+    from django.contrib.contenttypes.models import ContentType
+
+    return len(ContentType.objects.get_for_models(*apps.get_models()))
+
+
+def fill_reference_data():
+    from . import reference
+
+    return len(reference.categories()) + len(reference.departments())
+
+
+def connect():
+    from django.db import connection
+
+    connection.ensure_connection()
+
+
+STEPS = [
+    ("connect", connect),
+    ("urls", import_urls),
+    ("templates", load_templates),
+    ("content_types", fill_content_types),
+    ("reference_data", fill_reference_data),
+]
+
+
+def warm_up():
+    """Run every step; returns {step: milliseconds} for the steps that succeeded"""
+    timings = {}
+    if not settings.WARMUP_ENABLED:
+        return timings
+    for name, step in STEPS:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Warm-up: {name} failed: {e}")
+            continue
+        timings[name] = (time.perf_counter() - start) * 1000
+    logger.info("Warm-up: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in timings.items()))
+    return timings
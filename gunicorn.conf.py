@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration, picked up automatically when gunicorn is started
+from the project root (Procfile / railway.json / nixpacks.toml).
+
+Turns on prometheus_client multiprocess mode so /metrics reports the sum
+over all workers instead of whichever worker happened to answer, and warms
+each worker up (civic_saathi/warmup.py) before it takes requests.
+"""
+import os
+import shutil
+import tempfile
+
+PROMETHEUS_MULTIPROC_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "civic_saathi_metrics")
+)
+
+
+def on_starting(server):
+    # Samples left by a previous master would be added to this one's
+    shutil.rmtree(PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    # Settings refuse per-process caching of what every worker must see (read-replica pins)
+    os.environ["GUNICORN_WORKERS"] = str(server.cfg.workers)
+
+
+def child_exit(server, worker):
+    # Drop the dead worker's live gauges; its counters/histograms keep counting
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    # The app is loaded (Django is set up); fill caches before the first request
+    from civic_saathi.warmup import warm_up
+    warm_up()
@@ -2,6 +2,11 @@
 ASGI config for municipal project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with ``uvicorn municipal.asgi:application`` (or gunicorn with
+``-k uvicorn.workers.UvicornWorker``). AsgiUrlconfMiddleware routes its
+requests with settings.ASGI_URLCONF (municipal.asgi_urls), which sends the
+read-heavy public endpoints to the async views and everything else to the
+usual sync views.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
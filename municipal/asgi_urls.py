@@ -0,0 +1,24 @@
+"""
+URL configuration for the ASGI server (municipal/asgi.py).
+
+The read-heavy public endpoints are routed to the async views in
+civic_saathi/async_views.py; every other URL falls through to the same
+patterns as municipal/urls.py, so both servers expose the same API under
+the same URL names. WSGI (gunicorn, runserver, the test client) keeps
+using municipal.urls and the sync DRF views.
+"""
+from django.urls import path
+
+from civic_saathi import async_views
+
+from . import urls
+
+urlpatterns = [
+    path("", async_views.home_view, name="home"),
+    path("categories/", async_views.category_list_view, name="categories"),
+    path("departments/", async_views.department_list_view, name="departments"),
+    path("facilities/", async_views.facility_list_view, name="facilities"),
+    path("facilities/nearby/", async_views.nearby_facilities_view, name="nearby_facilities"),
+    path("facilities/<int:pk>/", async_views.facility_detail_view, name="facility_detail"),
+    *urls.urlpatterns,
+]